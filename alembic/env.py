@@ -31,6 +31,8 @@ target_metadata = Base.metadata
 
 
 def get_url():
+    if os.environ.get("SQLALCHEMY_DATABASE_URL"):
+        return os.environ["SQLALCHEMY_DATABASE_URL"]
     user = os.environ.get("DB_USER")
     password = os.environ.get("DB_PASSWORD")
     port = os.environ.get("DB_PORT")
@@ -82,7 +84,11 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata, compare_type=True
+            connection=connection,
+            target_metadata=target_metadata,
+            compare_type=True,
+            # SQLite alters most things by copying the table
+            render_as_batch=connection.dialect.name == "sqlite",
         )
 
         with context.begin_transaction():
@@ -0,0 +1,40 @@
+"""create idempotency_key table
+
+Revision ID: 0e4d6b2c8a17
+Revises: a3c1e8f27b94
+Create Date: 2026-10-19 15:27:44.061923
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.sql import func
+
+# revision identifiers, used by Alembic.
+revision = "0e4d6b2c8a17"
+down_revision = "a3c1e8f27b94"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "idempotency_key",
+        sa.Column("id", sa.Integer(), nullable=False, primary_key=True),
+        sa.Column("key", sa.String(64), nullable=False),
+        sa.Column("fingerprint", sa.String(64), nullable=False),
+        sa.Column("status_code", sa.Integer()),
+        sa.Column("headers", sa.Text()),
+        sa.Column("body", sa.LargeBinary(length=2**24)),
+        sa.Column("expires_at", sa.TIMESTAMP(), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(), server_default=func.now()),
+    )
+    op.create_index("ix_idempotency_key_id", "idempotency_key", ["id"])
+    op.create_index(
+        "ix_idempotency_key_key", "idempotency_key", ["key"], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_idempotency_key_key", table_name="idempotency_key")
+    op.drop_index("ix_idempotency_key_id", table_name="idempotency_key")
+    op.drop_table("idempotency_key")
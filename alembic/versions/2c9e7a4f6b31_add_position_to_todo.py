@@ -0,0 +1,36 @@
+"""add position to todo and todo_archive for manual ordering
+
+Revision ID: 2c9e7a4f6b31
+Revises: 8f2b6d4a9e13
+Create Date: 2026-10-19 23:05:12.480215
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+from app.db import online_migration as om
+from app.db.types import OrderKey
+
+# revision identifiers, used by Alembic.
+revision = "2c9e7a4f6b31"
+down_revision = "8f2b6d4a9e13"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Not backfilled: existing todos keep their order by id until their
+    # owner first moves one, which rebalances that owner's keys
+    bind = op.get_bind()
+    for table in ("todo", "todo_archive"):
+        om.add_column(bind, table, sa.Column("position", OrderKey, nullable=True))
+    om.create_index(
+        bind, "ix_todo_owner_id_position", "todo", ["owner_id", "position", "id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_todo_owner_id_position", table_name="todo")
+    for table in ("todo_archive", "todo"):
+        op.drop_column(table, "position")
@@ -0,0 +1,26 @@
+"""index user.address_id
+
+Revision ID: 3e8a5c1d7f42
+Revises: b81e4c0d9a56
+Create Date: 2026-10-19 20:05:12.418230
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3e8a5c1d7f42"
+down_revision = "b81e4c0d9a56"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Address to user lookups, and the foreign key check of address deletes,
+    # scanned the whole table where the database does not index foreign keys
+    # itself (SQLite)
+    op.create_index("ix_user_address_id", "user", ["address_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_address_id", table_name="user")
@@ -0,0 +1,33 @@
+"""widen user.hashed_password
+
+Revision ID: 4b7d2e9f1c35
+Revises: 0e4d6b2c8a17
+Create Date: 2026-10-19 17:02:13.418520
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "4b7d2e9f1c35"
+down_revision = "0e4d6b2c8a17"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        "user",
+        "hashed_password",
+        existing_type=sa.String(50),
+        type_=sa.String(255),
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        "user",
+        "hashed_password",
+        existing_type=sa.String(255),
+        type_=sa.String(50),
+    )
@@ -0,0 +1,33 @@
+"""add deleted_at to todo and user for soft delete
+
+Revision ID: 5b0e7c9a1f3d
+Revises: db59d45146d8
+Create Date: 2026-10-19 11:20:37.906112
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5b0e7c9a1f3d"
+down_revision = "db59d45146d8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("todo", sa.Column("deleted_at", sa.TIMESTAMP(), nullable=True))
+    op.add_column("user", sa.Column("deleted_at", sa.TIMESTAMP(), nullable=True))
+    op.create_index(
+        "ix_todo_owner_id_deleted_at",
+        "todo",
+        ["owner_id", "deleted_at"],
+        postgresql_where=sa.text("deleted_at IS NULL"),
+        sqlite_where=sa.text("deleted_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_todo_owner_id_deleted_at", table_name="todo")
+    op.drop_column("user", "deleted_at")
+    op.drop_column("todo", "deleted_at")
@@ -0,0 +1,33 @@
+"""create purge_watermark table
+
+Revision ID: 5e8b1d3a7c92
+Revises: 2c9e7a4f6b31
+Create Date: 2026-10-20 10:12:48.371054
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+from app.db.types import Timestamp
+
+# revision identifiers, used by Alembic.
+revision = "5e8b1d3a7c92"
+down_revision = "2c9e7a4f6b31"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "purge_watermark",
+        sa.Column("id", sa.Integer(), nullable=False, primary_key=True),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("purged_before", Timestamp, nullable=False),
+    )
+    op.create_index("ix_purge_watermark_id", "purge_watermark", ["id"])
+    op.create_index("ix_purge_watermark_name", "purge_watermark", ["name"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_table("purge_watermark")
@@ -0,0 +1,47 @@
+"""create job table for the background job queue
+
+Revision ID: 67309753fd69
+Revises: 5b0e7c9a1f3d
+Create Date: 2026-10-19 13:05:52.118430
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.sql import func
+
+from app.db.types import Timestamp
+
+# revision identifiers, used by Alembic.
+revision = "67309753fd69"
+down_revision = "5b0e7c9a1f3d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "job",
+        sa.Column("id", sa.Integer(), nullable=False, primary_key=True),
+        sa.Column("queue", sa.String(50), nullable=False),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("max_attempts", sa.Integer(), nullable=False),
+        sa.Column("run_at", Timestamp, nullable=False, server_default=func.now()),
+        sa.Column("locked_by", sa.String(100)),
+        sa.Column("locked_at", Timestamp),
+        sa.Column("last_error", sa.Text()),
+        sa.Column("created_at", Timestamp, server_default=func.now()),
+        # Stamped by the ORM (onupdate in TimestampMixin) on any database
+        sa.Column("updated_at", Timestamp, nullable=True),
+    )
+    op.create_index("ix_job_id", "job", ["id"])
+    op.create_index("ix_job_status_queue_run_at", "job", ["status", "queue", "run_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_job_status_queue_run_at", table_name="job")
+    op.drop_index("ix_job_id", table_name="job")
+    op.drop_table("job")
@@ -0,0 +1,38 @@
+"""create migration_progress table
+
+Revision ID: 6d2a9f4c7b18
+Revises: 9c1f5a7e3d20
+Create Date: 2026-10-19 18:04:37.215903
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.sql import func
+
+# revision identifiers, used by Alembic.
+revision = "6d2a9f4c7b18"
+down_revision = "9c1f5a7e3d20"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "migration_progress",
+        sa.Column("id", sa.Integer(), nullable=False, primary_key=True),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("last_id", sa.Integer(), nullable=False),
+        sa.Column("max_id", sa.Integer(), nullable=False),
+        sa.Column("rows", sa.Integer(), nullable=False),
+        sa.Column("finished_at", sa.TIMESTAMP(), nullable=True),
+        sa.Column("created_at", sa.TIMESTAMP(), server_default=func.now()),
+    )
+    op.create_index("ix_migration_progress_id", "migration_progress", ["id"])
+    op.create_index(
+        "ix_migration_progress_name", "migration_progress", ["name"], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("migration_progress")
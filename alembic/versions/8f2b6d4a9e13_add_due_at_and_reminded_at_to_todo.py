@@ -0,0 +1,45 @@
+"""add due_at and reminded_at to todo and todo_archive
+
+Revision ID: 8f2b6d4a9e13
+Revises: 3e8a5c1d7f42
+Create Date: 2026-10-19 21:12:40.116503
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+from app.db import online_migration as om
+
+# revision identifiers, used by Alembic.
+revision = "8f2b6d4a9e13"
+down_revision = "3e8a5c1d7f42"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Nullable without a default: instant on MySQL, no backfill needed
+    bind = op.get_bind()
+    for table in ("todo", "todo_archive"):
+        om.add_column(bind, table, sa.Column("due_at", sa.TIMESTAMP(), nullable=True))
+        om.add_column(
+            bind, table, sa.Column("reminded_at", sa.TIMESTAMP(), nullable=True)
+        )
+    om.create_index(
+        bind,
+        "ix_todo_owner_id_isCompleted_due_at",
+        "todo",
+        ["owner_id", "isCompleted", "due_at"],
+    )
+    om.create_index(
+        bind, "ix_todo_reminded_at_due_at", "todo", ["reminded_at", "due_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_todo_reminded_at_due_at", table_name="todo")
+    op.drop_index("ix_todo_owner_id_isCompleted_due_at", table_name="todo")
+    for table in ("todo_archive", "todo"):
+        op.drop_column(table, "reminded_at")
+        op.drop_column(table, "due_at")
@@ -0,0 +1,52 @@
+"""create refresh_token and revoked_token tables
+
+Revision ID: 9c1f5a7e3d20
+Revises: 4b7d2e9f1c35
+Create Date: 2026-10-19 17:21:52.730144
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.sql import func
+
+# revision identifiers, used by Alembic.
+revision = "9c1f5a7e3d20"
+down_revision = "4b7d2e9f1c35"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "refresh_token",
+        sa.Column("id", sa.Integer(), nullable=False, primary_key=True),
+        sa.Column("token_hash", sa.String(64), nullable=False),
+        sa.Column("family", sa.String(32), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("user.id"), nullable=False),
+        sa.Column("expires_at", sa.TIMESTAMP(), nullable=False),
+        sa.Column("revoked_at", sa.TIMESTAMP(), nullable=True),
+        sa.Column("created_at", sa.TIMESTAMP(), server_default=func.now()),
+    )
+    op.create_index("ix_refresh_token_id", "refresh_token", ["id"])
+    op.create_index(
+        "ix_refresh_token_token_hash", "refresh_token", ["token_hash"], unique=True
+    )
+    op.create_index("ix_refresh_token_family", "refresh_token", ["family"])
+    op.create_index("ix_refresh_token_user_id", "refresh_token", ["user_id"])
+
+    op.create_table(
+        "revoked_token",
+        sa.Column("id", sa.Integer(), nullable=False, primary_key=True),
+        sa.Column("jti", sa.String(32), nullable=False),
+        sa.Column("expires_at", sa.TIMESTAMP(), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(), server_default=func.now()),
+    )
+    op.create_index("ix_revoked_token_id", "revoked_token", ["id"])
+    op.create_index("ix_revoked_token_jti", "revoked_token", ["jti"], unique=True)
+    op.create_index("ix_revoked_token_expires_at", "revoked_token", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("revoked_token")
+    op.drop_table("refresh_token")
@@ -0,0 +1,36 @@
+"""create todo_event outbox table
+
+Revision ID: a3c1e8f27b94
+Revises: 67309753fd69
+Create Date: 2026-10-19 14:41:09.530218
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.sql import func
+
+# revision identifiers, used by Alembic.
+revision = "a3c1e8f27b94"
+down_revision = "67309753fd69"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "todo_event",
+        sa.Column("id", sa.Integer(), nullable=False, primary_key=True),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("todo_id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(20), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(), server_default=func.now()),
+    )
+    op.create_index("ix_todo_event_id", "todo_event", ["id"])
+    op.create_index("ix_todo_event_owner_id_id", "todo_event", ["owner_id", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_todo_event_owner_id_id", table_name="todo_event")
+    op.drop_index("ix_todo_event_id", table_name="todo_event")
+    op.drop_table("todo_event")
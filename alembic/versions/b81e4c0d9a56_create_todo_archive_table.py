@@ -0,0 +1,40 @@
+"""create todo_archive table
+
+Revision ID: b81e4c0d9a56
+Revises: 6d2a9f4c7b18
+Create Date: 2026-10-19 18:41:09.562817
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.sql import func
+
+# revision identifiers, used by Alembic.
+revision = "b81e4c0d9a56"
+down_revision = "6d2a9f4c7b18"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "todo_archive",
+        sa.Column(
+            "id", sa.Integer(), nullable=False, primary_key=True, autoincrement=False
+        ),
+        sa.Column("title", sa.String(200)),
+        sa.Column("description", sa.String(500)),
+        sa.Column("priority", sa.Integer()),
+        sa.Column("isCompleted", sa.Boolean()),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(), nullable=True),
+        sa.Column("updated_at", sa.TIMESTAMP(), nullable=True),
+        sa.Column("archived_at", sa.TIMESTAMP(), server_default=func.now()),
+    )
+    op.create_index("ix_todo_archive_id", "todo_archive", ["id"])
+    op.create_index("ix_todo_archive_owner_id_id", "todo_archive", ["owner_id", "id"])
+
+
+def downgrade() -> None:
+    op.drop_table("todo_archive")
@@ -0,0 +1,44 @@
+"""add todo tombstone table and delta sync index
+
+Revision ID: db59d45146d8
+Revises: f649bbd38052
+Create Date: 2026-10-19 10:02:11.412305
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.sql import func
+
+# revision identifiers, used by Alembic.
+revision = "db59d45146d8"
+down_revision = "f649bbd38052"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "todo_tombstone",
+        sa.Column("id", sa.Integer(), nullable=False, primary_key=True),
+        sa.Column("todo_id", sa.Integer(), nullable=False),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("deleted_at", sa.TIMESTAMP(), server_default=func.now()),
+    )
+    op.create_index("ix_todo_tombstone_id", "todo_tombstone", ["id"])
+    op.create_index(
+        "ix_todo_tombstone_owner_id_id", "todo_tombstone", ["owner_id", "id"]
+    )
+
+    # New todos get updated_at on insert from now on; give existing ones the
+    # same treatment so they are visible to the sync cursor.
+    op.execute("UPDATE todo SET updated_at = created_at WHERE updated_at IS NULL")
+    op.create_index(
+        "ix_todo_owner_id_updated_at", "todo", ["owner_id", "updated_at", "id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_todo_owner_id_updated_at", table_name="todo")
+    op.drop_index("ix_todo_tombstone_owner_id_id", table_name="todo_tombstone")
+    op.drop_index("ix_todo_tombstone_id", table_name="todo_tombstone")
+    op.drop_table("todo_tombstone")
@@ -2,7 +2,9 @@ from fastapi import APIRouter, Depends, status, HTTPException
 from sqlalchemy.orm import Session
 
 from app import crud
-from app.api.deps import get_current_user, get_db
+from app.api.deps import get_current_user, get_db, get_loaders
+from app.api.routing import SessionRoute
+from app.api.loaders import Loaders
 from app.dependencies import raise_404_error, get_authorization_exception
 from app.models.address import Address
 from app.models.user import User
@@ -12,6 +14,7 @@ router = APIRouter(
     prefix="/address",
     tags=["Address"],
     responses={404: {"description": "Cannot find address for the provided id."}},
+    route_class=SessionRoute,
 )
 
 
@@ -24,12 +27,15 @@ router = APIRouter(
 )
 def get_address_by_id(
     address_id: int,
-    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders),
 ):
-    address = crud.address.get(db=db, id=address_id)
+    address = loaders.address.load(address_id)
     if address is None:
         raise raise_404_error(detail="Cannot find address for the provided id.")
+    loaders.with_users([address])
+    if address.user is None:
+        raise raise_404_error(detail="Cannot find address for the provided id.")
     if address.user.id == current_user.id or crud.user.is_admin(current_user):
         return address
 
@@ -104,10 +110,7 @@ def create_address(
 ):
     address = crud.address.create(db=db, obj_in=address_in)
 
-    user = crud.user.get(db=db, id=current_user.id)
-    user.address_id = address.id
-
-    db.add(user)
-    db.commit()
+    current_user.address_id = address.id
+    db.add(current_user)
 
     return address
@@ -1,51 +1,129 @@
-from datetime import timedelta
+from datetime import datetime, timedelta
 from fastapi import Depends, APIRouter, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from jose import JWTError
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.api.deps import get_current_user, get_db
+from app.api.deps import get_current_user, get_db, oauth2_bearer
+from app.api.routing import SessionRoute
 from app.core.config import settings
 from app.dependencies import invalid_authentication_exception
 from app.models.user import User
-from app.schemas import user_schema
+from app.schemas import token_schema, user_schema
 from app import crud
-from app.core.security import create_access_token, verify_password
+from app.core.revocation import revocations
+from app.db.session import violated_unique_index
+from app.core.security import (
+    create_access_token,
+    decode_access_token,
+    verify_password,
+)
 
 router = APIRouter(
-    prefix="/auth", tags=["Auth"], responses={401: {"user": "Not authorized."}}
+    prefix="/auth",
+    tags=["Auth"],
+    responses={401: {"user": "Not authorized."}},
+    route_class=SessionRoute,
 )
 
 
 @router.post(
     "/signup",
     summary="Sign up",
+    status_code=status.HTTP_201_CREATED,
     response_model=user_schema.UserOut,
     responses={
         201: {"description": "Created user."},
-        409: {"description": "User email already exists."},
+        409: {
+            "description": "User email or username already exists, or belongs"
+            " to a deactivated user not purged yet."
+        },
     },
 )
 def create_user(user_data: user_schema.UserCreate, db: Session = Depends(get_db)):
-    if db.query(User).filter(User.email == user_data.email).first():
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT, detail="User email already exists."
+    try:
+        return crud.user.create(db, user_data)
+    except IntegrityError as e:
+        db.rollback()
+        detail = (
+            "User email already exists."
+            if violated_unique_index(e, User.__table__) == "ix_user_email"
+            else "Username already exists."
         )
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail)
+
 
-    return crud.user.create(db, user_data)
+def issue_tokens(db: Session, user: User, refresh_token: str = None) -> dict:
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        user.username, user.id, expires_delta=access_token_expires
+    )
+    if refresh_token is None:
+        refresh_token = crud.refresh_token.issue(db, user_id=user.id)
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "expires_in": int(access_token_expires.total_seconds()),
+        "refresh_token": refresh_token,
+    }
 
 
-@router.post("/login", summary="Login")
+@router.post("/login", summary="Login", response_model=token_schema.Token)
 def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
 ):
     user = crud.user.authenticate(form_data.username, form_data.password, db)
     if not user:
         raise invalid_authentication_exception()
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        user.username, user.id, expires_delta=access_token_expires
-    )
+    return issue_tokens(db, user)
+
+
+@router.post(
+    "/refresh",
+    summary="Trade a refresh token for new access and refresh tokens.",
+    operation_id="refresh_token",
+    response_model=token_schema.Token,
+)
+def refresh_access_token(
+    request: token_schema.RefreshRequest, db: Session = Depends(get_db)
+):
+    rotated = crud.refresh_token.rotate(db, token=request.refresh_token)
+    if rotated is None:
+        # A reused token's family is revoked, although the request fails
+        db.commit()
+    user = crud.user.get(db, rotated[0]) if rotated else None
+    if user is None or not user.is_active:
+        raise invalid_authentication_exception()
+    return issue_tokens(db, user, refresh_token=rotated[1])
+
 
-    return {"access_token": access_token, "token_type": "bearer"}
+@router.post(
+    "/logout",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Revoke the current access token, and the refresh token if given.",
+    operation_id="logout",
+)
+def logout(
+    request: token_schema.LogoutRequest = None,
+    token: str = Depends(oauth2_bearer),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    try:
+        payload = decode_access_token(token)
+    except JWTError:
+        raise invalid_authentication_exception()
+    if payload.get("jti"):
+        crud.refresh_token.revoke_access_token(
+            db,
+            jti=payload["jti"],
+            expires_at=datetime.utcfromtimestamp(payload["exp"]),
+        )
+    if request is not None and request.refresh_token:
+        crud.refresh_token.revoke(db, token=request.refresh_token)
+    # Effective on this worker at once, on the others after their next sync
+    if payload.get("jti"):
+        revocations.add(payload["jti"])
 
 
 @router.patch(
@@ -65,6 +143,7 @@ def update_user_password(
     if user_verification.username == current_user.username and verify_password(
         user_verification.password, current_user.hashed_password
     ):
+        crud.refresh_token.revoke_user(db, user_id=current_user.id)
         return crud.user.update_user_password(
             db, user_verification.new_password, current_user
         )
@@ -82,4 +161,5 @@ def update_user_password(
 def delete_user(
     db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
 ):
+    crud.refresh_token.revoke_user(db, user_id=current_user.id)
     return crud.user.deactivate(db, current_user)
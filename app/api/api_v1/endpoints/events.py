@@ -0,0 +1,82 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.api.deps import authenticate_token, get_current_user_id
+from app.core.config import settings
+from app.events.dispatcher import RESYNC, dispatcher
+
+router = APIRouter(prefix="/events", tags=["Todos"])
+
+
+@router.get(
+    "/stream",
+    status_code=status.HTTP_200_OK,
+    summary="Stream current user's todo changes as Server-Sent Events.",
+    operation_id="stream_todo_events",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def stream_todo_events(
+    offset: Optional[int] = Query(
+        default=None, description="Replay events after this event id."
+    ),
+    last_event_id: Optional[str] = Header(default=None),
+    user_id: int = Depends(get_current_user_id),
+):
+    if offset is None and last_event_id and last_event_id.isdigit():
+        offset = int(last_event_id)
+    subscription = await dispatcher.subscribe(user_id, offset)
+
+    async def event_stream():
+        try:
+            while True:
+                event = await subscription.get(settings.EVENT_HEARTBEAT_INTERVAL)
+                if event is None:
+                    yield ": ping\n\n"
+                    continue
+                yield f"id: {event.id}\nevent: {event.kind}\ndata: {event.json()}\n\n"
+                if event is RESYNC:
+                    return
+        finally:
+            dispatcher.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def todo_events_ws(
+    websocket: WebSocket,
+    token: str = Query(...),
+    offset: Optional[int] = Query(default=None),
+):
+    # Browsers cannot set headers on a WebSocket, so the token is a query param.
+    try:
+        user_id = await run_in_threadpool(authenticate_token, token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription = await dispatcher.subscribe(user_id, offset)
+    try:
+        while True:
+            event = await subscription.get(settings.EVENT_HEARTBEAT_INTERVAL)
+            if event is None:
+                await websocket.send_text('{"kind":"ping"}')
+                continue
+            await websocket.send_text(event.json())
+            if event is RESYNC:
+                await websocket.close()
+                return
+    except WebSocketDisconnect:
+        pass
+    finally:
+        dispatcher.unsubscribe(subscription)
@@ -1,18 +1,30 @@
-from typing import List
+from datetime import datetime, timezone
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, status, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from app import crud
 from app.api.deps import get_current_user, get_db, get_current_admin
+from app.api.routing import SessionRoute
+from app.api.fields import sparse_fields, sparse_response
+from app.core.config import settings
 from app.dependencies import raise_404_error, get_authorization_exception
+from app.jobs import queue, tasks  # noqa: F401, registers the tasks
 from app.models.user import User
 from app.schemas import todo_schema
+from app.utils import SyncCursor, decode_sync_token, encode_sync_token
 
 router = APIRouter(
     prefix="/todos",
     tags=["Todos"],
     responses={404: {"description": "Cannot find todo for the provided id."}},
+    route_class=SessionRoute,
+)
+
+todo_fields = sparse_fields(todo_schema.TodoOut)
+include_archived_query = Query(
+    default=False, description="Also list completed todos that were archived."
 )
 
 
@@ -22,12 +34,22 @@ router = APIRouter(
     tags=["Todos"],
     summary="Get all todos. Only for administrators.",
     operation_id="read_all",
+    openapi_extra={"x-deadline-ms": 15000},
+    response_model=List[todo_schema.TodoOut],
 )
 def read_all(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_admin)
+    fields: Optional[List[str]] = Depends(todo_fields),
+    include_archived: bool = include_archived_query,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin),
 ):
     if current_user:
-        return crud.todo.get_multi(db)
+        todos = crud.todo.get_multi_rows(
+            db, columns=fields, include_archived=include_archived
+        )
+        if fields is None:
+            return todos
+        return sparse_response(todos, fields, todo_schema.TodoOut)
 
 
 @router.post(
@@ -52,10 +74,93 @@ def create_todo(
     operation_id="read_todos",
     response_model=List[todo_schema.TodoOut],
 )
-def read_todos(current_user: User = Depends(get_current_user)):
-    if current_user.todos is None:
-        return HTTPException(status_code=status.HTTP_200_OK, detail="No todos created.")
-    return current_user.todos
+def read_todos(
+    fields: Optional[List[str]] = Depends(todo_fields),
+    include_archived: bool = include_archived_query,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    todos = crud.todo.get_rows_by_owner(
+        db,
+        owner_id=current_user.id,
+        columns=fields,
+        include_archived=include_archived,
+    )
+    if fields is None:
+        return todos
+    return sparse_response(todos, fields, todo_schema.TodoOut)
+
+
+@router.get(
+    "/changes",
+    status_code=status.HTTP_200_OK,
+    response_model=todo_schema.TodoChanges,
+    summary="Get current user's todos changed or deleted since a sync token.",
+    operation_id="read_todo_changes",
+    responses={
+        400: {"description": "Invalid sync token."},
+        410: {"description": "Sync token expired; sync again without one."},
+    },
+)
+def read_todo_changes(
+    since: Optional[str] = Query(
+        default=None, description="`next_token` of the previous call."
+    ),
+    limit: int = Query(default=100, gt=0, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    try:
+        cursor = decode_sync_token(since) if since else SyncCursor()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid sync token."
+        )
+    if since:
+        # Deletes older than the watermark may be purged with their tombstones
+        purged_before = crud.todo.get_tombstones_purged_before(db)
+        if purged_before is not None and (
+            cursor.synced_at is None or cursor.synced_at < purged_before
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="Sync token expired; sync again without one.",
+            )
+    changed, deleted, next_cursor, has_more = crud.todo.get_changes(
+        db, owner_id=current_user.id, cursor=cursor, limit=limit
+    )
+    return {
+        "changes": changed,
+        "deleted": [tombstone.todo_id for tombstone in deleted],
+        "next_token": encode_sync_token(next_cursor),
+        "has_more": has_more,
+    }
+
+
+@router.get(
+    "/due",
+    status_code=status.HTTP_200_OK,
+    response_model=List[todo_schema.TodoOut],
+    summary="Get current user's open todos due before a time, soonest first.",
+    operation_id="read_due_todos",
+)
+def read_due_todos(
+    before: Optional[datetime] = Query(
+        default=None, description="UTC unless an offset is given; now by default."
+    ),
+    limit: int = Query(default=100, gt=0, le=1000),
+    fields: Optional[List[str]] = Depends(todo_fields),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    if before is not None and before.tzinfo is not None:
+        before = before.astimezone(timezone.utc).replace(tzinfo=None)
+    todos = crud.todo.get_due(
+        db, owner_id=current_user.id, before=before, limit=limit, columns=fields
+    )
+    if fields is None:
+        return todos
+    return sparse_response(todos, fields, todo_schema.TodoOut)
 
 
 @router.get(
@@ -67,15 +172,19 @@ def read_todos(current_user: User = Depends(get_current_user)):
 )
 def get_todo_by_id(
     todo_id: int,
+    fields: Optional[List[str]] = Depends(todo_fields),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    todo = crud.todo.get(db=db, id=todo_id)
+    columns = None if fields is None else [*fields, "owner_id"]
+    todo = crud.todo.get_row(db=db, id=todo_id, columns=columns)
     if todo is None:
         raise raise_404_error(detail="Cannot find todo for the provided id.")
-    if todo.owner_id == current_user.id:
+    if todo.owner_id != current_user.id:
+        raise get_authorization_exception()
+    if fields is None:
         return todo
-    raise get_authorization_exception()
+    return sparse_response(todo, fields, todo_schema.TodoOut)
 
 
 @router.patch(
@@ -100,6 +209,35 @@ def update_todo(
     raise get_authorization_exception()
 
 
+@router.post(
+    "/{todo_id}/move",
+    status_code=status.HTTP_200_OK,
+    summary="Move current user's todo right after another one, or first.",
+    operation_id="move_todo",
+    response_model=todo_schema.TodoOut,
+)
+def move_todo(
+    todo_id: int,
+    move: todo_schema.TodoMove,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    todo_by_id = crud.todo.get(db=db, id=todo_id)
+    if todo_by_id is None:
+        raise raise_404_error(detail="Cannot find todo for the provided id.")
+    if todo_by_id.owner_id != current_user.id:
+        raise get_authorization_exception()
+    after = None
+    if move.after_id is not None:
+        after = crud.todo.get(db=db, id=move.after_id, include_archived=False)
+        if after is None or after.owner_id != current_user.id:
+            raise raise_404_error(detail="Cannot find todo for the provided after_id.")
+    todo = crud.todo.move(db=db, db_obj=todo_by_id, after=after)
+    if len(todo.position) > settings.TODO_POSITION_REBALANCE_LENGTH:
+        queue.enqueue(db, "rebalance_todos", {"owner_id": current_user.id})
+    return todo
+
+
 @router.delete(
     "/{todo_id}",
     status_code=status.HTTP_200_OK,
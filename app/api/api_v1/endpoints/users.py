@@ -1,9 +1,12 @@
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, status, Depends
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_current_user, get_db, get_current_admin
+from app.api.deps import get_current_user, get_db, get_current_admin, get_loaders
+from app.api.routing import SessionRoute
+from app.api.fields import sparse_fields, sparse_response
+from app.api.loaders import Loaders
 from app.dependencies import raise_404_error, get_authorization_exception
 from app.models.user import User
 from app.schemas import user_schema
@@ -13,20 +16,43 @@ router = APIRouter(
     prefix="/users",
     tags=["Users"],
     responses={404: {"description": "Cannot find user for the provided id"}},
+    route_class=SessionRoute,
 )
 
+user_fields = sparse_fields(user_schema.UserWithAddress)
+
+
+def sparse_users(users, fields: List[str], loaders: Loaders):
+    rows = users if isinstance(users, list) else [users]
+    if "address" in fields:
+        # The first address resolved loads those of every row at once
+        loaders.address.want(*(u.address_id for u in rows))
+    return sparse_response(
+        users,
+        fields,
+        user_schema.UserWithAddress,
+        address=lambda u: loaders.address.load(u.address_id),
+    )
+
 
 @router.get(
     "/all",
     status_code=status.HTTP_200_OK,
     summary="Get all users. Only for administrators.",
     operation_id="get_all_users",
+    openapi_extra={"x-deadline-ms": 15000},
     response_model=List[user_schema.UserWithAddress],
 )
 def get_all_users(
-    db: Session = Depends(get_db), admin: User = Depends(get_current_admin)
+    fields: Optional[List[str]] = Depends(user_fields),
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_current_admin),
+    loaders: Loaders = Depends(get_loaders),
 ):
-    return crud.user.get_multi(db)
+    if fields is None:
+        return loaders.with_addresses(crud.user.get_multi(db))
+    users = crud.user.get_multi_rows(db, columns=[*fields, "address_id"])
+    return sparse_users(users, fields, loaders)
 
 
 @router.get(
@@ -36,8 +62,14 @@ def get_all_users(
     response_model=user_schema.UserWithAddress,
     operation_id="get_user",
 )
-def get_user(current_user: User = Depends(get_current_user)):
-    return current_user
+def get_user(
+    fields: Optional[List[str]] = Depends(user_fields),
+    current_user: User = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders),
+):
+    if fields is None:
+        return current_user
+    return sparse_users(current_user, fields, loaders)
 
 
 @router.get(
@@ -49,17 +81,27 @@ def get_user(current_user: User = Depends(get_current_user)):
 )
 def get_user_by_id(
     user_id: int,
+    fields: Optional[List[str]] = Depends(user_fields),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders),
 ):
-    user = crud.user.get(db, user_id)
+    if current_user.id != user_id and not crud.user.is_admin(current_user):
+        if crud.user.get_row(db, user_id, columns=["id"]) is None:
+            raise raise_404_error(detail="Cannot find user for the provided id.")
+        raise get_authorization_exception()
+
+    if fields is not None:
+        user = crud.user.get_row(db, user_id, columns=[*fields, "address_id"])
+        if user is None:
+            raise raise_404_error(detail="Cannot find user for the provided id.")
+        return sparse_users(user, fields, loaders)
+
+    loaders.user.prime(current_user.id, current_user)
+    user = loaders.user.load(user_id)
     if user is None:
         raise raise_404_error(detail="Cannot find user for the provided id.")
-
-    if current_user.id == user.id:
-        return user
-    if not crud.user.is_admin(current_user):
-        raise get_authorization_exception()
+    loaders.with_addresses([user])
     return user
 
 
@@ -1,11 +1,14 @@
-from fastapi import Depends
+from fastapi import Depends, Request
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from jose import JWTError
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app import crud
+from app.api.loaders import Loaders
 from app.core.config import settings
 from app.core import security
+from app.core.revocation import revocations
 from app.db.session import SessionLocal
 from app.dependencies import get_user_exception, get_authorization_exception
 from app.models.user import User
@@ -13,26 +16,67 @@ from app.models.user import User
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/login")
 
 
-def get_db():
+def get_db(request: Request):
     try:
-        db = SessionLocal()
+        # Loaded attributes stay usable after SessionRoute commits, so the
+        # response is serialized without going back to the database.
+        db = SessionLocal(expire_on_commit=False)
+        # Set by SessionRoute; app.db.deadline turns it into statement timeouts
+        db.info["deadline"] = getattr(request.state, "deadline", None)
         yield db
     finally:
         db.close()
 
 
-async def get_current_user(
+def get_loaders(db: Session = Depends(get_db)) -> Loaders:
+    # Shares the request's session, as FastAPI resolves get_db once per request
+    return Loaders(db)
+
+
+# Sync, so FastAPI runs it in the threadpool: waiting on the pool for a
+# connection must not block the event loop that returns connections
+def get_current_user(
     token: str = Depends(oauth2_bearer), db: Session = Depends(get_db)
 ) -> User:
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=security.ALGORITHM)
+        payload = security.decode_access_token(token)
         username: str = payload.get("sub")
         user_id: int = payload.get("id")
         if username is None or user_id is None:
             raise get_user_exception()
-        return db.query(User).filter(User.id == user_id).first()
+        if revocations.is_revoked(payload.get("jti")):
+            raise get_user_exception()
+        user = crud.user.get(db, user_id)
+    except JWTError:
+        raise get_user_exception()
+    if user is None:
+        raise get_user_exception()
+    return user
+
+
+def authenticate_token(token: str) -> int:
+    """
+    Id of the live user `token` belongs to. The session is closed before
+    returning, so long-lived connections do not hold a DB connection.
+    """
+    try:
+        payload = security.decode_access_token(token)
     except JWTError:
         raise get_user_exception()
+    user_id = payload.get("id")
+    if revocations.is_revoked(payload.get("jti")):
+        raise get_user_exception()
+    db = SessionLocal()
+    try:
+        if user_id is None or crud.user.get(db, user_id) is None:
+            raise get_user_exception()
+    finally:
+        db.close()
+    return user_id
+
+
+async def get_current_user_id(token: str = Depends(oauth2_bearer)) -> int:
+    return await run_in_threadpool(authenticate_token, token)
 
 
 def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
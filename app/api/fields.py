@@ -0,0 +1,86 @@
+import logging
+from typing import Any, Callable, List, Optional, Type
+
+from fastapi import HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+
+def sparse_fields(schema: Type[BaseModel]) -> Callable[..., Optional[List[str]]]:
+    """
+    Dependency for a `fields=` query parameter: a subset of `schema`'s
+    fields, comma separated and/or repeated, or None when the full schema
+    is wanted.
+    """
+    names = ", ".join(schema.__fields__)
+
+    def dependency(
+        fields: Optional[List[str]] = Query(
+            default=None,
+            description=f"Comma separated fields to return, out of: {names}.",
+        )
+    ) -> Optional[List[str]]:
+        if fields is None:
+            return None
+        # Empty segments, as in `id,,title` or a trailing comma, select nothing
+        segments = (f.strip() for value in fields for f in value.split(","))
+        selected = list(dict.fromkeys(f for f in segments if f))
+        if not selected:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"No fields selected. Choose from: {names}.",
+            )
+        unknown = [f for f in selected if f not in schema.__fields__]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(unknown)}. Choose from: {names}.",
+            )
+        return selected
+
+    return dependency
+
+
+def _pick(
+    obj: Any,
+    fields: List[str],
+    schema: Type[BaseModel],
+    resolvers: dict,
+) -> dict:
+    data = {}
+    for name in fields:
+        resolve = resolvers.get(name)
+        value = resolve(obj) if resolve else getattr(obj, name)
+        # Coerced by the schema's own field, nested orm_mode models included
+        value, error = schema.__fields__[name].validate(value, data, loc=name)
+        if error:
+            # Stored data the schema rejects: a server fault, as for a
+            # response_model, but answered rather than left to crash
+            logger.error("%s.%s is invalid: %s", schema.__name__, name, error)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="The response could not be serialized.",
+            )
+        data[name] = value
+    return data
+
+
+def sparse_response(
+    content: Any,
+    fields: List[str],
+    schema: Type[BaseModel],
+    **resolvers: Callable[[Any], Any],
+) -> JSONResponse:
+    """
+    Serialize just `fields` of `content` (an object or a list of them) as
+    `schema` would. A keyword resolver computes a field that is not an
+    attribute of the objects, e.g. a relationship of a projected row.
+    """
+    if isinstance(content, list):
+        data = [_pick(obj, fields, schema, resolvers) for obj in content]
+    else:
+        data = _pick(content, fields, schema, resolvers)
+    return JSONResponse(content=jsonable_encoder(data))
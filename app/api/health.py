@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Response, status
+
+from app.db import warmup
+
+router = APIRouter(tags=["Health"])
+
+
+# Probes are async so they are answered on the event loop even when the
+# threadpool is saturated, and neither of them checks out a DB connection.
+@router.get(
+    "/healthz",
+    status_code=status.HTTP_200_OK,
+    summary="Liveness probe",
+    operation_id="healthz",
+)
+async def healthz():
+    return {"status": "ok"}
+
+
+@router.get(
+    "/readyz",
+    status_code=status.HTTP_200_OK,
+    summary="Readiness probe. Ready once connection warm-up has finished.",
+    operation_id="readyz",
+    responses={503: {"description": "Worker is still warming up."}},
+)
+async def readyz(response: Response):
+    if not warmup.state.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {
+        "status": "ready" if warmup.state.ready else "warming_up",
+        "warmup": warmup.state.as_dict(),
+        "pool": warmup.pool_status(),
+    }
@@ -0,0 +1,101 @@
+from typing import Any, Callable, Dict, Generic, Iterable, List, Optional, TypeVar
+
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app import crud
+from app.models.address import Address
+from app.models.user import User
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class DataLoader(Generic[K, V]):
+    """
+    Coalesces lookups by key into one batch call and memoizes the results.
+
+    Keys passed to `want` are queued; the next `load` or `load_many` fetches
+    every queued key with a single call of `batch_fn`, which returns the
+    values it found keyed by key. Loaders live for one request, so cached
+    values never outlive the session they were loaded with.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[K]], Dict[K, V]]):
+        self.batch_fn = batch_fn
+        self._cache: Dict[K, Optional[V]] = {}
+        self._queue: List[K] = []
+
+    def want(self, *keys: K) -> None:
+        for key in keys:
+            if key is not None and key not in self._cache and key not in self._queue:
+                self._queue.append(key)
+
+    def dispatch(self) -> None:
+        if not self._queue:
+            return
+        keys, self._queue = self._queue, []
+        found = self.batch_fn(keys)
+        for key in keys:
+            self._cache[key] = found.get(key)
+
+    def load(self, key: Optional[K]) -> Optional[V]:
+        if key is None:
+            return None
+        self.want(key)
+        self.dispatch()
+        return self._cache[key]
+
+    def load_many(self, keys: Iterable[Optional[K]]) -> List[Optional[V]]:
+        keys = list(keys)
+        self.want(*keys)
+        self.dispatch()
+        return [self._cache.get(key) for key in keys]
+
+    def prime(self, key: K, value: Optional[V]) -> None:
+        self._cache.setdefault(key, value)
+
+
+class Loaders:
+    """Request-scoped loaders, see `app.api.deps.get_loaders`."""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.user: DataLoader[int, User] = DataLoader(
+            lambda ids: crud.user.get_many(db, ids)
+        )
+        self.address: DataLoader[int, Address] = DataLoader(
+            lambda ids: crud.address.get_many(db, ids)
+        )
+        self.todo = DataLoader(lambda ids: crud.todo.get_many(db, ids))
+        self.user_by_address: DataLoader[int, User] = DataLoader(
+            lambda ids: crud.user.get_many_by_address(db, ids)
+        )
+        self.todos_by_owner = DataLoader(
+            lambda ids: crud.todo.get_many_by_owner(db, ids)
+        )
+
+    def with_addresses(self, users: List[User]) -> List[User]:
+        """Fill in `user.address` for all `users` with one query."""
+        addresses = self.address.load_many(u.address_id for u in users)
+        for u, address in zip(users, addresses):
+            set_committed_value(u, "address", address)
+            if address is not None:
+                self.user_by_address.prime(address.id, u)
+        return users
+
+    def with_users(self, addresses: List[Address]) -> List[Address]:
+        """Fill in `address.user` for all `addresses` with one query."""
+        users = self.user_by_address.load_many(a.id for a in addresses)
+        for address, u in zip(addresses, users):
+            set_committed_value(address, "user", u)
+            if u is not None:
+                self.user.prime(u.id, u)
+        return addresses
+
+    def with_todos(self, users: List[User]) -> List[User]:
+        """Fill in `user.todos` for all `users` with one query."""
+        todos = self.todos_by_owner.load_many(u.id for u in users)
+        for u, user_todos in zip(users, todos):
+            set_committed_value(u, "todos", user_todos or [])
+        return users
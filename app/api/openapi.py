@@ -0,0 +1,170 @@
+"""
+The OpenAPI document and the docs pages.
+
+Rendering the document takes a while, so it is rendered once, compressed,
+and cached on disk under OPENAPI_CACHE_DIR, keyed by a hash of the app's
+source. Workers started later read the cached files instead. Run
+
+    python -m app.api.openapi
+
+at build time to write the cache ahead of the first start.
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Optional
+
+import fastapi
+import pydantic
+from fastapi import FastAPI
+from fastapi.openapi.docs import (
+    get_redoc_html,
+    get_swagger_ui_html,
+    get_swagger_ui_oauth2_redirect_html,
+)
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.config import settings
+from app.middleware.compression import (
+    available_encodings,
+    precompress,
+    select_encoding,
+)
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SUFFIXES = {"identity": "", "gzip": ".gz", "br": ".br"}
+
+
+def source_key(app: FastAPI) -> str:
+    """Changes whenever anything that shapes the document may have changed."""
+    digest = hashlib.sha256(
+        f"{fastapi.__version__}:{pydantic.VERSION}:{app.title}:{app.version}:"
+        f"{settings.API_V1_STR}".encode()
+    )
+    for path in sorted(glob.glob(os.path.join(APP_DIR, "**", "*.py"), recursive=True)):
+        digest.update(os.path.relpath(path, APP_DIR).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class OpenAPIDocument:
+    """
+    The OpenAPI document, rendered to JSON once and kept precompressed
+    for every encoding we serve.
+    """
+
+    def __init__(self, app: FastAPI, cache_dir: Optional[str] = None):
+        self.app = app
+        self.cache_dir = cache_dir
+        self._variants: Optional[Dict[str, bytes]] = None
+
+    def build(self) -> Dict[str, bytes]:
+        if self._variants is None:
+            key = source_key(self.app) if self.cache_dir else None
+            variants = self._load(key) if key else None
+            if variants is None:
+                variants = self._render()
+                if key:
+                    self._store(key, variants)
+            self._variants = variants
+        return self._variants
+
+    def _render(self) -> Dict[str, bytes]:
+        body = json.dumps(
+            self.app.openapi(), ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+        variants = {"identity": body}
+        variants.update(precompress(body))
+        return variants
+
+    def _path(self, key: str, encoding: str) -> str:
+        return os.path.join(self.cache_dir, f"openapi-{key}.json{SUFFIXES[encoding]}")
+
+    def _load(self, key: str) -> Optional[Dict[str, bytes]]:
+        variants = {}
+        for encoding in ["identity", *available_encodings()]:
+            try:
+                with open(self._path(key, encoding), "rb") as f:
+                    variants[encoding] = f.read()
+            except OSError:
+                return None
+        return variants
+
+    def _store(self, key: str, variants: Dict[str, bytes]) -> None:
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for encoding, body in variants.items():
+                path = self._path(key, encoding)
+                # Written aside and renamed, as workers may start concurrently
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(body)
+                os.replace(tmp, path)
+            current = {self._path(key, encoding) for encoding in variants}
+            for path in glob.glob(os.path.join(self.cache_dir, "openapi-*.json*")):
+                if path not in current and not path.endswith(".tmp"):
+                    os.remove(path)
+        except OSError:
+            logger.warning("Cannot cache the OpenAPI document", exc_info=True)
+
+    async def endpoint(self, request: Request) -> Response:
+        variants = self.build()
+        encoding = select_encoding(
+            request.headers.get("accept-encoding", ""),
+            [e for e in variants if e != "identity"],
+        )
+        headers = {"Vary": "Accept-Encoding"}
+        if encoding is None:
+            encoding = "identity"
+        else:
+            headers["Content-Encoding"] = encoding
+        return Response(
+            variants[encoding], media_type="application/json", headers=headers
+        )
+
+
+def setup_openapi(app: FastAPI, openapi_url: str = "/openapi.json") -> OpenAPIDocument:
+    """
+    Serve the cached document at `openapi_url` together with the docs pages.
+    `app` must be created with `openapi_url=None`, so FastAPI does not add
+    its own (uncached) routes.
+    """
+    document = OpenAPIDocument(app, cache_dir=settings.OPENAPI_CACHE_DIR or None)
+    oauth2_redirect_url = "/docs/oauth2-redirect"
+
+    async def swagger_ui_html(request: Request) -> Response:
+        return get_swagger_ui_html(
+            openapi_url=openapi_url,
+            title=f"{app.title} - Swagger UI",
+            oauth2_redirect_url=oauth2_redirect_url,
+        )
+
+    async def swagger_ui_redirect(request: Request) -> Response:
+        return get_swagger_ui_oauth2_redirect_html()
+
+    async def redoc_html(request: Request) -> Response:
+        return get_redoc_html(openapi_url=openapi_url, title=f"{app.title} - ReDoc")
+
+    app.add_route(openapi_url, document.endpoint, include_in_schema=False)
+    app.add_route("/docs", swagger_ui_html, include_in_schema=False)
+    app.add_route(oauth2_redirect_url, swagger_ui_redirect, include_in_schema=False)
+    app.add_route("/redoc", redoc_html, include_in_schema=False)
+    return document
+
+
+def main() -> None:
+    from app.main import openapi_document
+
+    openapi_document.build()
+    print(openapi_document.cache_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import asyncio
+import functools
+import time
+from typing import Any, Callable, Coroutine, Dict, Optional
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+from app.core.config import settings
+from app.db.deadline import DeadlineExceeded
+
+
+def release_sessions(values: Dict[str, Any]) -> None:
+    """
+    Commit the request's session (an endpoint argument itself, or the
+    session of its Loaders): its changes as one transaction, and its
+    connection back to the pool.
+    """
+    sessions = {}
+    for value in values.values():
+        db = value if isinstance(value, Session) else getattr(value, "db", None)
+        if isinstance(db, Session):
+            sessions[id(db)] = db
+    for db in sessions.values():
+        if db.in_transaction() or db.new or db.dirty or db.deleted:
+            db.commit()
+
+
+class SessionRoute(APIRoute):
+    """
+    Route whose request is a unit of work: app.crud only flushes, and the
+    session is committed once, when the endpoint returns. An endpoint that
+    raises commits nothing; get_db rolls back. Committing before the
+    response is validated and serialized (for a long list, much of the
+    request) and sent also gives the connection back early. get_db opens
+    sessions with expire_on_commit=False, so serializing does not query
+    again. Sessions connect lazily, on their first query, so a route that
+    never queries never checks out a connection.
+
+    The request's queries must finish within the route's deadline, declared
+    as openapi_extra={"x-deadline-ms": N} (see app.db.deadline).
+    """
+
+    @property
+    def deadline_ms(self) -> Optional[int]:
+        return (self.openapi_extra or {}).get(
+            "x-deadline-ms", settings.REQUEST_DEADLINE_MS
+        )
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        call = self.dependant.call
+        if call is not None and not getattr(call, "releases_sessions", False):
+            self.dependant.call = self._wrap(call)
+        handler = super().get_route_handler()
+        deadline_ms = self.deadline_ms
+        if deadline_ms is None:
+            return handler
+
+        async def route_handler(request: Request) -> Response:
+            request.state.deadline = time.monotonic() + deadline_ms / 1000
+            return await handler(request)
+
+        return route_handler
+
+    @staticmethod
+    def _wrap(call: Callable[..., Any]) -> Callable[..., Any]:
+        if asyncio.iscoroutinefunction(call):
+
+            @functools.wraps(call)
+            async def endpoint(**values: Any) -> Any:
+                result = await call(**values)
+                await run_in_threadpool(release_sessions, values)
+                return result
+
+        else:
+
+            @functools.wraps(call)
+            def endpoint(**values: Any) -> Any:
+                result = call(**values)
+                release_sessions(values)
+                return result
+
+        endpoint.releases_sessions = True  # type: ignore
+        return endpoint
+
+
+async def deadline_exceeded(request: Request, exc: DeadlineExceeded) -> Response:
+    return JSONResponse(
+        {"detail": "The request took too long and was cancelled."}, status_code=504
+    )
+
+
+async def pool_timeout(request: Request, exc: PoolTimeout) -> Response:
+    # Every connection is busy; the client may retry once some are back
+    return JSONResponse(
+        {"detail": "Server is busy. Try again later."},
+        status_code=503,
+        headers={"Retry-After": str(settings.LOAD_SHED_RETRY_AFTER)},
+    )
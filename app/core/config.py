@@ -10,8 +10,9 @@ load_dotenv()
 class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     SECRET_KEY = os.environ.get("JWT_SECRET_KEY")
-    # 60 minutes * 24 hours * 8 days = 8 days
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    # Access tokens are short-lived; clients renew them at /auth/refresh
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
     # SERVER_NAME: str
     # SERVER_HOST: AnyHttpUrl
     # BACKEND_CORS_ORIGINS is a JSON-formatted list of origins
@@ -34,10 +35,182 @@ class Settings(BaseSettings):
     DB_HOST: str = os.environ.get("DB_HOST")
     DB_NAME: str = os.environ.get("DB_NAME")
     DB_PORT: str = os.environ.get("DB_PORT")
+    # Or e.g. sqlite:////var/lib/todo/todo.db for a single node (app.db.sqlite)
     SQLALCHEMY_DATABASE_URL: str = (
         f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     )
 
+    # Password hashing, comma separated passlib scheme names. The first
+    # scheme hashes new passwords; hashes made with the others are redone on
+    # login. "argon2" needs the argon2-cffi package.
+    PASSWORD_SCHEMES: str = "bcrypt"
+
+    @validator("PASSWORD_SCHEMES")
+    def check_password_schemes(cls, v: str) -> str:
+        from passlib.registry import get_crypt_handler
+
+        unknown = [
+            name
+            for name in (n.strip() for n in v.split(","))
+            if name and get_crypt_handler(name, None) is None
+        ]
+        if unknown:
+            raise ValueError(f"Unknown password schemes: {', '.join(unknown)}")
+        return v
+
+    # New bcrypt hashes use BCRYPT_ROUNDS, the same on every host (pick it
+    # with benchmarks.password_hashing --target-ms). Only hashes below
+    # BCRYPT_MIN_ROUNDS are redone on login; stronger ones are kept.
+    BCRYPT_MIN_ROUNDS: int = 12
+    BCRYPT_ROUNDS: int = 12
+
+    @validator("BCRYPT_ROUNDS")
+    def check_bcrypt_rounds(cls, v: int, values: Dict[str, Any]) -> int:
+        floor = values.get("BCRYPT_MIN_ROUNDS")
+        if floor is not None and v < floor:
+            raise ValueError(
+                f"BCRYPT_ROUNDS must be at least BCRYPT_MIN_ROUNDS ({floor})"
+            )
+        return v
+
+    # Revoked access tokens: each worker syncs new revocations this often,
+    # and rebuilds its filter (dropping expired tokens) every reload interval
+    REVOCATION_SYNC_INTERVAL: float = 5.0
+    REVOCATION_RELOAD_INTERVAL: int = 60 * 60
+    # Ids skipped by a sync (their insert had not committed yet) are looked
+    # up again for this long; longer than any transaction that revokes
+    REVOCATION_GAP_TIMEOUT: float = 60.0
+    # Revocations the filter is sized for at the given false positive rate
+    REVOCATION_FILTER_CAPACITY: int = 1_000_000
+    REVOCATION_FILTER_ERROR_RATE: float = 0.001
+
+    # Connection pool
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 60 * 30
+    # Number of pooled connections opened before the worker reports ready
+    DB_POOL_WARMUP: int = 5
+    # Milliseconds a request's queries may run, counted from when its route
+    # is reached, unless the route declares openapi_extra={"x-deadline-ms": N}
+    # (None for no deadline). Past it queries are cancelled and the request
+    # answered with 504.
+    REQUEST_DEADLINE_MS: Optional[int] = 5000
+
+    # SQLite: milliseconds a writer waits for the lock before "database is
+    # locked", and bytes of the file read through mmap
+    SQLITE_BUSY_TIMEOUT: int = 5000
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 256 * 2**20
+
+    # Token bucket rate limiting, keyed by user id (or client IP on auth routes)
+    RATE_LIMIT_ENABLED: bool = True
+    # "memory", "redis" or "fake-redis" (in-process stand-in for local runs)
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_REDIS_URL: Optional[str] = None
+    RATE_LIMIT_PER_SECOND: float = 10.0
+    RATE_LIMIT_BURST: int = 40
+    AUTH_RATE_LIMIT_PER_SECOND: float = 1.0
+    AUTH_RATE_LIMIT_BURST: int = 5
+    # Load shedding: answer 503 once this many requests are in flight
+    MAX_IN_FLIGHT_REQUESTS: int = 200
+    LOAD_SHED_RETRY_AFTER: int = 1
+
+    # Response compression (brotli is used when the package is installed)
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4
+
+    # /todos/changes returns rows stamped at least this many seconds ago.
+    # Rows are stamped when flushed but seen only once committed, which can
+    # be as late as the end of the request (REQUEST_DEADLINE_MS), so a
+    # sync token must not move past a stamp that may still commit.
+    SYNC_COMMIT_LAG: int = 10
+
+    # Soft-deleted rows and todo tombstones are purged after this many days;
+    # /todos/changes then answers 410 to sync tokens older than the purge
+    SOFT_DELETE_RETENTION_DAYS: int = 30
+    COMPACTION_BATCH_SIZE: int = 500
+    # Seconds to sleep between compaction batches
+    COMPACTION_BATCH_PAUSE: float = 0.1
+
+    # Online migrations (app.db.online_migration): ids per backfill batch to
+    # start with, adjusted so each batch takes about BATCH_SECONDS
+    ONLINE_MIGRATION_BATCH_SIZE: int = 1000
+    ONLINE_MIGRATION_BATCH_SECONDS: float = 0.5
+    ONLINE_MIGRATION_BATCH_PAUSE: float = 0.1
+    # Seconds DDL waits for a table's metadata lock before retrying (MySQL)
+    ONLINE_MIGRATION_LOCK_WAIT_TIMEOUT: int = 5
+    ONLINE_MIGRATION_LOCK_RETRIES: int = 10
+
+    # Completed todos untouched for this many days move to todo_archive
+    TODO_ARCHIVE_AFTER_DAYS: int = 30
+    ARCHIVE_BATCH_SIZE: int = 500
+
+    # Background jobs (python -m app.jobs.worker)
+    JOB_WORKER_CONCURRENCY: int = 4
+    JOB_POLL_INTERVAL: float = 1.0
+    # A running job whose worker went silent this long is handed out again;
+    # workers renew the locks of the jobs they run every heartbeat interval
+    JOB_LOCK_TIMEOUT: int = 60 * 10
+    JOB_HEARTBEAT_INTERVAL: float = 60.0
+    # Polling backs off up to this long while claiming keeps failing
+    JOB_CLAIM_MAX_BACKOFF: float = 60.0
+    JOB_RETRY_BASE_DELAY: float = 5.0
+    JOB_RETRY_MAX_DELAY: float = 60 * 60
+    # Finished and failed jobs are purged by compaction after this many days
+    JOB_RETENTION_DAYS: int = 7
+
+    # Due date reminders (python -m app.jobs.reminders): todos due within the
+    # next window are held in a timer wheel of TICK second slots, the rest
+    # stay in the database. Reminders more than MAX_LATENESS seconds overdue
+    # (after downtime, or for todos given a past due date) are skipped.
+    REMINDER_WINDOW: int = 60 * 5
+    REMINDER_TICK: float = 1.0
+    REMINDER_MAX_LATENESS: int = 60 * 60
+
+    # Manual todo order: moving a todo into the same gap again and again
+    # lengthens its key. Once one is longer than this, the owner's keys are
+    # rebalanced in the background (the "rebalance_todos" job).
+    TODO_POSITION_REBALANCE_LENGTH: int = 16
+
+    # Todo event stream (WebSocket / SSE fed from the todo_event outbox)
+    EVENT_POLL_INTERVAL: float = 0.5
+    # Events buffered per connection before a slow client is cut off
+    EVENT_BUFFER_SIZE: int = 100
+    # Most events replayed on resume; further behind means a full resync
+    EVENT_REPLAY_LIMIT: int = 1000
+    # Outbox ids skipped by a poll (their insert had not committed yet) are
+    # looked up again for this long, and their events published late
+    EVENT_GAP_TIMEOUT: float = 60.0
+    EVENT_HEARTBEAT_INTERVAL: float = 15.0
+    EVENT_RETENTION_DAYS: int = 7
+
+    # python -m app.serve; 0 workers means one per CPU available to the process
+    SERVE_BIND: str = "0.0.0.0:8000"
+    SERVE_WORKERS: int = 0
+    SERVE_TIMEOUT: int = 60
+    # Seconds a stopping worker gets to finish its in-flight requests
+    SERVE_GRACEFUL_TIMEOUT: int = 30
+    SERVE_KEEPALIVE: int = 5
+    # Workers are replaced after this many requests (0 to never), staggered
+    # by up to the jitter so they do not all restart at once
+    SERVE_MAX_REQUESTS: int = 10000
+    SERVE_MAX_REQUESTS_JITTER: int = 1000
+
+    # Rendered OpenAPI documents are cached here; empty to disable
+    OPENAPI_CACHE_DIR: str = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache"
+    )
+
+    # Idempotency-Key support for POST endpoints; "memory" or "database"
+    IDEMPOTENCY_BACKEND: str = "memory"
+    IDEMPOTENCY_TTL: int = 60 * 60 * 24
+    # Seconds a key stays "in progress" (409 to retries) unless its request
+    # finishes first. Longer than a request runs (REQUEST_DEADLINE_MS), yet
+    # short, so a key whose worker died mid-request can be retried soon.
+    IDEMPOTENCY_LEASE: int = 30
+
     # @validator("SQLALCHEMY_DATABASE_URI", pre=True)
     # def assemble_db_connection(cls, v: Optional[str], values: Dict[str, Any]) -> Any:
     #     if isinstance(v, str):
@@ -68,7 +241,7 @@ class Settings(BaseSettings):
     EMAIL_TEMPLATES_DIR: str = "/app/app/email-templates/build"
     EMAILS_ENABLED: bool = False
 
-    @validator("EMAILS_ENABLED", pre=True)
+    @validator("EMAILS_ENABLED", pre=True, always=True)
     def get_emails_enabled(cls, v: bool, values: Dict[str, Any]) -> bool:
         return bool(
             values.get("SMTP_HOST")
@@ -0,0 +1,111 @@
+"""
+Order keys that always have room between them, so an item moves by taking
+a new key between its neighbours' without renumbering the others.
+
+Keys are base 62 strings compared byte by byte: an integer part, whose
+first character encodes its length ("a0".."az", then "b00".. upwards,
+"Zz".."Z0", then "Yzz".. downwards), then an optional fraction without
+trailing zeros. Appending steps the integer part, so keys made one after
+another stay short; a key between two neighbours extends the fraction by
+about one character per six splits of the same gap.
+"""
+
+from typing import Optional
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+ZERO = DIGITS[0]
+# The smallest integer part; nothing sorts before it
+SMALLEST_INTEGER = "A" + ZERO * 26
+
+
+def _integer_length(head: str) -> int:
+    if "a" <= head <= "z":
+        return ord(head) - ord("a") + 2
+    if "A" <= head <= "Z":
+        return ord("Z") - ord(head) + 2
+    raise ValueError(f"Invalid order key head: {head!r}")
+
+
+def _split(key: str):
+    length = _integer_length(key[0]) if key else 0
+    if not key or length > len(key) or key == SMALLEST_INTEGER:
+        raise ValueError(f"Invalid order key: {key!r}")
+    integer, fraction = key[:length], key[length:]
+    if fraction.endswith(ZERO):
+        raise ValueError(f"Invalid order key: {key!r}")
+    return integer, fraction
+
+
+def _midpoint(a: str, b: Optional[str]) -> str:
+    """A fraction between fractions `a` and `b` (None: 1)."""
+    if b is not None:
+        n = 0
+        while (a[n] if n < len(a) else ZERO) == b[n]:
+            n += 1
+        if n:
+            return b[:n] + _midpoint(a[n:], b[n:])
+    low = DIGITS.index(a[0]) if a else 0
+    high = DIGITS.index(b[0]) if b is not None else BASE
+    if high - low > 1:
+        return DIGITS[(low + high + 1) // 2]
+    if b is not None and len(b) > 1:
+        return b[0]
+    return DIGITS[low] + _midpoint(a[1:], None)
+
+
+def _step(integer: str, delta: int) -> Optional[str]:
+    """The integer part after (delta=1) or before (delta=-1) `integer`."""
+    head, digits = integer[0], list(integer[1:])
+    for i in reversed(range(len(digits))):
+        d = DIGITS.index(digits[i]) + delta
+        if 0 <= d < BASE:
+            digits[i] = DIGITS[d]
+            return head + "".join(digits)
+        digits[i] = ZERO if delta > 0 else DIGITS[-1]
+    # Carried out of the last digit: one digit more or less
+    if delta > 0:
+        if head == "z":
+            return None
+        if head == "Z":
+            return "a" + ZERO
+        head = chr(ord(head) + 1)
+        return head + "".join(digits + [ZERO] if head > "a" else digits[1:])
+    if head == "A":
+        return None
+    if head == "a":
+        return "Z" + DIGITS[-1]
+    head = chr(ord(head) - 1)
+    return head + "".join(digits + [DIGITS[-1]] if head < "Z" else digits[1:])
+
+
+def key_between(a: Optional[str], b: Optional[str]) -> str:
+    """
+    A key sorting after `a` and before `b`; None stands for the start and
+    the end. Raises ValueError unless a < b.
+    """
+    if a is not None and b is not None and a >= b:
+        raise ValueError(f"Order keys out of order: {a!r} >= {b!r}")
+    if a is None:
+        if b is None:
+            return "a" + ZERO
+        integer, fraction = _split(b)
+        if integer == SMALLEST_INTEGER:
+            return integer + _midpoint("", fraction)
+        if fraction:
+            return integer
+        before = _step(integer, -1)
+        if before is None:
+            raise ValueError("No order key before the smallest one")
+        return before
+    integer, fraction = _split(a)
+    if b is None:
+        after = _step(integer, 1)
+        return integer + _midpoint(fraction, None) if after is None else after
+    b_integer, b_fraction = _split(b)
+    if integer == b_integer:
+        return integer + _midpoint(fraction, b_fraction)
+    after = _step(integer, 1)
+    if after is not None and after < b:
+        return after
+    return integer + _midpoint(fraction, None)
@@ -0,0 +1,267 @@
+"""
+In-memory view of the revoked_token table, so that checking an access token
+for revocation costs no database round trip.
+
+A bloom filter answers "certainly not revoked" for almost every token. Its
+rare hits are confirmed against the exact set of revoked tokens, stored as
+sorted 64-bit digests (8 bytes per token) rather than as strings. Each
+worker tails the table every REVOCATION_SYNC_INTERVAL seconds, so a token
+revoked on another worker is refused there within that interval.
+
+Ids are handed out when a row is inserted but become visible when its
+transaction commits, not necessarily in order. Ids the tail skips over are
+looked up again on every sync for REVOCATION_GAP_TIMEOUT seconds, which
+covers transactions still open when the higher ids were read; ids of
+rolled back inserts never show up and are given up.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import itertools
+import logging
+import math
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.revoked_token import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# Most skipped ids kept for another look; beyond that the oldest are dropped
+MAX_GAPS = 100_000
+
+
+def _digest(key: str) -> Tuple[int, int]:
+    digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, h1: int, h2: int) -> Iterable[int]:
+        # Double hashing: k positions out of two independent hashes
+        size = self.size
+        return ((h1 + i * h2) % size for i in range(self.hashes))
+
+    def add_digest(self, h1: int, h2: int) -> None:
+        bits = self.bits
+        for position in self._positions(h1, h2):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def contains_digest(self, h1: int, h2: int) -> bool:
+        bits = self.bits
+        for position in self._positions(h1, h2):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def add(self, key: str) -> None:
+        self.add_digest(*_digest(key))
+
+    def __contains__(self, key: str) -> bool:
+        return self.contains_digest(*_digest(key))
+
+
+class RevocationList:
+    def __init__(
+        self,
+        capacity: int = settings.REVOCATION_FILTER_CAPACITY,
+        error_rate: float = settings.REVOCATION_FILTER_ERROR_RATE,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.last_id = 0
+        # Ids below last_id not seen yet, with when they were first missed
+        self._gaps: Dict[int, float] = {}
+        self.loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        # (bloom filter, sorted digests, recent digests), replaced as a whole
+        # so that readers never need the lock. Recent additions are merged
+        # into the sorted digests in bulk.
+        self._state: Tuple[BloomFilter, array, Set[int]] = self._empty(capacity)
+
+    def _empty(self, capacity: int) -> Tuple[BloomFilter, array, Set[int]]:
+        return BloomFilter(capacity, self.error_rate), array("Q"), set()
+
+    def __len__(self) -> int:
+        _, digests, recent = self._state
+        return len(digests) + len(recent)
+
+    def add_many(self, jtis: Iterable[str]) -> None:
+        with self._lock:
+            bloom, digests, recent = self._state
+            for jti in jtis:
+                h1, h2 = _digest(jti)
+                bloom.add_digest(h1, h2)
+                recent.add(h1)
+            # Merging costs a sort of everything, so it is done ever more rarely
+            if len(recent) > max(10_000, len(digests) // 16):
+                merged = array("Q", sorted(itertools.chain(digests, recent)))
+                self._state = (bloom, merged, set())
+
+    def add(self, jti: str) -> None:
+        self.add_many([jti])
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if jti is None:
+            return False
+        bloom, digests, recent = self._state
+        h1, h2 = _digest(jti)
+        if not bloom.contains_digest(h1, h2):
+            return False
+        if h1 in recent:
+            return True
+        i = bisect.bisect_left(digests, h1)
+        return i < len(digests) and digests[i] == h1
+
+    def _fetch(
+        self, after: int, now: Optional[datetime] = None
+    ) -> List[Tuple[int, str, datetime]]:
+        db = SessionLocal()
+        try:
+            query = select(
+                RevokedToken.id, RevokedToken.jti, RevokedToken.created_at
+            ).where(RevokedToken.id > after)
+            if now is not None:
+                query = query.where(RevokedToken.expires_at > now)
+            return db.execute(query.order_by(RevokedToken.id).limit(10_000)).all()
+        finally:
+            db.close()
+
+    def _fetch_ids(self, ids: List[int]) -> List[Tuple[int, str]]:
+        db = SessionLocal()
+        try:
+            rows = []
+            for start in range(0, len(ids), 1000):
+                query = select(RevokedToken.id, RevokedToken.jti).where(
+                    RevokedToken.id.in_(ids[start : start + 1000])
+                )
+                rows.extend(db.execute(query).all())
+            return rows
+        finally:
+            db.close()
+
+    def _note_gaps(self, after: int, ids: Iterable[int]) -> None:
+        """Remember the ids above `after` that `ids` (ascending) skip."""
+        now = time.monotonic()
+        previous = after
+        for id in ids:
+            for missing in range(previous + 1, id):
+                self._gaps[missing] = now
+            previous = max(previous, id)
+        if len(self._gaps) > MAX_GAPS:
+            logger.warning(
+                "%d revocation ids missing, dropping the oldest", len(self._gaps)
+            )
+            for missing in sorted(self._gaps)[: len(self._gaps) - MAX_GAPS]:
+                del self._gaps[missing]
+
+    def sync(self) -> int:
+        """Add revocations made since the last sync. Returns how many."""
+        added = 0
+        while True:
+            rows = self._fetch(self.last_id)
+            if not rows:
+                break
+            self._note_gaps(self.last_id, (row.id for row in rows))
+            self.add_many(row.jti for row in rows)
+            self.last_id = rows[-1][0]
+            added += len(rows)
+        if self._gaps:
+            rows = self._fetch_ids(sorted(self._gaps))
+            self.add_many(row.jti for row in rows)
+            for row in rows:
+                del self._gaps[row.id]
+            added += len(rows)
+            # Rolled back, or still uncommitted after a generous while
+            cutoff = time.monotonic() - settings.REVOCATION_GAP_TIMEOUT
+            for id, missed_at in list(self._gaps.items()):
+                if missed_at < cutoff:
+                    del self._gaps[id]
+        return added
+
+    def reload(self) -> int:
+        """Rebuild from the unexpired revocations only. Returns how many."""
+        db = SessionLocal()
+        try:
+            # The database clock, which stamped expires_at
+            now = db.scalar(select(func.now()))
+            count = db.scalar(
+                select(func.count(RevokedToken.id)).where(RevokedToken.expires_at > now)
+            )
+        finally:
+            db.close()
+        # Leave room to grow until the next reload
+        self.capacity = max(self.capacity, count * 2)
+        bloom, _, _ = state = self._empty(self.capacity)
+        digests = []
+        last_id = 0
+        # A row inserted before `since` cannot be missing the row of a
+        # transaction still open, so only ids missing after it are gaps
+        since = now - timedelta(seconds=settings.REVOCATION_GAP_TIMEOUT)
+        floor = 0
+        recent: List[int] = []
+        while True:
+            rows = self._fetch(last_id, now)
+            if not rows:
+                break
+            for row in rows:
+                h1, h2 = _digest(row.jti)
+                bloom.add_digest(h1, h2)
+                digests.append(h1)
+                if row.created_at is None or row.created_at < since:
+                    floor = row.id
+                else:
+                    recent.append(row.id)
+            last_id = rows[-1].id
+        self._note_gaps(floor, [id for id in recent if id > floor])
+        state[1].extend(sorted(digests))
+        with self._lock:
+            self._state = state
+            self.last_id = max(self.last_id, last_id)
+        self.loaded_at = time.monotonic()
+        return len(digests)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if (
+                    self.loaded_at is None
+                    or time.monotonic() - self.loaded_at
+                    > settings.REVOCATION_RELOAD_INTERVAL
+                ):
+                    await run_in_threadpool(self.reload)
+                else:
+                    await run_in_threadpool(self.sync)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Syncing revoked tokens failed")
+            await asyncio.sleep(settings.REVOCATION_SYNC_INTERVAL)
+
+
+revocations = RevocationList()
@@ -1,11 +1,44 @@
-from typing import Union
+import logging
+import time
+import uuid
+from typing import List, Optional, Tuple, Union
 from datetime import datetime, timedelta
+from passlib.registry import get_crypt_handler
 from passlib.context import CryptContext
 from jose import jwt
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
 
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def password_schemes(names: str = settings.PASSWORD_SCHEMES) -> List[str]:
+    """Configured schemes whose backend is installed; bcrypt is always kept."""
+    schemes = []
+    for name in (n.strip() for n in names.split(",")):
+        if not name or name in schemes:
+            continue
+        if not get_crypt_handler(name).has_backend():
+            logger.warning("Password scheme %s is not installed, skipping it", name)
+            continue
+        schemes.append(name)
+    if "bcrypt" not in schemes:
+        # Existing hashes must keep verifying
+        schemes.append("bcrypt")
+    return schemes
+
+
+def bcrypt_settings(rounds: int, min_rounds: int) -> dict:
+    # Only a floor: needs_update() flags hashes weaker than min_rounds, never
+    # stronger ones, so hosts and releases with different rounds don't keep
+    # rehashing each other's passwords.
+    return {"bcrypt__default_rounds": rounds, "bcrypt__min_rounds": min_rounds}
+
+
+bcrypt_context = CryptContext(
+    schemes=password_schemes(),
+    deprecated="auto",
+    **bcrypt_settings(settings.BCRYPT_ROUNDS, settings.BCRYPT_MIN_ROUNDS),
+)
 ALGORITHM = "HS256"
 
 
@@ -17,10 +50,43 @@ def verify_password(plain_password, hashed_password):
     return bcrypt_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify like `verify_password`. When the hash is valid but made with a
+    deprecated scheme or fewer than BCRYPT_MIN_ROUNDS, also return its
+    replacement.
+    """
+    return bcrypt_context.verify_and_update(plain_password, hashed_password)
+
+
+def calibrate_bcrypt_rounds(
+    target_ms: float, min_rounds: int = 8, max_rounds: int = 16
+) -> int:
+    """
+    The most bcrypt rounds whose hash takes at most `target_ms` here. Each
+    round doubles the cost, so one timed hash at `min_rounds` predicts the
+    rest.
+    """
+    probe = CryptContext(schemes=["bcrypt"], bcrypt__rounds=min_rounds)
+    probe.hash("calibration")  # load the backend first
+    started = time.perf_counter()
+    probe.hash("calibration")
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    rounds = min_rounds
+    while (
+        rounds < max_rounds and elapsed_ms * 2 ** (rounds + 1 - min_rounds) <= target_ms
+    ):
+        rounds += 1
+    return rounds
+
+
 def create_access_token(
     username: str, user_id: int, expires_delta: Union[timedelta, None] = None
 ):
-    to_encode = {"sub": username, "id": user_id}
+    # jti identifies the token for revocation (see app.core.revocation)
+    to_encode = {"sub": username, "id": user_id, "jti": uuid.uuid4().hex}
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
@@ -28,3 +94,7 @@ def create_access_token(
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+
+
+def decode_access_token(token: str) -> dict:
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=ALGORITHM)
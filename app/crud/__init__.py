@@ -1,2 +1,4 @@
+from .crud_address import address
 from .crud_todo import todo
 from .crud_user import user
+from .crud_token import refresh_token
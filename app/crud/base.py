@@ -1,8 +1,24 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from collections import namedtuple
+from typing import (
+    Any,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql import Select, func
 
 from app.db.base_class import Base
 
@@ -18,22 +34,110 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         **Parameters**
         * `model`: A SQLAlchemy model class
         * `schema`: A Pydantic model (schema) class
+
+        Methods flush but never commit: the caller's unit of work (for a
+        request, SessionRoute) commits once, or rolls back on an error.
         """
         self.model = model
+        self.soft_delete = hasattr(model, "deleted_at")
+        # Read-only rows with one field per mapped column. Named tuples have
+        # no per-instance dict, and orm_mode schemas read them like models.
+        self.columns = [column.key for column in model.__table__.columns]
+        self.row_type = namedtuple(f"{model.__name__}Row", self.columns)
+        self._row_types = {tuple(self.columns): self.row_type}
+
+    def _query(self, db: Session, include_deleted: bool = False) -> Query:
+        query = db.query(self.model)
+        if self.soft_delete and not include_deleted:
+            query = query.filter(self.model.deleted_at.is_(None))
+        return query
+
+    def _select_rows(
+        self, include_deleted: bool = False, columns: Optional[Sequence[str]] = None
+    ) -> Select:
+        """
+        Select `columns` (all of them by default) of live rows. Names that are
+        not columns, such as relationships, are skipped; `id` is always
+        selected.
+        """
+        if columns is None:
+            selected = self.columns
+        else:
+            wanted = set(columns) | {"id"}
+            selected = [column for column in self.columns if column in wanted]
+        query = select(*[getattr(self.model, column) for column in selected])
+        if self.soft_delete and not include_deleted:
+            query = query.where(self.model.deleted_at.is_(None))
+        return query
+
+    def _row_type(self, columns: Tuple[str, ...]):
+        row_type = self._row_types.get(columns)
+        if row_type is None:
+            row_type = namedtuple(f"{self.model.__name__}Row", columns)
+            self._row_types[columns] = row_type
+        return row_type
 
-    def get(self, db: Session, id: Any) -> Optional[ModelType]:
-        return db.query(self.model).filter(self.model.id == id).first()
+    def _rows(self, db: Session, query: Select) -> List[NamedTuple]:
+        columns = tuple(column.key for column in query.selected_columns)
+        make = self._row_type(columns)._make
+        return [make(row) for row in db.execute(query)]
+
+    def get(
+        self, db: Session, id: Any, *, include_deleted: bool = False
+    ) -> Optional[ModelType]:
+        return self._query(db, include_deleted).filter(self.model.id == id).first()
+
+    def get_many(
+        self, db: Session, ids: Iterable[Any], *, include_deleted: bool = False
+    ) -> Dict[Any, ModelType]:
+        """Fetch `ids` with one `IN` query, keyed by id. Missing ids are left out."""
+        ids = set(ids)
+        if not ids:
+            return {}
+        objs = self._query(db, include_deleted).filter(self.model.id.in_(ids))
+        return {obj.id: obj for obj in objs}
 
     def get_multi(
-        self, db: Session, *, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        include_deleted: bool = False,
     ) -> List[ModelType]:
-        return db.query(self.model).offset(skip).limit(limit).all()
+        return self._query(db, include_deleted).offset(skip).limit(limit).all()
+
+    def get_row(
+        self,
+        db: Session,
+        id: Any,
+        *,
+        include_deleted: bool = False,
+        columns: Optional[Sequence[str]] = None,
+    ) -> Optional[NamedTuple]:
+        """Like `get`, but a read-only row instead of a model instance."""
+        query = self._select_rows(include_deleted, columns).where(self.model.id == id)
+        rows = self._rows(db, query)
+        return rows[0] if rows else None
+
+    def get_multi_rows(
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: Optional[int] = 100,
+        include_deleted: bool = False,
+        columns: Optional[Sequence[str]] = None,
+    ) -> List[NamedTuple]:
+        """Like `get_multi`, but read-only rows instead of model instances."""
+        query = self._select_rows(include_deleted, columns).order_by(self.model.id)
+        return self._rows(db, query.offset(skip).limit(limit))
 
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
         obj_in_data = jsonable_encoder(obj_in)
         db_obj = self.model(**obj_in_data)  # type: ignore
         db.add(db_obj)
-        db.commit()
+        db.flush()
         db.refresh(db_obj)
         return db_obj
 
@@ -42,8 +146,17 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db: Session,
         *,
         db_obj: ModelType,
-        obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
     ) -> ModelType:
+        self._apply_update(db_obj, obj_in)
+        db.add(db_obj)
+        db.flush()
+        db.refresh(db_obj)
+        return db_obj
+
+    def _apply_update(
+        self, db_obj: ModelType, obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+    ) -> None:
         obj_data = jsonable_encoder(db_obj)
         if isinstance(obj_in, dict):
             update_data = obj_in
@@ -52,13 +165,15 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         for field in obj_data:
             if field in update_data:
                 setattr(db_obj, field, update_data[field])
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
 
     def remove(self, db: Session, *, id: int) -> ModelType:
         obj = db.query(self.model).get(id)
+        if self.soft_delete:
+            obj.deleted_at = func.now()
+            db.add(obj)
+            db.flush()
+            db.refresh(obj)
+            return obj
         db.delete(obj)
-        db.commit()
+        db.flush()
         return obj
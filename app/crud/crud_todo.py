@@ -1,22 +1,473 @@
-from fastapi.encoders import jsonable_encoder
+import json
+from datetime import datetime, timedelta
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from sqlalchemy import and_, bindparam, false, null, or_, select, update
 from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select, func
 
+from app.core.config import settings
+from app.core.fractional_index import key_between
 from app.crud.base import CRUDBase
+from app.db.archival import shared_columns
+from app.db.types import ORDER_KEY_LENGTH, utc_now
+from app.models.purge_watermark import PurgeWatermark
 from app.models.todo import Todo
-from app.schemas.todo_schema import TodoCreate, TodoUpdate
+from app.models.todo_archive import TodoArchive
+from app.models.todo_event import TodoEvent
+from app.models.todo_tombstone import TodoTombstone
+from app.models.user import User
+from app.schemas.todo_schema import TodoCreate, TodoOut, TodoUpdate
+from app.utils import SyncCursor
 
 
 class CRUDTodo(CRUDBase[Todo, TodoCreate, TodoUpdate]):
+    def _add_event(self, db: Session, todo: Todo, kind: str) -> None:
+        if kind == "deleted":
+            payload = json.dumps({"id": todo.id})
+        else:
+            # Flushed and refreshed by the caller, so server defaults are set.
+            payload = TodoOut.from_orm(todo).json()
+        db.add(
+            TodoEvent(
+                owner_id=todo.owner_id, todo_id=todo.id, kind=kind, payload=payload
+            )
+        )
+
+    def _select_archived(self, query: Select) -> Select:
+        """The columns `query` selects from todo, from todo_archive instead."""
+        archived = TodoArchive.__table__.columns
+        return select(
+            *[
+                (
+                    getattr(TodoArchive, column.key)
+                    if column.key in archived
+                    else null().label(column.key)
+                )
+                for column in query.selected_columns
+            ]
+        )
+
+    def _with_archived(
+        self, query: Select, archived: Select, order_by: Sequence[str] = ("id",)
+    ) -> Select:
+        union = query.union_all(archived).subquery()
+        return select(*union.c).order_by(*[union.c[key] for key in order_by])
+
+    def _unarchive(self, db: Session, archived: TodoArchive) -> Todo:
+        """Move a todo back from the archive, as changed now for sync clients."""
+        values = {column: getattr(archived, column) for column in shared_columns}
+        db_obj = self.model(**{**values, "updated_at": func.now()})
+        db.delete(archived)
+        db.add(db_obj)
+        db.flush()
+        db.refresh(db_obj)
+        return db_obj
+
+    def get(
+        self,
+        db: Session,
+        id: Any,
+        *,
+        include_deleted: bool = False,
+        include_archived: bool = True
+    ) -> Optional[Union[Todo, TodoArchive]]:
+        todo = super().get(db, id, include_deleted=include_deleted)
+        if todo is None and include_archived:
+            return db.get(TodoArchive, id)
+        return todo
+
+    def get_row(
+        self,
+        db: Session,
+        id: Any,
+        *,
+        include_deleted: bool = False,
+        columns: Optional[Sequence[str]] = None,
+        include_archived: bool = True
+    ) -> Optional[NamedTuple]:
+        row = super().get_row(db, id, include_deleted=include_deleted, columns=columns)
+        if row is None and include_archived:
+            query = self._select_archived(self._select_rows(columns=columns))
+            rows = self._rows(db, query.where(TodoArchive.id == id))
+            return rows[0] if rows else None
+        return row
+
+    def get_multi_rows(
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: Optional[int] = 100,
+        include_deleted: bool = False,
+        columns: Optional[Sequence[str]] = None,
+        include_archived: bool = False
+    ) -> List[NamedTuple]:
+        if not include_archived:
+            return super().get_multi_rows(
+                db,
+                skip=skip,
+                limit=limit,
+                include_deleted=include_deleted,
+                columns=columns,
+            )
+        query = self._select_rows(include_deleted, columns)
+        query = self._with_archived(query, self._select_archived(query))
+        return self._rows(db, query.offset(skip).limit(limit))
+
     def create_with_owner(
         self, db: Session, *, obj_in: TodoCreate, owner_id: int
     ) -> Todo:
-        obj_in_data = jsonable_encoder(obj_in)
-        db_obj = self.model(**obj_in_data, owner_id=owner_id)
+        # Not JSON encoded: due_at stays a datetime
+        obj_in_data = obj_in.dict()
+        # Last in the owner's order. Creates for one owner are serialized on
+        # the owner's row, or two would read the same last key and append
+        # equal ones. The key is a locking read too: a plain one could come
+        # from a snapshot taken before the lock was granted.
+        db.execute(select(User.id).where(User.id == owner_id).with_for_update())
+        last = db.scalar(
+            select(self.model.position)
+            .where(self.model.owner_id == owner_id)
+            .order_by(self.model.position.desc())
+            .limit(1)
+            .with_for_update()
+        )
+        # updated_at is stamped on insert too, so the sync cursor sees new todos
+        db_obj = self.model(
+            **obj_in_data,
+            owner_id=owner_id,
+            position=key_between(last, None),
+            updated_at=func.now(),
+        )
         db.add(db_obj)
-        db.commit()
+        db.flush()
         db.refresh(db_obj)
+        self._add_event(db, db_obj, "created")
         return db_obj
 
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: Union[Todo, TodoArchive],
+        obj_in: Union[TodoUpdate, Dict[str, Any]]
+    ) -> Todo:
+        if isinstance(db_obj, TodoArchive):
+            db_obj = self._unarchive(db, db_obj)
+        changes = (
+            obj_in if isinstance(obj_in, dict) else obj_in.dict(exclude_unset=True)
+        )
+        if "due_at" in changes and changes["due_at"] != db_obj.due_at:
+            # Rescheduled, so reminded again
+            db_obj.reminded_at = None
+        self._apply_update(db_obj, obj_in)
+        db.add(db_obj)
+        db.flush()
+        db.refresh(db_obj)
+        self._add_event(db, db_obj, "updated")
+        return db_obj
+
+    def remove(self, db: Session, *, id: int) -> Todo:
+        obj = db.query(self.model).get(id)
+        if obj is None:
+            obj = self._unarchive(db, db.get(TodoArchive, id))
+        db.add(TodoTombstone(todo_id=obj.id, owner_id=obj.owner_id))
+        self._add_event(db, obj, "deleted")
+        return super().remove(db, id=id)
+
+    def get_many_by_owner(
+        self, db: Session, owner_ids: Iterable[int]
+    ) -> Dict[int, List[Todo]]:
+        todos: Dict[int, List[Todo]] = {owner_id: [] for owner_id in owner_ids}
+        if not todos:
+            return {}
+        query = self._query(db).filter(self.model.owner_id.in_(todos))
+        for todo in query.order_by(self.model.id):
+            todos[todo.owner_id].append(todo)
+        return todos
+
+    def get_rows_by_owner(
+        self,
+        db: Session,
+        *,
+        owner_id: int,
+        columns: Optional[Sequence[str]] = None,
+        include_archived: bool = False
+    ) -> List[NamedTuple]:
+        """The owner's todos in their manual order."""
+        if include_archived and columns is not None:
+            # The union is sorted by it
+            columns = [*columns, "position"]
+        query = self._select_rows(columns=columns).where(
+            self.model.owner_id == owner_id
+        )
+        if include_archived:
+            archived = self._select_archived(query).where(
+                TodoArchive.owner_id == owner_id
+            )
+            return self._rows(
+                db, self._with_archived(query, archived, ("position", "id"))
+            )
+        return self._rows(db, query.order_by(self.model.position, self.model.id))
+
+    def _position_after(
+        self, db: Session, db_obj: Todo, after: Optional[Todo]
+    ) -> Optional[str]:
+        """
+        A key between those of `after` (None: the start) and the todo that
+        follows it, other than `db_obj`. None when they leave no room: a
+        todo from before manual ordering has no key, concurrent appends can
+        make equal ones, and keys have a length limit.
+        """
+        query = select(self.model.position).where(
+            self.model.owner_id == db_obj.owner_id,
+            self.model.deleted_at.is_(None),
+            self.model.id != db_obj.id,
+        )
+        if after is not None:
+            if after.position is None:
+                return None
+            # After (after.position, after.id). The >= alone bounds the index
+            # range; SQLite scans from the owner's first todo for the OR.
+            query = query.where(
+                self.model.position >= after.position,
+                or_(self.model.position > after.position, self.model.id > after.id),
+            )
+        following = db.execute(
+            query.order_by(self.model.position, self.model.id).limit(1)
+        ).first()
+        low = None if after is None else after.position
+        high = None if following is None else following.position
+        if following is not None and (high is None or high == low):
+            return None
+        position = key_between(low, high)
+        return position if len(position) <= ORDER_KEY_LENGTH else None
+
+    def move(
+        self, db: Session, *, db_obj: Union[Todo, TodoArchive], after: Optional[Todo]
+    ) -> Todo:
+        """
+        Put `db_obj` right after `after` in its owner's order, or first when
+        `after` is None. It takes a key between its new neighbours', so only
+        its own row is written; when they leave no room the owner's keys are
+        rebalanced first.
+        """
+        if isinstance(db_obj, TodoArchive):
+            db_obj = self._unarchive(db, db_obj)
+        position = self._position_after(db, db_obj, after)
+        if position is None:
+            self.rebalance(db, owner_id=db_obj.owner_id)
+            position = self._position_after(db, db_obj, after)
+        db_obj.position = position
+        db.add(db_obj)
+        db.flush()
+        db.refresh(db_obj)
+        self._add_event(db, db_obj, "updated")
+        return db_obj
+
+    def longest_position(self, db: Session, *, owner_id: int) -> int:
+        return (
+            db.scalar(
+                select(func.max(func.length(self.model.position))).where(
+                    self.model.owner_id == owner_id,
+                    self.model.deleted_at.is_(None),
+                )
+            )
+            or 0
+        )
+
+    def rebalance(self, db: Session, *, owner_id: int) -> int:
+        """
+        Give the owner's todos the shortest keys in their current order, and
+        keys to todos without one. The order stays the same, but the keys
+        clients hold do not: updated_at is bumped, so GET /todos/changes
+        returns the todos again, and a "resync" event tells stream clients
+        to call it. Returns the number of todos.
+        """
+        ids = db.scalars(
+            select(self.model.id)
+            .where(self.model.owner_id == owner_id, self.model.deleted_at.is_(None))
+            .order_by(self.model.position, self.model.id)
+            .with_for_update()
+        ).all()
+        position = None
+        values = []
+        for id in ids:
+            position = key_between(position, None)
+            values.append({"todo_id": id, "position": position})
+        if values:
+            table = self.model.__table__
+            db.execute(
+                update(table)
+                .where(table.c.id == bindparam("todo_id"))
+                .values(position=bindparam("position"), updated_at=func.now()),
+                values,
+            )
+        for obj in list(db.identity_map.values()):
+            if isinstance(obj, self.model) and obj.owner_id == owner_id:
+                db.expire(obj, ["position", "updated_at"])
+        db.add(TodoEvent(owner_id=owner_id, todo_id=0, kind="resync", payload="{}"))
+        db.flush()
+        return len(ids)
+
+    def get_due(
+        self,
+        db: Session,
+        *,
+        owner_id: int,
+        before: Optional[datetime] = None,
+        limit: int = 100,
+        columns: Optional[Sequence[str]] = None
+    ) -> List[NamedTuple]:
+        """
+        Open todos of `owner_id` due before `before` (now by default), soonest
+        first.
+        """
+        query = self._select_rows(columns=columns).where(
+            self.model.owner_id == owner_id,
+            # "= false" rather than "IS false", which MySQL can't seek the
+            # (owner_id, isCompleted, due_at) index on
+            self.model.isCompleted == false(),
+            self.model.due_at < (utc_now() if before is None else before),
+        )
+        return self._rows(db, query.order_by(self.model.due_at).limit(limit))
+
+    def _pending_reminder(self):
+        return and_(
+            self.model.reminded_at.is_(None),
+            self.model.isCompleted == false(),
+            self.model.deleted_at.is_(None),
+        )
+
+    def get_pending_reminders(
+        self, db: Session, *, start: datetime, end: datetime
+    ) -> List[Tuple[int, datetime]]:
+        """(id, due_at) of todos due in [start, end) still to be reminded of."""
+        query = select(self.model.id, self.model.due_at).where(
+            self._pending_reminder(),
+            self.model.due_at >= start,
+            self.model.due_at < end,
+        )
+        return [tuple(row) for row in db.execute(query)]
+
+    def claim_reminders(self, db: Session, ids: Iterable[int]) -> List[Todo]:
+        """
+        Mark the reminders of todos `ids` that are due and still pending as
+        sent, with a "reminder" event each, and return those todos. The rows
+        are locked, so of two schedulers only one claims a reminder.
+        """
+        now = db.scalar(select(utc_now()))
+        todos = db.scalars(
+            select(self.model)
+            .where(
+                self.model.id.in_(set(ids)),
+                self._pending_reminder(),
+                self.model.due_at <= now,
+            )
+            .with_for_update()
+        ).all()
+        if not todos:
+            return []
+        # Not a change for sync clients, so updated_at is kept
+        db.execute(
+            update(self.model)
+            .where(self.model.id.in_([todo.id for todo in todos]))
+            .values(reminded_at=now, updated_at=self.model.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        for todo in todos:
+            self._add_event(db, todo, "reminder")
+        db.flush()
+        return todos
+
+    def get_events(
+        self, db: Session, *, owner_id: int, after: int, limit: int = 100
+    ) -> List[TodoEvent]:
+        return (
+            db.query(TodoEvent)
+            .filter(TodoEvent.owner_id == owner_id, TodoEvent.id > after)
+            .order_by(TodoEvent.id)
+            .limit(limit)
+            .all()
+        )
+
+    def get_changes(
+        self, db: Session, *, owner_id: int, cursor: SyncCursor, limit: int = 100
+    ) -> Tuple[List[Todo], List[TodoTombstone], SyncCursor, bool]:
+        """
+        Todos changed and deleted after `cursor`, oldest first.
+
+        Only rows stamped SYNC_COMMIT_LAG seconds ago or earlier are
+        returned. updated_at and tombstone ids are taken at flush, and a row
+        committed after a later one was synced would be behind the cursor;
+        by then every transaction that could stamp before the cutoff is over.
+        The next cursor's synced_at moves to the cutoff once the client is
+        caught up (or starts from nothing), and otherwise stays.
+        """
+        lag = timedelta(seconds=settings.SYNC_COMMIT_LAG)
+        stable = db.scalar(select(func.now())) - lag
+        synced_at = datetime.utcnow().replace(microsecond=0) - lag
+        changed = self._query(db).filter(
+            self.model.owner_id == owner_id, self.model.updated_at < stable
+        )
+        if cursor.updated_at is not None:
+            changed = changed.filter(
+                or_(
+                    self.model.updated_at > cursor.updated_at,
+                    and_(
+                        self.model.updated_at == cursor.updated_at,
+                        self.model.id > cursor.todo_id,
+                    ),
+                )
+            )
+        changed = (
+            changed.order_by(self.model.updated_at, self.model.id)
+            .limit(limit + 1)
+            .all()
+        )
+
+        deleted = (
+            db.query(TodoTombstone)
+            .filter(
+                TodoTombstone.owner_id == owner_id,
+                TodoTombstone.id > cursor.tombstone_id,
+                # Ids follow deleted_at, so no lower id can still commit
+                TodoTombstone.deleted_at < stable,
+            )
+            .order_by(TodoTombstone.id)
+            .limit(limit + 1)
+            .all()
+        )
+
+        has_more = len(changed) > limit or len(deleted) > limit
+        changed, deleted = changed[:limit], deleted[:limit]
+        caught_up = not has_more or cursor == SyncCursor()
+        next_cursor = SyncCursor(
+            changed[-1].updated_at if changed else cursor.updated_at,
+            changed[-1].id if changed else cursor.todo_id,
+            deleted[-1].id if deleted else cursor.tombstone_id,
+            synced_at if caught_up else cursor.synced_at,
+        )
+        return changed, deleted, next_cursor, has_more
+
+    def get_tombstones_purged_before(self, db: Session) -> Optional[datetime]:
+        """Tombstones deleted before this (naive UTC) may have been purged."""
+        return db.scalar(
+            select(PurgeWatermark.purged_before).where(
+                PurgeWatermark.name == TodoTombstone.__tablename__
+            )
+        )
+
     # def read_todo_by_user(self, db: Session, *, user_id: int) -> List[Todo]:
     #     return db.query(self.model).filter(self.model.owner_id == user_id).all()
 
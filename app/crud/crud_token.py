@@ -0,0 +1,93 @@
+import hashlib
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.core.config import settings
+from app.crud.base import CRUDBase
+from app.db.session import savepoint
+from app.models.refresh_token import RefreshToken
+from app.models.revoked_token import RevokedToken
+
+
+def _hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class CRUDRefreshToken(CRUDBase[RefreshToken, BaseModel, BaseModel]):
+    def issue(self, db: Session, *, user_id: int, family: Optional[str] = None) -> str:
+        """Add a new refresh token for `user_id` and return it."""
+        token = secrets.token_urlsafe(32)
+        db.add(
+            RefreshToken(
+                token_hash=_hash(token),
+                family=family or secrets.token_hex(16),
+                user_id=user_id,
+                expires_at=db.scalar(select(func.now()))
+                + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+            )
+        )
+        return token
+
+    def rotate(self, db: Session, *, token: str) -> Optional[Tuple[int, str]]:
+        """
+        Trade `token` for a new one of the same family: (user id, new token),
+        or None if it is unknown, expired or already used. A used token
+        coming back means it leaked, so its whole family is revoked; the
+        caller commits that even though the refresh fails.
+        """
+        row = db.scalar(
+            select(RefreshToken).where(RefreshToken.token_hash == _hash(token))
+        )
+        now = db.scalar(select(func.now()))
+        if row is None or row.expires_at <= now:
+            return None
+        # Conditional, so that of two concurrent refreshes only one wins
+        claimed = db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.id == row.id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=now)
+        ).rowcount
+        if not claimed:
+            self.revoke_family(db, family=row.family)
+            return None
+        new_token = self.issue(db, user_id=row.user_id, family=row.family)
+        return row.user_id, new_token
+
+    def revoke(self, db: Session, *, token: str) -> None:
+        """Revoke the family of `token`, e.g. on logout."""
+        family = db.scalar(
+            select(RefreshToken.family).where(RefreshToken.token_hash == _hash(token))
+        )
+        if family is not None:
+            self.revoke_family(db, family=family)
+
+    def revoke_family(self, db: Session, *, family: str) -> None:
+        db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.family == family, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=func.now())
+        )
+
+    def revoke_user(self, db: Session, *, user_id: int) -> None:
+        db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=func.now())
+        )
+
+    def revoke_access_token(
+        self, db: Session, *, jti: str, expires_at: datetime
+    ) -> None:
+        """Record a revoked access token; app.core.revocation picks it up."""
+        with savepoint(db, IntegrityError):  # revoked already
+            db.add(RevokedToken(jti=jti, expires_at=expires_at))
+
+
+refresh_token = CRUDRefreshToken(RefreshToken)
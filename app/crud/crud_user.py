@@ -1,46 +1,74 @@
-from typing import Union
+from datetime import datetime
+from typing import Any, Dict, Iterable, Union
 
 from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
 
-from app.core.security import hash_password, verify_password
+from app.core.security import hash_password, verify_and_update_password
 from app.crud.base import CRUDBase
 from app.models.user import User
-from app.schemas import user_schema
 from app.schemas.user_schema import UserCreate, UserUpdate
 
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     def create(self, db: Session, obj_in: UserCreate):
-        hashed_password = hash_password(obj_in.password)
-        user_in_db = user_schema.UserInDB(
-            **obj_in.dict(), hashed_password=hashed_password
+        """
+        Insert a new user. Duplicate usernames and emails are rejected by the
+        unique indexes, raising IntegrityError.
+        """
+        new_user = User(
+            **obj_in.dict(exclude={"password"}),
+            hashed_password=hash_password(obj_in.password),
+            # Bound rather than the server default, so the flushed user is
+            # complete without reading it back
+            created_at=datetime.utcnow().replace(microsecond=0),
         )
-        new_user = User(**user_in_db.dict())
         db.add(new_user)
-        db.commit()
+        db.flush()
 
         return new_user
 
+    def get_many_by_address(
+        self, db: Session, address_ids: Iterable[Any]
+    ) -> Dict[Any, User]:
+        address_ids = set(address_ids)
+        if not address_ids:
+            return {}
+        users = self._query(db).filter(User.address_id.in_(address_ids))
+        return {u.address_id: u for u in users}
+
     def update_user_password(self, db: Session, obj_in: str, u: User) -> User:
         u.hashed_password = hash_password(obj_in)
         db.add(u)
-        db.commit()
+        db.flush()
+        db.refresh(u)
         return u
 
     def authenticate(
         self, username: str, password: str, db: Session
     ) -> Union[User, bool]:
-        u = db.query(self.model).filter(User.username == username).first()
-        if not user:
+        u = self._query(db).filter(User.username == username).first()
+        if not u:
             return False
-        if not verify_password(password, u.hashed_password):
+        valid, new_hash = verify_and_update_password(password, u.hashed_password)
+        if not valid:
             return False
+        if new_hash is not None:
+            # Made with an outdated scheme or cost; the plain password is at
+            # hand only now, so this is when it can be rehashed.
+            u.hashed_password = new_hash
+            db.add(u)
         return u
 
     def deactivate(self, db: Session, u: User):
+        # The user's todos are cleaned up later, in batches, by
+        # app.db.compaction. The email and username stay taken until it
+        # purges the user too, after the soft delete retention period.
         u.is_active = False
-        db.add(user)
-        db.commit()
+        u.deleted_at = func.now()
+        db.add(u)
+        db.flush()
+        db.refresh(u)
 
         return u
 
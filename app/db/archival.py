@@ -0,0 +1,99 @@
+"""
+Move completed todos that have not changed for TODO_ARCHIVE_AFTER_DAYS from
+`todo` into `todo_archive`, so the hot table and its owner indexes only
+hold active work.
+
+Each batch locks at most `batch_size` todos, copies them and deletes them
+in one short transaction; the scan carries on after the last id it saw
+instead of starting over.
+
+    python -m app.db.archival
+
+It also runs as the "archive" job (see app.jobs.tasks).
+"""
+
+import logging
+import time
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import and_, delete, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.todo import Todo
+from app.models.todo_archive import TodoArchive
+
+logger = logging.getLogger(__name__)
+
+# Columns the two tables share
+shared_columns = [
+    column.key
+    for column in TodoArchive.__table__.columns
+    if column.key in Todo.__table__.columns
+]
+
+
+def archive_completed(
+    db: Session,
+    age: Optional[timedelta] = None,
+    batch_size: int = settings.ARCHIVE_BATCH_SIZE,
+    pause: float = settings.COMPACTION_BATCH_PAUSE,
+    max_batches: Optional[int] = None,
+) -> int:
+    if age is None:
+        age = timedelta(days=settings.TODO_ARCHIVE_AFTER_DAYS)
+    # The database clock, which stamped updated_at
+    cutoff = db.scalar(select(func.now())) - age
+    archivable = and_(
+        Todo.isCompleted.is_(True),
+        Todo.deleted_at.is_(None),
+        func.coalesce(Todo.updated_at, Todo.created_at) < cutoff,
+    )
+    archived = batches = last_id = 0
+    while max_batches is None or batches < max_batches:
+        # Locked, so a todo changed meanwhile is either archived as it was
+        # before the change or left in place
+        ids = db.scalars(
+            select(Todo.id)
+            .where(archivable, Todo.id > last_id)
+            .order_by(Todo.id)
+            .limit(batch_size)
+            .with_for_update()
+        ).all()
+        if not ids:
+            db.rollback()
+            break
+        db.execute(
+            insert(TodoArchive).from_select(
+                shared_columns,
+                select(*[getattr(Todo, column) for column in shared_columns]).where(
+                    Todo.id.in_(ids)
+                ),
+            )
+        )
+        db.execute(delete(Todo).where(Todo.id.in_(ids)))
+        db.commit()
+        archived += len(ids)
+        batches += 1
+        last_id = ids[-1]
+        if len(ids) < batch_size:
+            break
+        time.sleep(pause)
+    logger.info("Archived %d completed todos", archived)
+    return archived
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        archive_completed(db)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
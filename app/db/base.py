@@ -5,3 +5,12 @@ from app.db.base_class import Base  # noqa
 from app.models.address import Address  # noqa
 from app.models.todo import Todo  # noqa
 from app.models.user import User  # noqa
+from app.models.todo_tombstone import TodoTombstone  # noqa
+from app.models.job import Job  # noqa
+from app.models.todo_event import TodoEvent  # noqa
+from app.models.idempotency_key import IdempotencyKey  # noqa
+from app.models.refresh_token import RefreshToken  # noqa
+from app.models.revoked_token import RevokedToken  # noqa
+from app.models.migration_progress import MigrationProgress  # noqa
+from app.models.todo_archive import TodoArchive  # noqa
+from app.models.purge_watermark import PurgeWatermark  # noqa
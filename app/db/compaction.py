@@ -0,0 +1,166 @@
+"""
+Purge soft-deleted rows, finished jobs, expired tokens and the todos
+(archived ones too) of deactivated users.
+
+Every batch selects at most `batch_size` primary keys and deletes them by
+key in its own short transaction, so no statement holds locks for long.
+Batches walk the primary key upwards from where the last one stopped, so
+the rows a condition rejects are scanned once per run, not once per batch.
+
+A deactivated user keeps their email and username until purged here,
+SOFT_DELETE_RETENTION_DAYS later: signing up with either again gets 409
+until then.
+
+    python -m app.db.compaction
+
+It also runs as the "compact" job (see app.jobs.tasks).
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import and_, delete, exists, or_, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.db.types import utc_now
+from app.models.idempotency_key import IdempotencyKey
+from app.models.job import Job, JobStatus
+from app.models.purge_watermark import PurgeWatermark
+from app.models.refresh_token import RefreshToken
+from app.models.revoked_token import RevokedToken
+from app.models.todo import Todo
+from app.models.todo_archive import TodoArchive
+from app.models.todo_event import TodoEvent
+from app.models.todo_tombstone import TodoTombstone
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+def delete_in_batches(
+    db: Session,
+    model,
+    condition,
+    batch_size: int = settings.COMPACTION_BATCH_SIZE,
+    pause: float = settings.COMPACTION_BATCH_PAUSE,
+    max_batches: Optional[int] = None,
+) -> int:
+    deleted = batches = last_id = 0
+    while max_batches is None or batches < max_batches:
+        ids = db.scalars(
+            select(model.id)
+            .where(condition, model.id > last_id)
+            .order_by(model.id)
+            .limit(batch_size)
+        ).all()
+        if not ids:
+            break
+        db.execute(delete(model).where(model.id.in_(ids)))
+        db.commit()
+        deleted += len(ids)
+        batches += 1
+        last_id = ids[-1]
+        if len(ids) < batch_size:
+            break
+        time.sleep(pause)
+    return deleted
+
+
+def raise_watermark(db: Session, name: str, purged_before: datetime) -> None:
+    """Record that rows of `name` stamped before `purged_before` may be gone."""
+    watermark = db.scalar(select(PurgeWatermark).where(PurgeWatermark.name == name))
+    if watermark is None:
+        db.add(PurgeWatermark(name=name, purged_before=purged_before))
+    elif watermark.purged_before < purged_before:
+        watermark.purged_before = purged_before
+    db.commit()
+
+
+def compact(
+    db: Session, retention: Optional[timedelta] = None, **batch_options
+) -> Dict[str, int]:
+    if retention is None:
+        retention = timedelta(days=settings.SOFT_DELETE_RETENTION_DAYS)
+    # Compare against the database clock, which stamped deleted_at.
+    now = db.scalar(select(func.now()))
+    cutoff = now - retention
+    job_cutoff = now - timedelta(days=settings.JOB_RETENTION_DAYS)
+    event_cutoff = now - timedelta(days=settings.EVENT_RETENTION_DAYS)
+    # Raised before any tombstone goes, so a sync token from before the
+    # cutoff is refused (410) rather than silently missing the deletes
+    raise_watermark(
+        db, TodoTombstone.__tablename__, db.scalar(select(utc_now())) - retention
+    )
+
+    inactive_owner = exists().where(
+        User.id == Todo.owner_id,
+        or_(User.is_active.is_(False), User.deleted_at.isnot(None)),
+    )
+    inactive_archive_owner = exists().where(
+        User.id == TodoArchive.owner_id,
+        or_(User.is_active.is_(False), User.deleted_at.isnot(None)),
+    )
+    result = {
+        "inactive_user_todos": delete_in_batches(
+            db, Todo, inactive_owner, **batch_options
+        ),
+        "inactive_user_archived_todos": delete_in_batches(
+            db, TodoArchive, inactive_archive_owner, **batch_options
+        ),
+        "todos": delete_in_batches(db, Todo, Todo.deleted_at < cutoff, **batch_options),
+        "todo_tombstones": delete_in_batches(
+            db, TodoTombstone, TodoTombstone.deleted_at < cutoff, **batch_options
+        ),
+        "todo_events": delete_in_batches(
+            db, TodoEvent, TodoEvent.created_at < event_cutoff, **batch_options
+        ),
+        "jobs": delete_in_batches(
+            db,
+            Job,
+            and_(
+                Job.status.in_((JobStatus.DONE, JobStatus.FAILED)),
+                Job.updated_at < job_cutoff,
+            ),
+            **batch_options,
+        ),
+        "idempotency_keys": delete_in_batches(
+            db, IdempotencyKey, IdempotencyKey.expires_at < now, **batch_options
+        ),
+        "refresh_tokens": delete_in_batches(
+            db, RefreshToken, RefreshToken.expires_at < now, **batch_options
+        ),
+        "revoked_tokens": delete_in_batches(
+            db, RevokedToken, RevokedToken.expires_at < now, **batch_options
+        ),
+        # Users go once nothing references them any more.
+        "users": delete_in_batches(
+            db,
+            User,
+            and_(
+                User.deleted_at < cutoff,
+                ~exists().where(Todo.owner_id == User.id),
+                ~exists().where(TodoArchive.owner_id == User.id),
+            ),
+            **batch_options,
+        ),
+    }
+    logger.info("Compaction finished: %s", result)
+    return result
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        compact(db)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
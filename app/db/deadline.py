@@ -0,0 +1,96 @@
+"""
+Request deadlines as statement timeouts, so a slow query gives up its
+pooled connection instead of holding it for as long as it runs.
+
+A session whose info["deadline"] holds a time.monotonic() value (get_db
+sets it from the route, see app.api.routing) passes it to each connection
+it begins a transaction on. Every statement then gets what is left of it:
+
+* MySQL: SELECTs carry a MAX_EXECUTION_TIME hint. It does not apply to
+  writes, which are short and bounded by innodb_lock_wait_timeout.
+* SQLite: a progress handler aborts the statement once the deadline has
+  passed.
+
+A statement issued past the deadline is not sent at all. Either way
+DeadlineExceeded is raised, which the API answers with 504.
+"""
+
+import re
+import sqlite3
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+# MySQL's "maximum statement execution time exceeded"
+ER_QUERY_TIMEOUT = 3024
+# Virtual machine instructions between two SQLite deadline checks
+SQLITE_PROGRESS_STEPS = 1000
+
+_select = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def remaining(info: Dict[str, Any]) -> Optional[float]:
+    """Seconds left of the deadline in a connection's `info`, if it has one."""
+    deadline = info.get("deadline")
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def configure(engine: Engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute", retval=True)
+    def limit(conn, cursor, statement, parameters, context, executemany):
+        left = remaining(conn.info)
+        if left is None:
+            return statement, parameters
+        if left <= 0:
+            raise DeadlineExceeded("Deadline exceeded before the statement was sent")
+        if conn.dialect.name == "mysql" and _select.match(statement):
+            hint = f"SELECT /*+ MAX_EXECUTION_TIME({max(1, int(left * 1000))}) */"
+            statement = _select.sub(hint, statement, count=1)
+        return statement, parameters
+
+    @event.listens_for(engine, "handle_error")
+    def timed_out(context) -> None:
+        error = context.original_exception
+        if isinstance(error, sqlite3.OperationalError):
+            timeout = str(error) == "interrupted"
+        else:
+            timeout = getattr(error, "args", (None,))[0] == ER_QUERY_TIMEOUT
+        if timeout:
+            raise DeadlineExceeded("Statement cancelled at the deadline") from error
+
+    # Committing is never cut short; a new transaction picks the deadline up
+    # again from its session
+    event.listen(engine, "commit", lambda conn: conn.info.pop("deadline", None))
+    event.listen(
+        engine.pool,
+        "checkin",
+        lambda dbapi_connection, connection_record: connection_record.info.pop(
+            "deadline", None
+        ),
+    )
+
+    if engine.dialect.name == "sqlite":
+
+        @event.listens_for(engine, "connect")
+        def set_progress_handler(dbapi_connection, connection_record) -> None:
+            def expired() -> bool:
+                left = remaining(connection_record.info)
+                return left is not None and left <= 0
+
+            dbapi_connection.set_progress_handler(expired, SQLITE_PROGRESS_STEPS)
+
+
+def propagate(session_factory: sessionmaker) -> None:
+    """Hand the deadline of each session to the connections it uses."""
+
+    @event.listens_for(session_factory, "after_begin")
+    def begin(session, transaction, connection) -> None:
+        if session.info.get("deadline") is not None:
+            connection.info["deadline"] = session.info["deadline"]
@@ -0,0 +1,507 @@
+"""
+Expand/contract schema changes for large tables, so that a migration never
+holds a table lock for longer than one short batch and the API keeps
+serving while it runs. Changing the type of todo.created_at, for example,
+takes two revisions:
+
+    from app.db import online_migration as om
+
+    def upgrade() -> None:  # expand; the running code is unaffected
+        bind = op.get_bind()
+        om.add_column(
+            bind,
+            "todo",
+            sa.Column("created_at_new", sa.TIMESTAMP, server_default=sa.func.now()),
+        )
+        om.create_copy_triggers(bind, "todo", {"created_at_new": "created_at"})
+        with op.get_context().autocommit_block():
+            om.backfill(bind, "todo", {"created_at_new": "created_at"})
+        om.swap_columns(bind, "todo", "created_at", "created_at_new")
+
+    def upgrade() -> None:  # contract, once no deployed code needs the old column
+        bind = op.get_bind()
+        om.drop_column(bind, "todo", "created_at_old")
+        # Only for a column that was NOT NULL before; add_column can't add one
+        om.alter_table(
+            bind,
+            "todo",
+            "MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP",
+        )
+
+The new column takes the old one's server default: once swapped in, no
+trigger fills it any more, and swap_columns refuses a column without the
+default the old one had. New columns are nullable until backfilled, so the
+contract step restores NOT NULL (repeating the default, which MODIFY
+replaces). SQLite can't add a column with a non-constant default such as
+now(); rebuild the table with op.batch_alter_table there instead.
+
+The triggers copy rows written while the backfill runs. The backfill walks
+the table in primary key ranges, one short transaction each, and records
+where it got to in migration_progress, so an interrupted migration resumes
+instead of starting over. It can be run ahead of the deploy, and its
+duration estimated on a seeded database, from the command line:
+
+    python -m app.db.online_migration estimate todo created_at_new=created_at
+    python -m app.db.online_migration backfill todo created_at_new=created_at
+"""
+
+import argparse
+import logging
+import math
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+import sqlalchemy as sa
+from sqlalchemy import create_engine, func, insert, select, text, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateColumn
+
+from app.core.config import settings
+from app.models.migration_progress import MigrationProgress
+
+logger = logging.getLogger(__name__)
+
+progress_table = MigrationProgress.__table__
+
+# MySQL error codes
+LOCK_WAIT_TIMEOUT = 1205
+ALGORITHM_NOT_SUPPORTED = (1845, 1846)
+
+
+def _quote(bind: Connection, name: str) -> str:
+    return bind.dialect.identifier_preparer.quote(name)
+
+
+def _is_mysql(bind: Connection) -> bool:
+    return bind.dialect.name == "mysql"
+
+
+def ddl(
+    bind: Connection,
+    statement: str,
+    lock_wait_timeout: int = settings.ONLINE_MIGRATION_LOCK_WAIT_TIMEOUT,
+    retries: int = settings.ONLINE_MIGRATION_LOCK_RETRIES,
+) -> None:
+    """
+    Run a DDL statement without stalling the API behind it. On MySQL an
+    ALTER waiting for the table's metadata lock (held by any open
+    transaction on the table) blocks every query that comes after it, so it
+    gives up after `lock_wait_timeout` seconds and is retried later.
+    """
+    if not _is_mysql(bind):
+        bind.execute(text(statement))
+        return
+    bind.execute(text(f"SET SESSION lock_wait_timeout = {int(lock_wait_timeout)}"))
+    try:
+        for attempt in range(retries + 1):
+            try:
+                bind.execute(text(statement))
+                return
+            except OperationalError as e:
+                if e.orig.args[0] != LOCK_WAIT_TIMEOUT or attempt == retries:
+                    raise
+                logger.warning("Table busy, retrying: %s", statement)
+                time.sleep(min(2**attempt, 30))
+    finally:
+        bind.execute(text("SET SESSION lock_wait_timeout = DEFAULT"))
+
+
+def alter_table(bind: Connection, table: str, clause: str) -> None:
+    """
+    ALTER TABLE that must not block writes. MySQL is asked for an instant
+    change first, then for an in-place one without locks; it refuses a
+    change needing a table copy rather than silently locking the table.
+    """
+    statement = f"ALTER TABLE {_quote(bind, table)} {clause}"
+    if not _is_mysql(bind):
+        ddl(bind, statement)
+        return
+    try:
+        ddl(bind, f"{statement}, ALGORITHM=INSTANT")
+    except OperationalError as e:
+        if e.orig.args[0] not in ALGORITHM_NOT_SUPPORTED:
+            raise
+        ddl(bind, f"{statement}, ALGORITHM=INPLACE, LOCK=NONE")
+
+
+def add_column(bind: Connection, table: str, column: sa.Column) -> None:
+    if not column.nullable:
+        raise ValueError(
+            f"{column.name} must be nullable until it is backfilled; "
+            "make it NOT NULL in the contract step"
+        )
+    spec = CreateColumn(column).compile(dialect=bind.dialect)
+    alter_table(bind, table, f"ADD COLUMN {spec}")
+
+
+def drop_column(bind: Connection, table: str, column: str) -> None:
+    alter_table(bind, table, f"DROP COLUMN {_quote(bind, column)}")
+
+
+def create_index(bind: Connection, name: str, table: str, columns: List[str]) -> None:
+    """Build an index while the table stays writable (in place on MySQL)."""
+    quoted = ", ".join(_quote(bind, column) for column in columns)
+    if not _is_mysql(bind):
+        ddl(
+            bind,
+            f"CREATE INDEX {_quote(bind, name)} ON {_quote(bind, table)} ({quoted})",
+        )
+        return
+    ddl(
+        bind,
+        f"ALTER TABLE {_quote(bind, table)} ADD INDEX {_quote(bind, name)} ({quoted}), "
+        "ALGORITHM=INPLACE, LOCK=NONE",
+    )
+
+
+def _trigger_names(table: str) -> List[str]:
+    return [f"{table}_copy_on_insert", f"{table}_copy_on_update"]
+
+
+def create_copy_triggers(bind: Connection, table: str, copy: Dict[str, str]) -> None:
+    """Keep columns in step with others (`{target: source}`) on every write."""
+    q = _quote(bind, table)
+    for name, event in zip(_trigger_names(table), ("INSERT", "UPDATE")):
+        if _is_mysql(bind):
+            assignments = ", ".join(
+                f"NEW.{_quote(bind, target)} = NEW.{_quote(bind, source)}"
+                for target, source in copy.items()
+            )
+            body = f"BEFORE {event} ON {q} FOR EACH ROW SET {assignments}"
+        elif bind.dialect.name == "sqlite":
+            assignments = ", ".join(
+                f"{_quote(bind, target)} = NEW.{_quote(bind, source)}"
+                for target, source in copy.items()
+            )
+            body = (
+                f"AFTER {event} ON {q} FOR EACH ROW BEGIN "
+                f"UPDATE {q} SET {assignments} WHERE id = NEW.id; END"
+            )
+        else:
+            raise NotImplementedError(bind.dialect.name)
+        ddl(bind, f"CREATE TRIGGER {name} {body}")
+
+
+def drop_copy_triggers(bind: Connection, table: str) -> None:
+    for name in _trigger_names(table):
+        ddl(bind, f"DROP TRIGGER IF EXISTS {name}")
+
+
+def swap_columns(
+    bind: Connection, table: str, column: str, new_column: str, suffix: str = "_old"
+) -> None:
+    """
+    Drop the copy triggers and rename `column` to `column + suffix` and
+    `new_column` to `column`, as one instant change. On MySQL the table is
+    write locked meanwhile, for milliseconds, so no write falls between
+    the triggers going and the rename.
+
+    Raises ValueError if `column` has a server default and `new_column`
+    doesn't: rows inserted after the swap would go without it.
+    """
+    columns = {c["name"]: c for c in sa.inspect(bind).get_columns(table)}
+    if columns[column].get("default") is not None and (
+        columns[new_column].get("default") is None
+    ):
+        raise ValueError(
+            f"{new_column} needs the server default of {column} "
+            f"({columns[column]['default']}) before it replaces it"
+        )
+    clause = (
+        f"RENAME COLUMN {_quote(bind, column)} TO {_quote(bind, column + suffix)}, "
+        f"RENAME COLUMN {_quote(bind, new_column)} TO {_quote(bind, column)}"
+    )
+    if not _is_mysql(bind):
+        drop_copy_triggers(bind, table)
+        for rename in clause.split(", "):
+            alter_table(bind, table, rename)
+        return
+    ddl(bind, f"LOCK TABLES {_quote(bind, table)} WRITE")
+    try:
+        drop_copy_triggers(bind, table)
+        alter_table(bind, table, clause)
+    finally:
+        bind.execute(text("UNLOCK TABLES"))
+
+
+def _update_statement(
+    bind: Connection, table: str, copy: Dict[str, str], where: Optional[str]
+) -> sa.sql.elements.TextClause:
+    assignments = [f"{_quote(bind, target)} = {expr}" for target, expr in copy.items()]
+    columns = {column["name"] for column in sa.inspect(bind).get_columns(table)}
+    missing = set(copy) - columns
+    if missing:
+        raise ValueError(f"{table} has no column {', '.join(sorted(missing))}")
+    if "updated_at" in columns and "updated_at" not in copy:
+        # Assigned explicitly so that ON UPDATE CURRENT_TIMESTAMP leaves it
+        # be; the backfill is not a change clients should sync.
+        assignments.append("updated_at = updated_at")
+    statement = (
+        f"UPDATE {_quote(bind, table)} SET {', '.join(assignments)} "
+        "WHERE id > :low AND id <= :high"
+    )
+    if where:
+        statement += f" AND ({where})"
+    return text(statement)
+
+
+@contextmanager
+def _batch(bind: Connection) -> Iterator[None]:
+    if bind.in_transaction():
+        # Inside the migration's own transaction nothing is committed until
+        # it ends; see op.get_context().autocommit_block() above.
+        yield
+    else:
+        with bind.begin():
+            yield
+
+
+def _duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes // 60}h{minutes % 60:02d}m{seconds:02d}s"
+
+
+def backfill(
+    bind: Connection,
+    table: str,
+    copy: Dict[str, str],
+    *,
+    where: Optional[str] = None,
+    name: Optional[str] = None,
+    batch_size: int = settings.ONLINE_MIGRATION_BATCH_SIZE,
+    batch_seconds: float = settings.ONLINE_MIGRATION_BATCH_SECONDS,
+    pause: float = settings.ONLINE_MIGRATION_BATCH_PAUSE,
+) -> int:
+    """
+    Set `copy` (`{column: SQL expression}`) on every row with an id up to
+    the largest one at the start; later rows are the triggers' job. Returns
+    the number of rows updated, over all runs.
+
+    Each batch covers a range of ids and commits together with its progress
+    record. The range is resized so a batch takes about `batch_seconds`
+    (which bounds how long its row locks are held), with `pause` seconds
+    between batches for replication and other traffic to catch up.
+    """
+    name = name or f"{table}:{','.join(copy)}"
+    statement = _update_statement(bind, table, copy, where)
+    if bind.in_transaction():
+        logger.warning("Backfilling %s in a single transaction", name)
+
+    with _batch(bind):
+        progress = bind.execute(
+            select(progress_table).where(progress_table.c.name == name)
+        ).first()
+        if progress is None:
+            max_id = bind.scalar(text(f"SELECT MAX(id) FROM {_quote(bind, table)}"))
+            bind.execute(
+                insert(progress_table).values(
+                    name=name, last_id=0, max_id=max_id or 0, rows=0
+                )
+            )
+            progress = bind.execute(
+                select(progress_table).where(progress_table.c.name == name)
+            ).first()
+    if progress.finished_at is not None:
+        logger.info("%s: already backfilled (%d rows)", name, progress.rows)
+        return progress.rows
+    if progress.last_id:
+        logger.info("%s: resuming after id %d", name, progress.last_id)
+
+    low, max_id, rows = progress.last_id, progress.max_id, progress.rows
+    size = batch_size
+    started = last_report = time.monotonic()
+    first_id = low
+    while low < max_id:
+        high = min(low + size, max_id)
+        batch_started = time.perf_counter()
+        with _batch(bind):
+            rows += bind.execute(statement, {"low": low, "high": high}).rowcount
+            bind.execute(
+                update(progress_table)
+                .where(progress_table.c.name == name)
+                .values(last_id=high, rows=rows)
+            )
+        elapsed = time.perf_counter() - batch_started
+        low = high
+        if elapsed > batch_seconds:
+            size = max(1, size // 2)
+        elif elapsed < batch_seconds / 2:
+            size = min(size * 2, batch_size * 100)
+
+        now = time.monotonic()
+        if now - last_report >= 10 or low >= max_id:
+            last_report = now
+            rate = (low - first_id) / (now - started)
+            logger.info(
+                "%s: %d of %d ids (%.1f%%), %d rows, %s left",
+                name,
+                low,
+                max_id,
+                low / max_id * 100,
+                rows,
+                _duration((max_id - low) / rate) if rate else "?",
+            )
+        if low < max_id:
+            time.sleep(pause)
+
+    with _batch(bind):
+        bind.execute(
+            update(progress_table)
+            .where(progress_table.c.name == name)
+            .values(finished_at=func.now())
+        )
+    logger.info(
+        "%s: done, %d rows in %s", name, rows, _duration(time.monotonic() - started)
+    )
+    return rows
+
+
+def estimate(
+    bind: Connection,
+    table: str,
+    copy: Dict[str, str],
+    *,
+    where: Optional[str] = None,
+    batch_size: int = settings.ONLINE_MIGRATION_BATCH_SIZE,
+    pause: float = settings.ONLINE_MIGRATION_BATCH_PAUSE,
+    samples: int = 5,
+) -> Dict[str, float]:
+    """
+    Time `samples` batches spread over the table, each rolled back, and
+    extrapolate to the whole backfill. Run it on a copy of production data
+    (or one seeded to its size): the rolled back batches still lock rows.
+    """
+    statement = _update_statement(bind, table, copy, where)
+    q = _quote(bind, table)
+    low, high = bind.execute(text(f"SELECT MIN(id), MAX(id) FROM {q}")).first()
+    if low is None:
+        return {"rows": 0, "batches": 0, "batch_seconds": 0.0, "seconds": 0.0}
+    batches = math.ceil((high - low + 1) / batch_size)
+    timings = []
+    updated = 0
+    for i in range(min(samples, batches)):
+        start = low - 1 + (batches * i // samples) * batch_size
+        transaction = bind.begin()
+        try:
+            batch_started = time.perf_counter()
+            updated += bind.execute(
+                statement, {"low": start, "high": start + batch_size}
+            ).rowcount
+            timings.append(time.perf_counter() - batch_started)
+        finally:
+            transaction.rollback()
+    batch_seconds = sum(timings) / len(timings)
+    return {
+        "rows": bind.scalar(
+            text(f"SELECT COUNT(*) FROM {q}" + (f" WHERE {where}" if where else ""))
+        ),
+        "batches": batches,
+        "batch_seconds": batch_seconds,
+        "rows_per_batch": updated / len(timings),
+        "seconds": batches * (batch_seconds + pause),
+    }
+
+
+def _seed_todos(bind: Connection, rows: int) -> int:
+    """Insert `rows` todos for a throwaway user; returns the user's id."""
+    from app.models.todo import Todo
+    from app.models.user import User
+
+    with bind.begin():
+        stamp = time.time_ns()
+        owner_id = bind.execute(
+            insert(User).values(
+                username=f"seed-{stamp}",
+                email=f"seed-{stamp}@example.com",
+                hashed_password="",
+            )
+        ).inserted_primary_key[0]
+        for start in range(0, rows, 10_000):
+            bind.execute(
+                insert(Todo),
+                [
+                    {
+                        "title": f"todo {i}",
+                        "description": "seeded",
+                        "priority": i % 5 + 1,
+                        "isCompleted": i % 2 == 0,
+                        "owner_id": owner_id,
+                    }
+                    for i in range(start, min(start + 10_000, rows))
+                ],
+            )
+    return owner_id
+
+
+def _remove_seed(bind: Connection, owner_id: int) -> None:
+    from app.models.todo import Todo
+    from app.models.user import User
+
+    with bind.begin():
+        bind.execute(sa.delete(Todo).where(Todo.owner_id == owner_id))
+        bind.execute(sa.delete(User).where(User.id == owner_id))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("command", choices=("estimate", "backfill"))
+    parser.add_argument("table")
+    parser.add_argument("copy", nargs="+", metavar="COLUMN=EXPRESSION")
+    parser.add_argument("--where", help="SQL condition limiting the rows")
+    parser.add_argument("--name", help="progress record (default: table:columns)")
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.ONLINE_MIGRATION_BATCH_SIZE
+    )
+    parser.add_argument(
+        "--pause", type=float, default=settings.ONLINE_MIGRATION_BATCH_PAUSE
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="estimate: insert this many todos first, removed afterwards",
+    )
+    parser.add_argument("--url", default=settings.SQLALCHEMY_DATABASE_URL)
+    args = parser.parse_args()
+    copy = dict(item.split("=", 1) for item in args.copy)
+    if args.seed and (args.command != "estimate" or args.table != "todo"):
+        parser.error("--seed only goes with estimate on the todo table")
+
+    logging.basicConfig(level=logging.INFO)
+    engine = create_engine(args.url)
+    with engine.connect() as bind:
+        if args.command == "backfill":
+            backfill(
+                bind,
+                args.table,
+                copy,
+                where=args.where,
+                name=args.name,
+                batch_size=args.batch_size,
+                pause=args.pause,
+            )
+            return
+        owner_id = _seed_todos(bind, args.seed) if args.seed else None
+        try:
+            result = estimate(
+                bind,
+                args.table,
+                copy,
+                where=args.where,
+                batch_size=args.batch_size,
+                pause=args.pause,
+            )
+        finally:
+            if owner_id is not None:
+                _remove_seed(bind, owner_id)
+    print(
+        f"{result['rows']:,} rows in {result['batches']:,} batches of "
+        f"{args.batch_size} ids, {result['batch_seconds'] * 1000:.1f} ms each "
+        f"(+{args.pause * 1000:.0f} ms pause): about {_duration(result['seconds'])}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,74 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import os
+from contextlib import contextmanager
+from typing import Iterator, Optional, Type
+
+from sqlalchemy import Table, create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import settings
+from app.db import deadline, sqlite
+
+
+def create_db_engine(url: str = settings.SQLALCHEMY_DATABASE_URL) -> Engine:
+    if url.startswith("sqlite"):
+        engine = create_engine(url, **sqlite.engine_options(url))
+        sqlite.configure(engine)
+    else:
+        engine = create_engine(
+            url,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    deadline.configure(engine)
+    return engine
+
+
+engine = create_db_engine()
+# A forked worker (python -m app.serve preloads the app) must not reuse the
+# parent's pooled connections; it forgets them without closing the sockets
+# and opens its own.
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
 
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+deadline.propagate(SessionLocal)
+
+
+@contextmanager
+def savepoint(db: Session, *ignore: Type[Exception]) -> Iterator[None]:
+    """
+    Run the block in a SAVEPOINT of the current transaction, flushed at its
+    end. On an error only the block's changes are undone, and the rest of
+    the unit of work can carry on; errors of the `ignore` types are
+    swallowed, others re-raised.
+    """
+    try:
+        with db.begin_nested():
+            yield
+    except ignore:
+        pass
+
+
+def violated_unique_index(error: IntegrityError, table: Table) -> Optional[str]:
+    """
+    The name of the unique index of `table` a duplicate row ran into, or
+    None. Read from the end of the driver's message, past the duplicate
+    value, which could contain anything.
+    """
+    # PostgreSQL names the constraint; MySQL ends with "for key
+    # '[table.]index'"; SQLite with "UNIQUE constraint failed: table.column"
+    constraint = getattr(getattr(error.orig, "diag", None), "constraint_name", None)
+    message = str(error.orig.args[-1]) if error.orig.args else ""
+    for index in table.indexes:
+        if not index.unique:
+            continue
+        columns = ", ".join(f"{table.name}.{column.name}" for column in index.columns)
+        if constraint == index.name or message.endswith(
+            (f"'{index.name}'", f".{index.name}'", f"failed: {columns}")
+        ):
+            return index.name
+    return None
@@ -0,0 +1,107 @@
+"""
+SQLite as the database of a single-node install, selected with e.g.
+
+    SQLALCHEMY_DATABASE_URL=sqlite:////var/lib/todo/todo.db
+
+Every connection is switched to WAL (readers and the writer no longer
+block each other), synchronous=NORMAL (no fsync per commit; a power loss
+can lose the last transactions but not corrupt the file), memory-mapped
+reads and a busy timeout.
+
+SQLite allows one writer at a time. Rather than letting concurrent
+writers poll the file lock (and fail with "database is locked" once the
+busy timeout is over), write transactions of a worker queue up on a lock
+of the engine from their first write until commit or rollback. Workers
+of one host still contend for the file lock, within the busy timeout.
+
+A new database gets its tables from the models, stamped as migrated:
+
+    python -m app.db.sqlite
+"""
+
+import re
+import sqlite3
+import threading
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+
+_write = re.compile(r"\s*(INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    options: Dict[str, Any] = {
+        "connect_args": {
+            # Sessions move between threadpool threads, never used by two at once
+            "check_same_thread": False,
+            "timeout": settings.SQLITE_BUSY_TIMEOUT / 1000,
+        }
+    }
+    if url.rstrip("/") not in ("sqlite:", "sqlite+pysqlite:") and ":memory:" not in url:
+        # A file database; keep connections (and their page cache) open
+        options.update(
+            poolclass=QueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+def configure(engine: Engine, writer_lock: bool = True) -> None:
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT}")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+    if not writer_lock:
+        return
+    lock = threading.Lock()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def acquire(conn, cursor, statement, parameters, context, executemany) -> None:
+        if conn.info.get("writer") or not _write.match(statement):
+            return
+        # Released from whichever thread ends the transaction, hence a Lock
+        if not lock.acquire(timeout=settings.SQLITE_BUSY_TIMEOUT / 1000):
+            raise sqlite3.OperationalError("database is locked")
+        conn.info["writer"] = True
+
+    def release(info: Dict[str, Any]) -> None:
+        if info.pop("writer", False):
+            lock.release()
+
+    event.listen(engine, "commit", lambda conn: release(conn.info))
+    event.listen(engine, "rollback", lambda conn: release(conn.info))
+    # A connection returned to the pool mid-transaction is rolled back there
+    event.listen(
+        engine.pool,
+        "reset",
+        lambda dbapi_connection, connection_record: release(connection_record.info),
+    )
+
+
+def main() -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    from app.db.base import Base
+    from app.db.session import engine
+
+    Base.metadata.create_all(engine)
+    # The revision tree has several heads (separate roots that were never
+    # merged); the models are all of them
+    command.stamp(Config("alembic.ini"), "heads")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+from sqlalchemy import TIMESTAMP, DateTime, String
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+# TIMESTAMP that SQLite stores as text in the format of its CURRENT_TIMESTAMP
+# ("2022-06-28 16:55:47"), the one server defaults and func.now() produce.
+# SQLite compares the text, so bound values in another format (SQLAlchemy's
+# default appends microseconds) would never equal a stamped one, and the
+# sync cursor's `updated_at == ...` tie-break would skip rows.
+Timestamp = TIMESTAMP().with_variant(
+    sqlite.DATETIME(
+        storage_format=(
+            "%(year)04d-%(month)02d-%(day)02d " "%(hour)02d:%(minute)02d:%(second)02d"
+        ),
+        regexp=r"(\d+)-(\d+)-(\d+) (\d+):(\d+):(\d+)",
+    ),
+    "sqlite",
+)
+
+
+class utc_now(FunctionElement):
+    """
+    The database clock in naive UTC, like the timestamps the app binds (due
+    dates, cursors). MySQL's NOW() is in the session time zone instead.
+    """
+
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utc_now)
+def _utc_now(element, compiler, **kw) -> str:
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utc_now, "mysql")
+def _utc_now_mysql(element, compiler, **kw) -> str:
+    return "UTC_TIMESTAMP()"
+
+
+@compiles(utc_now, "postgresql")
+def _utc_now_postgresql(element, compiler, **kw) -> str:
+    return "(CURRENT_TIMESTAMP AT TIME ZONE 'UTC')"
+
+
+ORDER_KEY_LENGTH = 64
+
+# Order keys (app.core.fractional_index) must sort byte by byte. MySQL's
+# default collation ignores case and would sort "a0" next to "A0".
+OrderKey = (
+    String(ORDER_KEY_LENGTH)
+    .with_variant(
+        mysql.VARCHAR(ORDER_KEY_LENGTH, charset="ascii", collation="ascii_bin"),
+        "mysql",
+    )
+    .with_variant(String(ORDER_KEY_LENGTH, collation="C"), "postgresql")
+)
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import configure_mappers
+from starlette.concurrency import run_in_threadpool
+
+from app.core import security
+from app.core.config import settings
+from app.core.revocation import revocations
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupState:
+    def __init__(self):
+        self.ready = False
+        self.attempts = 0
+        self.connections = 0
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "attempts": self.attempts,
+            "connections": self.connections,
+            "duration": self.duration,
+            "error": self.error,
+        }
+
+
+state = WarmupState()
+
+
+def pool_status() -> Dict[str, Any]:
+    pool = engine.pool
+    status: Dict[str, Any] = {"class": type(pool).__name__}
+    # Not every pool implementation (e.g. NullPool) keeps these counters.
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        counter = getattr(pool, name, None)
+        if callable(counter):
+            status[name] = counter()
+    return status
+
+
+def warm_up_pool(connections: int) -> int:
+    """
+    Open `connections` pooled connections at once so that each one pays its
+    TCP and auth handshake now, then return them all to the pool.
+    """
+    opened: List[Connection] = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
+
+
+def warm_up() -> None:
+    start = time.perf_counter()
+    state.attempts += 1
+
+    configure_mappers()
+
+    # Load the bcrypt backend and the JWT signer before the first login does.
+    hashed = security.hash_password("warm-up")
+    security.verify_password("warm-up", hashed)
+    security.create_access_token("warm-up", 0)
+
+    connections = min(settings.DB_POOL_WARMUP, settings.DB_POOL_SIZE)
+    state.connections = warm_up_pool(connections)
+    # Refuse revoked access tokens from the first request on
+    revocations.reload()
+
+    state.duration = time.perf_counter() - start
+    state.error = None
+    state.ready = True
+    logger.info(
+        "Warm-up finished in %.3fs with %d connections",
+        state.duration,
+        state.connections,
+    )
+
+
+async def run_warm_up(max_backoff: float = 30.0) -> None:
+    """
+    Keep retrying warm-up in the background until it succeeds, so the
+    worker can answer liveness probes while the database is unreachable.
+    """
+    backoff = 0.5
+    while not state.ready:
+        try:
+            await run_in_threadpool(warm_up)
+        except Exception as e:  # noqa
+            state.error = repr(e)
+            logger.warning("Warm-up failed, retrying in %.1fs: %r", backoff, e)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, max_backoff)
@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+from starlette.concurrency import run_in_threadpool
+
+from app import crud
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.todo_event import TodoEvent
+
+logger = logging.getLogger(__name__)
+
+# Most skipped outbox ids kept for another look; beyond that the oldest go
+MAX_GAPS = 100_000
+
+
+class Event(NamedTuple):
+    id: int
+    owner_id: int
+    todo_id: int
+    kind: str
+    payload: str
+
+    @classmethod
+    def from_row(cls, row: TodoEvent) -> "Event":
+        return cls(row.id, row.owner_id, row.todo_id, row.kind, row.payload)
+
+    def json(self) -> str:
+        # payload is JSON already, so it is spliced in rather than re-encoded
+        return (
+            f'{{"id":{self.id},"kind":"{self.kind}",'
+            f'"todo_id":{self.todo_id},"data":{self.payload}}}'
+        )
+
+
+# Sent instead of the next event when a subscriber cannot be caught up; the
+# client should resync through GET /todos/changes and resubscribe.
+RESYNC = Event(0, 0, 0, "resync", "{}")
+
+
+class Subscription:
+    __slots__ = ("owner_id", "queue", "last_id", "closed", "held", "replayed")
+
+    def __init__(self, owner_id: int, last_id: int, buffer_size: int):
+        self.owner_id = owner_id
+        # Bounded: a consumer that falls this far behind is cut off.
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(buffer_size)
+        self.last_id = last_id
+        self.closed = False
+        # Live events (and whether they are late) held back while the
+        # outbox is being replayed
+        self.held: Optional[List[Tuple[Event, bool]]] = None
+        # Ids delivered by the replay, which a late event may repeat
+        self.replayed: Set[int] = set()
+
+    def offer(self, event: Event, live: bool = True, late: bool = False) -> bool:
+        """
+        Queue `event` unless already delivered. A `late` event committed
+        after events with higher ids were published, so it is delivered
+        even though its id is below the last one. False once the buffer is
+        full.
+        """
+        if self.closed:
+            return False
+        if live and self.held is not None:
+            if len(self.held) >= self.queue.maxsize:
+                self.closed = True
+                return False
+            self.held.append((event, late))
+            return True
+        if late:
+            if event.id in self.replayed:
+                return True
+        elif event.id and event.id <= self.last_id:
+            return True
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.closed = True
+            return False
+        if not live:
+            self.replayed.add(event.id)
+        if event.id:
+            self.last_id = max(self.last_id, event.id)
+        return True
+
+    async def get(self, timeout: float) -> Optional[Event]:
+        """Next event, RESYNC after an overflow, or None on timeout."""
+        if self.closed and self.queue.empty():
+            return RESYNC
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return RESYNC if self.closed else None
+
+
+def _load_head() -> int:
+    db = SessionLocal()
+    try:
+        return db.scalar(select(func.max(TodoEvent.id))) or 0
+    finally:
+        db.close()
+
+
+def _load_events(after: int, limit: int) -> List[Event]:
+    db = SessionLocal()
+    try:
+        rows = db.scalars(
+            select(TodoEvent)
+            .where(TodoEvent.id > after)
+            .order_by(TodoEvent.id)
+            .limit(limit)
+        ).all()
+        return [Event.from_row(row) for row in rows]
+    finally:
+        db.close()
+
+
+def _load_event_ids(ids: List[int]) -> List[Event]:
+    db = SessionLocal()
+    try:
+        events = []
+        for start in range(0, len(ids), 1000):
+            rows = db.scalars(
+                select(TodoEvent)
+                .where(TodoEvent.id.in_(ids[start : start + 1000]))
+                .order_by(TodoEvent.id)
+            ).all()
+            events.extend(Event.from_row(row) for row in rows)
+        return events
+    finally:
+        db.close()
+
+
+def _load_user_events(owner_id: int, after: int, limit: int) -> List[Event]:
+    db = SessionLocal()
+    try:
+        rows = crud.todo.get_events(db, owner_id=owner_id, after=after, limit=limit)
+        return [Event.from_row(row) for row in rows]
+    finally:
+        db.close()
+
+
+class EventDispatcher:
+    """
+    Tails the todo_event outbox once per worker and fans new events out to
+    the subscriptions of their owner. The outbox is only polled while
+    someone is subscribed, and an idle subscription is just a small object
+    and an empty queue.
+
+    Outbox ids are handed out on insert but become visible on commit, not
+    necessarily in order. Ids the tail skips over are looked up again on
+    every poll for EVENT_GAP_TIMEOUT seconds, and published late when their
+    transaction commits; ids of rolled back inserts are given up.
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = settings.EVENT_POLL_INTERVAL,
+        buffer_size: int = settings.EVENT_BUFFER_SIZE,
+        replay_limit: int = settings.EVENT_REPLAY_LIMIT,
+    ):
+        self.poll_interval = poll_interval
+        self.buffer_size = buffer_size
+        self.replay_limit = replay_limit
+        self.subscriptions: Dict[int, Set[Subscription]] = {}
+        self.last_id: Optional[int] = None
+        # Ids below last_id not seen yet, with when they were first missed
+        self._gaps: Dict[int, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def subscribe(
+        self, owner_id: int, offset: Optional[int] = None
+    ) -> Subscription:
+        """
+        Subscribe to `owner_id`'s events. With `offset`, events after it are
+        replayed from the outbox first; if there are more than the replay
+        limit the subscription starts with a RESYNC.
+        """
+        if self.last_id is None:
+            # Fix the point live events start from before subscribing, so an
+            # event committed meanwhile is either replayed or published.
+            head = await run_in_threadpool(_load_head)
+            if self.last_id is None:
+                self.last_id = head
+        subscription = Subscription(owner_id, offset or 0, self.buffer_size)
+        self.subscriptions.setdefault(owner_id, set()).add(subscription)
+        if offset is None:
+            return subscription
+
+        subscription.held = []
+        events = await run_in_threadpool(
+            _load_user_events, owner_id, offset, self.replay_limit + 1
+        )
+        if len(events) > self.replay_limit:
+            subscription.closed = True
+        for event in events:
+            subscription.offer(event, live=False)
+        held, subscription.held = subscription.held, None
+        for event, late in held:
+            subscription.offer(event, late=late)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self.subscriptions.get(subscription.owner_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self.subscriptions[subscription.owner_id]
+
+    def publish(self, event: Event, late: bool = False) -> None:
+        for subscription in list(self.subscriptions.get(event.owner_id, ())):
+            if not subscription.closed and not subscription.offer(event, late=late):
+                logger.info("Dropping slow subscriber of user %s", event.owner_id)
+
+    async def poll(self) -> int:
+        if not self.subscriptions:
+            # Nobody listens; start from the head again once someone does.
+            self.last_id = None
+            self._gaps.clear()
+            return 0
+        events = await run_in_threadpool(_load_events, self.last_id, 1000)
+        now = time.monotonic()
+        for event in events:
+            for missing in range(self.last_id + 1, event.id):
+                self._gaps[missing] = now
+            self.publish(event)
+            self.last_id = event.id
+        if len(self._gaps) > MAX_GAPS:
+            logger.warning(
+                "%d outbox ids missing, dropping the oldest", len(self._gaps)
+            )
+            for missing in sorted(self._gaps)[: len(self._gaps) - MAX_GAPS]:
+                del self._gaps[missing]
+        if not self._gaps:
+            return len(events)
+
+        late = await run_in_threadpool(_load_event_ids, sorted(self._gaps))
+        for event in late:
+            del self._gaps[event.id]
+            self.publish(event, late=True)
+        # Rolled back, or still uncommitted after a generous while
+        cutoff = time.monotonic() - settings.EVENT_GAP_TIMEOUT
+        for missing, missed_at in list(self._gaps.items()):
+            if missed_at < cutoff:
+                del self._gaps[missing]
+        return len(events) + len(late)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                published = await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Polling the todo event outbox failed")
+                published = 0
+            if not published:
+                await asyncio.sleep(self.poll_interval)
+
+
+dispatcher = EventDispatcher()
@@ -0,0 +1,156 @@
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.core.config import settings
+from app.jobs.registry import tasks
+from app.models.job import Job, JobStatus
+
+
+def _db_now(db: Session) -> datetime:
+    return db.scalar(select(func.now()))
+
+
+def enqueue(
+    db: Session,
+    name: str,
+    payload: Optional[Dict[str, Any]] = None,
+    *,
+    delay: Optional[timedelta] = None,
+) -> Job:
+    """
+    Add a job for the task registered as `name`. The job is only flushed:
+    it becomes visible to workers when the caller's transaction commits,
+    so a request that fails never leaves a job behind.
+    """
+    registered = tasks[name]
+    job = Job(
+        name=name,
+        queue=registered.queue,
+        payload=json.dumps(payload or {}),
+        max_attempts=registered.max_attempts,
+    )
+    if delay is not None:
+        job.run_at = _db_now(db) + delay
+    db.add(job)
+    db.flush()
+    return job
+
+
+def _claimable(now: datetime, queues: Sequence[str]):
+    # Running jobs whose lock has expired belong to a worker that died.
+    stale = now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    return and_(
+        Job.queue.in_(queues),
+        or_(
+            and_(Job.status == JobStatus.QUEUED, Job.run_at <= now),
+            and_(Job.status == JobStatus.RUNNING, Job.locked_at < stale),
+        ),
+    )
+
+
+def claim(db: Session, worker_id: str, queues: Sequence[str], limit: int) -> List[int]:
+    """
+    Lock up to `limit` due jobs for `worker_id`, commit the claim and return
+    the claimed job ids.
+
+    MySQL 8 and PostgreSQL skip rows other workers are claiming with
+    SELECT ... FOR UPDATE SKIP LOCKED. Other databases (SQLite) fall back to
+    a conditional UPDATE per candidate; the row count says who won it.
+    """
+    now = _db_now(db)
+    query = select(Job).where(_claimable(now, queues)).order_by(Job.run_at).limit(limit)
+    claimed = {"status": JobStatus.RUNNING, "locked_by": worker_id, "locked_at": now}
+
+    if db.get_bind().dialect.name in ("mysql", "postgresql"):
+        jobs = db.scalars(query.with_for_update(skip_locked=True)).all()
+        for job in jobs:
+            for key, value in claimed.items():
+                setattr(job, key, value)
+        won = [job.id for job in jobs]
+        db.commit()
+        return won
+
+    candidates = db.scalars(query.with_only_columns(Job.id)).all()
+    won = []
+    for job_id in candidates:
+        result = db.execute(
+            update(Job)
+            .where(Job.id == job_id, _claimable(now, queues))
+            .values(**claimed)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            won.append(job_id)
+    db.commit()
+    return won
+
+
+def _held(worker_id: str):
+    return and_(Job.status == JobStatus.RUNNING, Job.locked_by == worker_id)
+
+
+def renew(db: Session, worker_id: str, job_ids: Sequence[int]) -> int:
+    """
+    Move the lock of the running jobs `job_ids` that `worker_id` still holds
+    to now, so they are not taken for abandoned while they run. Returns how
+    many it still holds.
+    """
+    if not job_ids:
+        return 0
+    result = db.execute(
+        update(Job)
+        .where(_held(worker_id), Job.id.in_(job_ids))
+        .values(locked_at=_db_now(db))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+
+def _finish(db: Session, job: Job, worker_id: str, **values: Any) -> bool:
+    # Only while `worker_id` holds the lock: a job whose lock expired may
+    # have been claimed, and be running, elsewhere
+    result = db.execute(
+        update(Job)
+        .where(Job.id == job.id, _held(worker_id))
+        .values(attempts=Job.attempts + 1, locked_by=None, locked_at=None, **values)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def complete(db: Session, job: Job, worker_id: str) -> bool:
+    """Mark `job` done; False when `worker_id` no longer held it."""
+    return _finish(db, job, worker_id, status=JobStatus.DONE, last_error=None)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff with full jitter."""
+    cap = min(settings.JOB_RETRY_MAX_DELAY, settings.JOB_RETRY_BASE_DELAY * 2**attempts)
+    return timedelta(seconds=random.uniform(0, cap))
+
+
+def fail(db: Session, job: Job, worker_id: str, error: str) -> bool:
+    """
+    Record a failed attempt of `job`: queue it again after a backoff, or
+    mark it failed once out of attempts. False when `worker_id` no longer
+    held it.
+    """
+    attempts = job.attempts + 1
+    if attempts >= job.max_attempts:
+        return _finish(db, job, worker_id, status=JobStatus.FAILED, last_error=error)
+    return _finish(
+        db,
+        job,
+        worker_id,
+        status=JobStatus.QUEUED,
+        last_error=error,
+        run_at=_db_now(db) + retry_delay(attempts),
+    )
@@ -0,0 +1,20 @@
+from typing import Callable, Dict, NamedTuple
+
+
+class Task(NamedTuple):
+    fn: Callable[..., None]
+    queue: str
+    max_attempts: int
+
+
+tasks: Dict[str, Task] = {}
+
+
+def task(name: str, queue: str = "default", max_attempts: int = 5):
+    """Register `fn` as a job handler, called with the job's payload as kwargs."""
+
+    def decorator(fn: Callable[..., None]) -> Callable[..., None]:
+        tasks[name] = Task(fn, queue, max_attempts)
+        return fn
+
+    return decorator
@@ -0,0 +1,185 @@
+"""
+Send due date reminders: a "reminder" event on the todo event stream, and
+an email (the "send_email" job) when emails are configured.
+
+    python -m app.jobs.reminders
+
+Only todos due within the next REMINDER_WINDOW are held in memory, in a
+timer wheel; every window the next one is loaded through
+ix_todo_reminded_at_due_at, so pending reminders further out cost nothing.
+A todo given a due date inside the loaded window is picked up by the next
+load, at most a window late. Claiming a reminder locks the todo and checks
+it is still due, so a rescheduled or completed todo is not reminded of and
+a second scheduler (on MySQL) sends nothing twice.
+"""
+
+import logging
+import math
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+
+from app import crud
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.db.types import utc_now
+from app.jobs import queue, tasks  # noqa: F401, registers the tasks
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class TimerWheel:
+    """
+    Timers in `slots` buckets of `tick` seconds, covering the `slots * tick`
+    seconds from the last expiry. Adding, moving and expiring a timer cost
+    O(1) whatever the number of timers.
+    """
+
+    def __init__(self, tick: float, slots: int, now: float):
+        self.tick = tick
+        self.slots = slots
+        self.buckets: List[Dict[int, float]] = [{} for _ in range(slots)]
+        self.slot_of: Dict[int, int] = {}
+        self.cursor = int(now // tick)
+
+    def __len__(self) -> int:
+        return len(self.slot_of)
+
+    def add(self, key: int, at: float) -> bool:
+        """Set the timer `key` for `at`; False if that is past the horizon."""
+        slot = int(at // self.tick)
+        if slot >= self.cursor + self.slots:
+            return False
+        self.remove(key)
+        slot = max(slot, self.cursor) % self.slots
+        self.buckets[slot][key] = at
+        self.slot_of[key] = slot
+        return True
+
+    def remove(self, key: int) -> None:
+        slot = self.slot_of.pop(key, None)
+        if slot is not None:
+            del self.buckets[slot][key]
+
+    def expire(self, now: float) -> List[int]:
+        """Keys of the timers due by `now`, removed from the wheel."""
+        target = int(now // self.tick)
+        due: List[int] = []
+        for cursor in range(self.cursor, min(target, self.cursor + self.slots)):
+            due.extend(self._take(cursor % self.slots))
+        self.cursor = max(self.cursor, target)
+        slot = target % self.slots
+        due.extend(
+            self._take(slot, [k for k, at in self.buckets[slot].items() if at <= now])
+        )
+        return due
+
+    def _take(self, slot: int, keys: Optional[List[int]] = None) -> List[int]:
+        bucket = self.buckets[slot]
+        keys = list(bucket) if keys is None else keys
+        for key in keys:
+            del bucket[key]
+            del self.slot_of[key]
+        return keys
+
+
+class ReminderScheduler:
+    def __init__(
+        self,
+        window: float = settings.REMINDER_WINDOW,
+        tick: float = settings.REMINDER_TICK,
+        max_lateness: float = settings.REMINDER_MAX_LATENESS,
+    ):
+        self.window = window
+        self.max_lateness = max_lateness
+        self.clock_offset = 0.0
+        # Loads reach two windows ahead, so the wheel covers that and a tick
+        self.wheel = TimerWheel(tick, math.ceil(2 * window / tick) + 1, self.now())
+        self.next_load = 0.0
+        self._stopping = threading.Event()
+
+    def stop(self, *args) -> None:
+        self._stopping.set()
+
+    def now(self) -> float:
+        # Seconds on the database clock, which due_at is compared with
+        return time.time() + self.clock_offset
+
+    def load(self) -> None:
+        db = SessionLocal()
+        try:
+            db_now = db.scalar(select(utc_now()))
+            self.clock_offset = (db_now - EPOCH).total_seconds() - time.time()
+            pending = crud.todo.get_pending_reminders(
+                db,
+                start=db_now - timedelta(seconds=self.max_lateness),
+                end=db_now + timedelta(seconds=2 * self.window),
+            )
+        finally:
+            db.close()
+        for todo_id, due_at in pending:
+            self.wheel.add(todo_id, (due_at - EPOCH).total_seconds())
+        logger.info("Loaded %d reminders, %d pending", len(pending), len(self.wheel))
+
+    def fire(self, todo_ids: List[int]) -> int:
+        db = SessionLocal()
+        try:
+            todos = crud.todo.claim_reminders(db, todo_ids)
+            if todos and settings.EMAILS_ENABLED:
+                emails = dict(
+                    db.execute(
+                        select(User.id, User.email).where(
+                            User.id.in_({todo.owner_id for todo in todos})
+                        )
+                    ).all()
+                )
+                for todo in todos:
+                    queue.enqueue(
+                        db,
+                        "send_email",
+                        {
+                            "email_to": emails[todo.owner_id],
+                            "subject": f"Reminder: {todo.title}",
+                            "body": f"{todo.title} is due at {todo.due_at} UTC.",
+                        },
+                    )
+            db.commit()
+        finally:
+            db.close()
+        return len(todos)
+
+    def run_once(self) -> int:
+        if self.now() >= self.next_load:
+            self.load()
+            self.next_load = self.now() + self.window
+        due = self.wheel.expire(self.now())
+        return self.fire(due) if due else 0
+
+    def run(self) -> None:
+        logger.info("Sending reminders, %ss ahead", self.window)
+        while not self._stopping.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Sending reminders failed")
+            tick = self.wheel.tick
+            self._stopping.wait(tick - self.now() % tick)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    scheduler = ReminderScheduler()
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    signal.signal(signal.SIGINT, scheduler.stop)
+    scheduler.run()
+
+
+if __name__ == "__main__":
+    main()
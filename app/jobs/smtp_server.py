@@ -0,0 +1,100 @@
+"""
+Minimal SMTP server that keeps every message it receives in memory, to
+stand in for a real mail server when running the worker locally.
+Use it with SMTP_TLS=False and no SMTP_USER.
+
+    python -m app.jobs.smtp_server --port 1025
+"""
+
+import argparse
+import email
+import logging
+import socketserver
+import threading
+from email.message import Message
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self) -> None:
+        self.reply("220 localhost SMTP stand-in ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("utf-8", "replace").strip().upper()
+            if command.startswith(("HELO", "EHLO")):
+                self.reply("250 localhost")
+            elif command.startswith(("MAIL FROM", "RCPT TO", "RSET", "NOOP")):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                self.server.receive(self.read_data())
+                self.reply("250 OK: queued")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+    def read_data(self) -> bytes:
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line.rstrip(b"\r\n") == b".":
+                return b"".join(lines)
+            # Undo dot-stuffing.
+            lines.append(line[1:] if line.startswith(b"..") else line)
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _SMTPHandler)
+        self.messages: List[Message] = []
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def receive(self, data: bytes) -> None:
+        message = email.message_from_bytes(data)
+        self.messages.append(message)
+        logger.info("Received mail to %s: %s", message["To"], message["Subject"])
+
+    def start(self) -> "LocalSMTPServer":
+        """Serve from a daemon thread; use for in-process end-to-end runs."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = LocalSMTPServer(args.host, args.port)
+    logger.info("SMTP stand-in listening on %s:%d", args.host, server.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
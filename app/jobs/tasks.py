@@ -0,0 +1,43 @@
+from app import crud
+from app.core.config import settings
+from app.db.archival import archive_completed
+from app.db.compaction import compact
+from app.db.session import SessionLocal
+from app.jobs.registry import task
+from app.utils import send_email
+
+
+@task("send_email", queue="email", max_attempts=8)
+def send_email_task(email_to: str, subject: str, body: str) -> None:
+    send_email(email_to=email_to, subject=subject, body=body)
+
+
+@task("compact", max_attempts=3)
+def compact_task() -> None:
+    db = SessionLocal()
+    try:
+        compact(db)
+    finally:
+        db.close()
+
+
+@task("archive", max_attempts=3)
+def archive_task() -> None:
+    db = SessionLocal()
+    try:
+        archive_completed(db)
+    finally:
+        db.close()
+
+
+@task("rebalance_todos", max_attempts=3)
+def rebalance_todos_task(owner_id: int) -> None:
+    db = SessionLocal()
+    try:
+        # Every move past the length limit enqueues one until the first runs
+        longest = crud.todo.longest_position(db, owner_id=owner_id)
+        if longest > settings.TODO_POSITION_REBALANCE_LENGTH:
+            crud.todo.rebalance(db, owner_id=owner_id)
+            db.commit()
+    finally:
+        db.close()
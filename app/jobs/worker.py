@@ -0,0 +1,175 @@
+"""
+Run queued jobs outside of the request path.
+
+    python -m app.jobs.worker --queues default,email --concurrency 4
+"""
+
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Sequence, Set
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.jobs import queue, tasks  # noqa: F401, registers the tasks
+from app.jobs.registry import tasks as registered_tasks
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    def __init__(
+        self,
+        queues: Sequence[str] = ("default",),
+        concurrency: int = settings.JOB_WORKER_CONCURRENCY,
+        poll_interval: float = settings.JOB_POLL_INTERVAL,
+    ):
+        self.queues = list(queues)
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        # Claiming never takes more jobs than there are idle threads.
+        self.in_flight = 0
+        # Ids of the claimed jobs, whose locks the heartbeat renews
+        self.running: Set[int] = set()
+        self.next_heartbeat = 0.0
+        self.claim_failures = 0
+
+    def stop(self, *args) -> None:
+        logger.info("Worker %s stopping after running jobs finish", self.worker_id)
+        self._stopping.set()
+
+    def run_job(self, job_id: int) -> None:
+        db = SessionLocal()
+        try:
+            job = db.get(Job, job_id)
+            if job is None:
+                # Purged between the claim and now
+                logger.warning("Job %s is gone; not running it", job_id)
+                return
+            try:
+                registered_tasks[job.name].fn(**json.loads(job.payload))
+            except Exception:
+                logger.exception("Job %s (%s) failed", job.id, job.name)
+                db.rollback()
+                held = queue.fail(
+                    db, job, self.worker_id, traceback.format_exc(limit=5)
+                )
+            else:
+                held = queue.complete(db, job, self.worker_id)
+            if not held:
+                logger.warning(
+                    "Job %s (%s) lost its lock to another worker; result dropped",
+                    job.id,
+                    job.name,
+                )
+        finally:
+            db.close()
+            with self._lock:
+                self.in_flight -= 1
+                self.running.discard(job_id)
+
+    def run_once(self, executor: ThreadPoolExecutor) -> int:
+        with self._lock:
+            free = self.concurrency - self.in_flight
+        if free <= 0:
+            return 0
+        db = SessionLocal()
+        try:
+            job_ids = queue.claim(db, self.worker_id, self.queues, free)
+        except Exception:
+            # The database is down or overloaded; keep the worker up and
+            # poll again after a backoff (see idle_wait)
+            self.claim_failures += 1
+            logger.exception(
+                "Worker %s failed to claim jobs (%d in a row)",
+                self.worker_id,
+                self.claim_failures,
+            )
+            return 0
+        finally:
+            db.close()
+        self.claim_failures = 0
+        with self._lock:
+            self.in_flight += len(job_ids)
+            self.running.update(job_ids)
+        for job_id in job_ids:
+            executor.submit(self.run_job, job_id)
+        return len(job_ids)
+
+    def heartbeat(self) -> None:
+        """Renew the locks of the running jobs, so long ones are not re-run."""
+        with self._lock:
+            job_ids = list(self.running)
+        if not job_ids:
+            return
+        db = SessionLocal()
+        try:
+            held = queue.renew(db, self.worker_id, job_ids)
+        except Exception:
+            logger.exception("Worker %s failed to renew its job locks", self.worker_id)
+            return
+        finally:
+            db.close()
+        if held < len(job_ids):
+            logger.warning(
+                "Worker %s lost the locks of %d jobs",
+                self.worker_id,
+                len(job_ids) - held,
+            )
+
+    def idle_wait(self) -> float:
+        return min(
+            self.poll_interval * 2**self.claim_failures,
+            max(self.poll_interval, settings.JOB_CLAIM_MAX_BACKOFF),
+        )
+
+    def run(self, once: bool = False) -> None:
+        logger.info(
+            "Worker %s polling %s with concurrency %d",
+            self.worker_id,
+            self.queues,
+            self.concurrency,
+        )
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while not self._stopping.is_set():
+                if time.monotonic() >= self.next_heartbeat:
+                    self.heartbeat()
+                    self.next_heartbeat = (
+                        time.monotonic() + settings.JOB_HEARTBEAT_INTERVAL
+                    )
+                claimed = self.run_once(executor)
+                if once and not claimed and not self.in_flight:
+                    break
+                if not claimed:
+                    self._stopping.wait(self.idle_wait())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queues", default="default,email")
+    parser.add_argument(
+        "--concurrency", type=int, default=settings.JOB_WORKER_CONCURRENCY
+    )
+    parser.add_argument("--once", action="store_true", help="Exit once no job is due.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    worker = Worker(args.queues.split(","), args.concurrency)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run(once=args.once)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,24 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from starlette.concurrency import run_in_threadpool
 
+from app.api import health
+from app.api.routing import deadline_exceeded, pool_timeout
+from app.api.openapi import setup_openapi
 from app.api.api_v1.api import api_router
 from app.core.config import settings
+from app.core.revocation import revocations
+from app.db import warmup
+from app.db.deadline import DeadlineExceeded
+from app.db.session import engine
+from app.events.dispatcher import dispatcher
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.concurrency import ConcurrencyLimitMiddleware
+from app.middleware.idempotency import IdempotencyMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
 
 description = """
     TODO Project API 🚀
@@ -33,8 +50,26 @@ tags_metadata = [
         "name": "Address",
         "description": "Address information for users",
     },
+    {
+        "name": "Health",
+        "description": "Liveness and readiness probes",
+    },
 ]
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(openapi_document.build)
+    warm_up_task = asyncio.create_task(warmup.run_warm_up())
+    dispatcher.start()
+    revocations.start()
+    yield
+    await revocations.stop()
+    await dispatcher.stop()
+    warm_up_task.cancel()
+    engine.dispose()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description=description,
@@ -45,10 +80,30 @@ app = FastAPI(
         "email": "earthlyz9.dev@gmail.com",
     },
     openapi_tags=tags_metadata,
+    lifespan=lifespan,
+    # Served precompressed by setup_openapi below
+    openapi_url=None,
 )
+openapi_document = setup_openapi(app)
 
+app.include_router(health.router)
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+app.add_exception_handler(DeadlineExceeded, deadline_exceeded)
+app.add_exception_handler(PoolTimeout, pool_timeout)
+
+# The last middleware added runs first: shed load before spending anything
+# on rate limit bookkeeping. Idempotent replays are stored uncompressed.
+app.add_middleware(IdempotencyMiddleware)
+app.add_middleware(CompressionMiddleware)
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+# Event streams are long-lived and mostly idle, so they are not counted.
+app.add_middleware(
+    ConcurrencyLimitMiddleware,
+    exempt_paths=("/healthz", "/readyz", f"{settings.API_V1_STR}/events/stream"),
+)
+
 # if settings.BACKEND_CORS_ORIGINS:
 #     app.add_middleware(
 #         CORSMiddleware,
@@ -0,0 +1,199 @@
+import zlib
+from abc import ABC, abstractmethod
+from typing import Iterable, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Payloads of these types are already compressed (or, for event streams,
+# latency sensitive) and are sent as they are.
+UNCOMPRESSIBLE_TYPES = (
+    "image/",
+    "video/",
+    "audio/",
+    "application/zip",
+    "application/gzip",
+    "text/event-stream",
+)
+
+
+def available_encodings() -> List[str]:
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def select_encoding(accept_encoding: str, available: Iterable[str]) -> Optional[str]:
+    """Pick the client's preferred encoding among `available`, or None."""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.lower()] = q
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class Encoder(ABC):
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        """Compress `data`; some of it may stay buffered."""
+
+    @abstractmethod
+    def flush(self) -> bytes:
+        """Emit everything buffered so far, keeping the stream open."""
+
+    @abstractmethod
+    def finish(self) -> bytes:
+        """Emit the rest and end the stream."""
+
+
+class GzipEncoder(Encoder):
+    def __init__(self, level: int = settings.GZIP_LEVEL):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+class BrotliEncoder(Encoder):
+    def __init__(self, quality: int = settings.BROTLI_QUALITY):
+        self._obj = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+ENCODERS = {"gzip": GzipEncoder, "br": BrotliEncoder}
+
+
+class CompressionMiddleware:
+    """
+    Compress response bodies of at least `minimum_size` bytes with brotli
+    (when installed) or gzip. Streaming responses are compressed chunk by
+    chunk and flushed after every chunk, so they stay incremental.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = settings.COMPRESSION_MINIMUM_SIZE,
+        encodings: Optional[List[str]] = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = encodings or available_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            encoding = select_encoding(
+                Headers(scope=scope).get("accept-encoding", ""), self.encodings
+            )
+            if encoding is not None:
+                responder = _CompressionResponder(send, encoding, self.minimum_size)
+                await self.app(scope, receive, responder.send)
+                return
+        await self.app(scope, receive, send)
+
+
+class _CompressionResponder:
+    def __init__(self, send: Send, encoding: str, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message: Optional[Message] = None
+        self.encoder: Optional[Encoder] = None
+        # True once we know this response is sent without touching it.
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = "content-encoding" in headers or content_type.startswith(
+                UNCOMPRESSIBLE_TYPES
+            )
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        if self.passthrough:
+            await self._flush_start()
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self._flush_start()
+                await self._send(message)
+                return
+            self.encoder = ENCODERS[self.encoding]()
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                body = self.encoder.compress(body) + self.encoder.finish()
+                headers["Content-Length"] = str(len(body))
+                await self._flush_start()
+                await self._send({"type": "http.response.body", "body": body})
+                return
+            await self._flush_start()
+
+        chunk = self.encoder.compress(body)
+        chunk += self.encoder.flush() if more_body else self.encoder.finish()
+        await self._send(
+            {"type": "http.response.body", "body": chunk, "more_body": more_body}
+        )
+
+    async def _flush_start(self) -> None:
+        if self.start_message is not None:
+            message, self.start_message = self.start_message, None
+            await self._send(message)
+
+
+def precompress(body: bytes) -> List[Tuple[str, bytes]]:
+    """Compress `body` once with every available encoding, at maximum level."""
+    variants = [("gzip", GzipEncoder(level=9))]
+    if brotli is not None:
+        variants.insert(0, ("br", BrotliEncoder(quality=11)))
+    return [
+        (encoding, encoder.compress(body) + encoder.finish())
+        for encoding, encoder in variants
+    ]
@@ -0,0 +1,48 @@
+from typing import Tuple
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+
+
+class ConcurrencyLimitMiddleware:
+    """
+    Shed load with 503 + Retry-After once `max_in_flight` requests are being
+    served by this worker, instead of queueing them behind a busy threadpool
+    and DB pool. Health probes are never shed.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_in_flight: int = settings.MAX_IN_FLIGHT_REQUESTS,
+        retry_after: int = settings.LOAD_SHED_RETRY_AFTER,
+        exempt_paths: Tuple[str, ...] = ("/healthz", "/readyz"),
+    ):
+        self.app = app
+        self.max_in_flight = max_in_flight
+        self.retry_after = retry_after
+        self.exempt_paths = exempt_paths
+        # Only touched from the event loop thread, so no lock is needed.
+        self.in_flight = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        if self.in_flight >= self.max_in_flight:
+            response = JSONResponse(
+                {"detail": "Server is busy. Try again later."},
+                status_code=503,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
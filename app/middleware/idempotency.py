@@ -0,0 +1,335 @@
+import hashlib
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import timedelta
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import func
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.middleware.identity import get_user_id
+from app.models.idempotency_key import IdempotencyKey
+
+# Client errors the same request gets again however often it is retried.
+# The others (401, 403, 404, 408, 409, 425, 429, ...) depend on credentials,
+# the state of other resources or load, so a retry runs the request again.
+REPLAYED_CLIENT_ERRORS = frozenset({400, 405, 410, 413, 415, 422})
+
+
+def is_replayed(status_code: int) -> bool:
+    return 200 <= status_code < 300 or status_code in REPLAYED_CLIENT_ERRORS
+
+
+class StoredResponse(NamedTuple):
+    fingerprint: str
+    # None while the first request is still running
+    status_code: Optional[int]
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+
+
+class IdempotencyStore(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> Optional[StoredResponse]:
+        """The response stored for `key`, in flight or not, or None."""
+
+    @abstractmethod
+    async def reserve(self, key: str, fingerprint: str, ttl: int) -> bool:
+        """
+        Mark `key` as in flight for `ttl` seconds. False if the key is
+        already taken.
+        """
+
+    @abstractmethod
+    async def save(self, key: str, response: StoredResponse, ttl: int) -> None:
+        """Store the response of `key`, kept for `ttl` seconds from now."""
+
+    @abstractmethod
+    async def release(self, key: str) -> None:
+        """Forget an in-flight key whose request failed, so it can be retried."""
+
+
+class MemoryStore(IdempotencyStore):
+    """Per-process store. Least recently used keys are dropped past `max_keys`."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._items: "OrderedDict[str, Tuple[float, StoredResponse]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[StoredResponse]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        if item[0] < time.monotonic():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return item[1]
+
+    def _put(self, key: str, response: StoredResponse, ttl: int) -> None:
+        self._items[key] = (time.monotonic() + ttl, response)
+        self._items.move_to_end(key)
+        if len(self._items) > self.max_keys:
+            self._items.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[StoredResponse]:
+        with self._lock:
+            return self._get(key)
+
+    async def reserve(self, key: str, fingerprint: str, ttl: int) -> bool:
+        with self._lock:
+            if self._get(key) is not None:
+                return False
+            self._put(key, StoredResponse(fingerprint, None, [], b""), ttl)
+            return True
+
+    async def save(self, key: str, response: StoredResponse, ttl: int) -> None:
+        with self._lock:
+            self._put(key, response, ttl)
+
+    async def release(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+
+class DatabaseStore(IdempotencyStore):
+    """
+    Store shared by every worker, in the idempotency_key table. Lookups go
+    through the unique index on the hashed key.
+    """
+
+    def _get(self, key: str) -> Optional[StoredResponse]:
+        db = SessionLocal()
+        try:
+            row = db.scalar(
+                select(IdempotencyKey).where(
+                    IdempotencyKey.key == key, IdempotencyKey.expires_at > func.now()
+                )
+            )
+            if row is None:
+                return None
+            headers = [
+                (name.encode("latin-1"), value.encode("latin-1"))
+                for name, value in json.loads(row.headers or "[]")
+            ]
+            return StoredResponse(
+                row.fingerprint, row.status_code, headers, row.body or b""
+            )
+        finally:
+            db.close()
+
+    def _reserve(self, key: str, fingerprint: str, ttl: int) -> bool:
+        db = SessionLocal()
+        try:
+            now = db.scalar(select(func.now()))
+            # An expired row may still be around until compaction removes it.
+            db.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.key == key, IdempotencyKey.expires_at <= now
+                )
+            )
+            db.add(
+                IdempotencyKey(
+                    key=key,
+                    fingerprint=fingerprint,
+                    expires_at=now + timedelta(seconds=ttl),
+                )
+            )
+            db.commit()
+            return True
+        except IntegrityError:
+            db.rollback()
+            return False
+        finally:
+            db.close()
+
+    def _save(self, key: str, response: StoredResponse, ttl: int) -> None:
+        db = SessionLocal()
+        try:
+            row = db.scalar(select(IdempotencyKey).where(IdempotencyKey.key == key))
+            if row is not None:
+                row.expires_at = db.scalar(select(func.now())) + timedelta(seconds=ttl)
+                row.status_code = response.status_code
+                row.headers = json.dumps(
+                    [
+                        (name.decode("latin-1"), value.decode("latin-1"))
+                        for name, value in response.headers
+                    ]
+                )
+                row.body = response.body
+                db.commit()
+        finally:
+            db.close()
+
+    def _release(self, key: str) -> None:
+        db = SessionLocal()
+        try:
+            db.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key))
+            db.commit()
+        finally:
+            db.close()
+
+    async def get(self, key: str) -> Optional[StoredResponse]:
+        return await run_in_threadpool(self._get, key)
+
+    async def reserve(self, key: str, fingerprint: str, ttl: int) -> bool:
+        return await run_in_threadpool(self._reserve, key, fingerprint, ttl)
+
+    async def save(self, key: str, response: StoredResponse, ttl: int) -> None:
+        await run_in_threadpool(self._save, key, response, ttl)
+
+    async def release(self, key: str) -> None:
+        await run_in_threadpool(self._release, key)
+
+
+def get_store() -> IdempotencyStore:
+    if settings.IDEMPOTENCY_BACKEND == "database":
+        return DatabaseStore()
+    return MemoryStore()
+
+
+class IdempotencyMiddleware:
+    """
+    Replay the stored response of a POST retried with the same
+    Idempotency-Key header, without running the endpoint (or its request
+    validation) again. Keys are scoped to the authenticated user and route.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: Optional[IdempotencyStore] = None,
+        paths: Tuple[str, ...] = (
+            f"{settings.API_V1_STR}/todos/",
+            f"{settings.API_V1_STR}/address/",
+        ),
+        ttl: int = settings.IDEMPOTENCY_TTL,
+        lease: int = settings.IDEMPOTENCY_LEASE,
+    ):
+        self.app = app
+        self.store = store or get_store()
+        self.paths = paths
+        self.ttl = ttl
+        self.lease = lease
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+        client_key = Headers(scope=scope).get("idempotency-key")
+        user_id = get_user_id(scope)
+        # Without a valid token the request fails authentication anyway.
+        if client_key is None or user_id is None:
+            await self.app(scope, receive, send)
+            return
+        if not 0 < len(client_key) <= 255:
+            await JSONResponse(
+                {"detail": "Idempotency-Key must be 1 to 255 characters long."},
+                status_code=400,
+            )(scope, receive, send)
+            return
+
+        key = hashlib.sha256(
+            f"{user_id}:{scope['method']}:{scope['path']}:{client_key}".encode()
+        ).hexdigest()
+        body = await _read_body(receive)
+        fingerprint = hashlib.sha256(body).hexdigest()
+
+        stored = await self.store.get(key)
+        if stored is None and await self.store.reserve(key, fingerprint, self.lease):
+            await self._run(key, fingerprint, body, scope, send)
+            return
+        if stored is None:
+            # Lost the race to reserve the key to a concurrent retry.
+            stored = await self.store.get(key)
+
+        if stored is not None and stored.fingerprint != fingerprint:
+            response = JSONResponse(
+                {"detail": "Idempotency-Key was used with a different request."},
+                status_code=422,
+            )
+        elif stored is None or stored.status_code is None:
+            response = JSONResponse(
+                {"detail": "A request with this Idempotency-Key is in progress."},
+                status_code=409,
+                headers={"Retry-After": "1"},
+            )
+        else:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": stored.status_code,
+                    "headers": stored.headers + [(b"idempotent-replayed", b"true")],
+                }
+            )
+            await send({"type": "http.response.body", "body": stored.body})
+            return
+        await response(scope, receive, send)
+
+    async def _run(
+        self, key: str, fingerprint: str, body: bytes, scope: Scope, send: Send
+    ) -> None:
+        sent_body = False
+
+        async def receive() -> Message:
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return {"type": "http.disconnect"}
+
+        status_code = None
+        headers: List[Tuple[bytes, bytes]] = []
+        chunks: List[bytes] = []
+
+        async def capture(message: Message) -> None:
+            nonlocal status_code, headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture)
+        except BaseException:
+            await self.store.release(key)
+            raise
+        # Only successes and deterministic client errors are stored; after
+        # anything else (server errors, 401, 429, ...) the client may retry.
+        if status_code is None or not is_replayed(status_code):
+            await self.store.release(key)
+            return
+        await self.store.save(
+            key,
+            StoredResponse(fingerprint, status_code, headers, b"".join(chunks)),
+            self.ttl,
+        )
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
@@ -0,0 +1,35 @@
+from typing import Optional
+
+from jose import JWTError
+from starlette.types import Scope
+
+from app.core import security
+
+
+def get_bearer_token(scope: Scope) -> Optional[str]:
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                return token
+            return None
+    return None
+
+
+def get_user_id(scope: Scope) -> Optional[int]:
+    """
+    User id claimed by the bearer token, verified by signature only.
+    No database lookup happens here.
+    """
+    token = get_bearer_token(scope)
+    if token is None:
+        return None
+    try:
+        return security.decode_access_token(token).get("id")
+    except JWTError:
+        return None
+
+
+def get_client_ip(scope: Scope) -> str:
+    client = scope.get("client")
+    return client[0] if client else "unknown"
@@ -0,0 +1,179 @@
+import math
+import re
+from abc import ABC, abstractmethod
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.middleware.identity import get_client_ip, get_user_id
+
+# Refill the bucket for the time elapsed since the last hit, then take one
+# token. Returns the number of seconds to wait (0 when the hit is allowed).
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(retry_after)
+"""
+
+
+def take_token(
+    tokens: float, ts: float, now: float, rate: float, burst: int
+) -> Tuple[float, float]:
+    """Python twin of TOKEN_BUCKET_LUA. Returns (tokens_left, retry_after)."""
+    tokens = min(burst, tokens + max(0.0, now - ts) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    async def hit(self, key: str, rate: float, burst: int) -> float:
+        """Take one token from `key`'s bucket. Returns seconds to wait, or 0."""
+
+
+class MemoryBackend(RateLimitBackend):
+    """Per-process buckets. Least recently used keys are dropped past `max_keys`."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def hit(self, key: str, rate: float, burst: int) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, ts = self._buckets.pop(key, (burst, now))
+            tokens, retry_after = take_token(tokens, ts, now, rate, burst)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+
+class RedisBackend(RateLimitBackend):
+    """
+    Buckets shared by every worker. `client` is a `redis.asyncio.Redis`, or
+    anything exposing the same `register_script` API such as `FakeRedis`.
+    """
+
+    def __init__(self, client, prefix: str = "ratelimit:"):
+        self.prefix = prefix
+        self._script = client.register_script(TOKEN_BUCKET_LUA)
+
+    async def hit(self, key: str, rate: float, burst: int) -> float:
+        retry_after = await self._script(keys=[self.prefix + key], args=[rate, burst])
+        return float(retry_after)
+
+
+class FakeRedis:
+    """
+    In-process stand-in for a shared redis, for local runs and development.
+    Only the token bucket script is supported.
+    """
+
+    def __init__(self):
+        self.buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def register_script(self, source: str):
+        if source != TOKEN_BUCKET_LUA:
+            raise ValueError("FakeRedis only runs TOKEN_BUCKET_LUA.")
+
+        async def script(keys: List[str], args: List[float]) -> str:
+            rate, burst = float(args[0]), int(args[1])
+            now = time.time()
+            with self._lock:
+                tokens, ts = self.buckets.get(keys[0], (burst, now))
+                tokens, retry_after = take_token(tokens, ts, now, rate, burst)
+                self.buckets[keys[0]] = (tokens, now)
+            return str(retry_after)
+
+        return script
+
+
+def get_backend() -> RateLimitBackend:
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        import redis.asyncio
+
+        return RedisBackend(redis.asyncio.Redis.from_url(settings.RATE_LIMIT_REDIS_URL))
+    if settings.RATE_LIMIT_BACKEND == "fake-redis":
+        return RedisBackend(FakeRedis())
+    return MemoryBackend()
+
+
+_id_segment = re.compile(r"/\d+(?=/|$)")
+
+
+class RateLimitMiddleware:
+    """
+    Token bucket per (user, route). Unauthenticated requests and the
+    login/signup routes are keyed by client IP with a stricter limit.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        backend: Optional[RateLimitBackend] = None,
+        auth_paths: Tuple[str, ...] = (
+            f"{settings.API_V1_STR}/auth/login",
+            f"{settings.API_V1_STR}/auth/signup",
+        ),
+        limited_prefix: str = settings.API_V1_STR,
+    ):
+        self.app = app
+        self.backend = backend or get_backend()
+        self.auth_paths = auth_paths
+        self.limited_prefix = limited_prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.limited_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        # Collapse ids so /todos/1 and /todos/2 share one bucket.
+        route = f"{scope['method']} {_id_segment.sub('/{id}', scope['path'])}"
+        if scope["path"] in self.auth_paths:
+            identity = f"ip:{get_client_ip(scope)}"
+            rate, burst = (
+                settings.AUTH_RATE_LIMIT_PER_SECOND,
+                settings.AUTH_RATE_LIMIT_BURST,
+            )
+        else:
+            user_id = get_user_id(scope)
+            identity = (
+                f"user:{user_id}"
+                if user_id is not None
+                else f"ip:{get_client_ip(scope)}"
+            )
+            rate, burst = settings.RATE_LIMIT_PER_SECOND, settings.RATE_LIMIT_BURST
+
+        retry_after = await self.backend.hit(f"{identity}:{route}", rate, burst)
+        if retry_after > 0:
+            response = JSONResponse(
+                {"detail": "Too many requests."},
+                status_code=429,
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
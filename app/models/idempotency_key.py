@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, LargeBinary, String, Text
+from sqlalchemy.sql import func
+
+from app.db.base_class import Base
+from app.db.types import Timestamp
+
+
+# Response stored for an Idempotency-Key; status_code is NULL while the
+# first request carrying the key is still running.
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_key"
+
+    # sha256 of user, method, path and the client's key
+    key = Column(String(64), nullable=False, unique=True, index=True)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer)
+    headers = Column(Text)
+    body = Column(LargeBinary(length=2**24))
+    expires_at = Column(Timestamp, nullable=False)
+    created_at = Column(Timestamp, server_default=func.now())
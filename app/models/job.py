@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Index, Integer, String, Text
+from sqlalchemy.sql import func
+
+from app.db.base_class import Base
+from app.db.types import Timestamp
+from app.models.mixins import TimestampMixin
+
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class Job(Base, TimestampMixin):
+    __table_args__ = (Index("ix_job_status_queue_run_at", "status", "queue", "run_at"),)
+
+    queue = Column(String(50), nullable=False, default="default")
+    name = Column(String(100), nullable=False)
+    # JSON encoded keyword arguments of the task
+    payload = Column(Text, nullable=False, default="{}")
+    status = Column(String(20), nullable=False, default=JobStatus.QUEUED)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_at = Column(Timestamp, nullable=False, server_default=func.now())
+    locked_by = Column(String(100))
+    locked_at = Column(Timestamp)
+    last_error = Column(Text)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String
+from sqlalchemy.sql import func
+
+from app.db.base_class import Base
+from app.db.types import Timestamp
+
+
+# Where a backfill of app.db.online_migration got to, so that it resumes
+# after an interruption instead of starting over.
+class MigrationProgress(Base):
+    __tablename__ = "migration_progress"
+
+    name = Column(String(100), nullable=False, unique=True, index=True)
+    # Rows with ids up to last_id are done; max_id is the end of the range
+    last_id = Column(Integer, nullable=False, default=0)
+    max_id = Column(Integer, nullable=False, default=0)
+    rows = Column(Integer, nullable=False, default=0)
+    finished_at = Column(Timestamp)
+    created_at = Column(Timestamp, server_default=func.now())
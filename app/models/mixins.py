@@ -1,9 +1,17 @@
-from sqlalchemy import TIMESTAMP, Column, text
+from sqlalchemy import Column
 from sqlalchemy.sql import func
 
+from app.db.types import Timestamp
+
 
 class TimestampMixin(object):
-    created_at = Column(TIMESTAMP, server_default=func.now())
-    updated_at = Column(
-        TIMESTAMP, server_default=text("NULL ON UPDATE CURRENT_TIMESTAMP")
-    )
+    created_at = Column(Timestamp, server_default=func.now())
+    # Stamped by SQLAlchemy on every UPDATE it issues, on any database
+    # (MySQL's ON UPDATE CURRENT_TIMESTAMP is kept by existing tables)
+    updated_at = Column(Timestamp, nullable=True, onupdate=func.now())
+
+
+class SoftDeleteMixin(object):
+    # Set instead of deleting the row; CRUDBase hides rows where this is set
+    # and app.db.compaction purges them after the retention period.
+    deleted_at = Column(Timestamp, nullable=True)
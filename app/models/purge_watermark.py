@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String
+
+from app.db.base_class import Base
+from app.db.types import Timestamp
+
+
+# How far app.db.compaction has purged a table: rows stamped before
+# purged_before (naive UTC) may be gone. Sync tokens older than the
+# todo_tombstone watermark can't be trusted to have seen every delete.
+class PurgeWatermark(Base):
+    __tablename__ = "purge_watermark"
+
+    name = Column(String(100), nullable=False, unique=True, index=True)
+    purged_before = Column(Timestamp, nullable=False)
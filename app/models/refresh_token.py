@@ -0,0 +1,21 @@
+from sqlalchemy import Column, ForeignKey, Index, Integer, String
+from sqlalchemy.sql import func
+
+from app.db.base_class import Base
+from app.db.types import Timestamp
+
+
+# One row per issued refresh token. Each refresh revokes the presented token
+# and issues the next one in the same family; presenting a revoked token
+# again means it leaked, and revokes the whole family.
+class RefreshToken(Base):
+    __tablename__ = "refresh_token"
+    __table_args__ = (Index("ix_refresh_token_family", "family"),)
+
+    # sha256 of the token; the token itself is only known to the client
+    token_hash = Column(String(64), nullable=False, unique=True, index=True)
+    family = Column(String(32), nullable=False)
+    user_id = Column(Integer, ForeignKey("user.id"), nullable=False, index=True)
+    expires_at = Column(Timestamp, nullable=False)
+    revoked_at = Column(Timestamp, nullable=True)
+    created_at = Column(Timestamp, server_default=func.now())
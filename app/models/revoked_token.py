@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String
+from sqlalchemy.sql import func
+
+from app.db.base_class import Base
+from app.db.types import Timestamp
+
+
+# Access tokens revoked before they expire, by their jti claim. Every worker
+# tails this table into an in-memory filter (app.core.revocation); rows are
+# purged by compaction once the token has expired anyway.
+class RevokedToken(Base):
+    __tablename__ = "revoked_token"
+
+    jti = Column(String(32), nullable=False, unique=True, index=True)
+    expires_at = Column(Timestamp, nullable=False, index=True)
+    created_at = Column(Timestamp, server_default=func.now())
@@ -1,15 +1,45 @@
-from sqlalchemy import Boolean, Column, Integer, String, ForeignKey
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, String, text
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
-from app.models.mixins import TimestampMixin
+from app.db.types import OrderKey, Timestamp
+from app.models.mixins import SoftDeleteMixin, TimestampMixin
 
 
-class Todo(Base, TimestampMixin):
+class Todo(Base, TimestampMixin, SoftDeleteMixin):
+    __table_args__ = (
+        # Backs the delta sync query of GET /todos/changes
+        Index("ix_todo_owner_id_updated_at", "owner_id", "updated_at", "id"),
+        # Live todos of an owner. Partial where the dialect supports it,
+        # composite (owner_id, deleted_at) on MySQL.
+        Index(
+            "ix_todo_owner_id_deleted_at",
+            "owner_id",
+            "deleted_at",
+            postgresql_where=text("deleted_at IS NULL"),
+            sqlite_where=text("deleted_at IS NULL"),
+        ),
+        # Open todos of an owner by due date, for GET /todos/due
+        Index(
+            "ix_todo_owner_id_isCompleted_due_at", "owner_id", "isCompleted", "due_at"
+        ),
+        # Reminders still to send, by due date (app.jobs.reminders)
+        Index("ix_todo_reminded_at_due_at", "reminded_at", "due_at"),
+        # An owner's todos in their manual order, for GET /todos/
+        Index("ix_todo_owner_id_position", "owner_id", "position", "id"),
+    )
+
     title = Column(String(200))
     description = Column(String(500))
     priority = Column(Integer)
     isCompleted = Column(Boolean, default=False)
     owner_id = Column(Integer, ForeignKey("user.id"))
+    due_at = Column(Timestamp, nullable=True)
+    # When the due date reminder went out; reset when due_at changes
+    reminded_at = Column(Timestamp, nullable=True)
+    # Manual order key (app.core.fractional_index), ties broken by id. Todos
+    # from before manual ordering have none and come first until their
+    # owner's keys are rebalanced.
+    position = Column(OrderKey, nullable=True)
 
     owner = relationship("User", back_populates="todos")
@@ -0,0 +1,26 @@
+from sqlalchemy import Boolean, Column, Index, Integer, String
+from sqlalchemy.sql import func
+
+from app.db.base_class import Base
+from app.db.types import OrderKey, Timestamp
+
+
+# Completed todos moved out of `todo` by app.db.archival, keeping their ids,
+# so that the hot table only holds active work. CRUDTodo reads through to
+# it, and moves a todo back when it is changed again.
+class TodoArchive(Base):
+    __tablename__ = "todo_archive"
+    __table_args__ = (Index("ix_todo_archive_owner_id_id", "owner_id", "id"),)
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=False)
+    title = Column(String(200))
+    description = Column(String(500))
+    priority = Column(Integer)
+    isCompleted = Column(Boolean)
+    owner_id = Column(Integer, nullable=False)
+    due_at = Column(Timestamp)
+    reminded_at = Column(Timestamp)
+    position = Column(OrderKey)
+    created_at = Column(Timestamp)
+    updated_at = Column(Timestamp)
+    archived_at = Column(Timestamp, server_default=func.now())
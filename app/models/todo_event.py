@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Index, Integer, String, Text
+from sqlalchemy.sql import func
+
+from app.db.base_class import Base
+from app.db.types import Timestamp
+
+
+# Transactional outbox: one row per todo mutation, written in the same
+# transaction by CRUDTodo. The id doubles as the stream offset.
+class TodoEvent(Base):
+    __tablename__ = "todo_event"
+    __table_args__ = (Index("ix_todo_event_owner_id_id", "owner_id", "id"),)
+
+    owner_id = Column(Integer, nullable=False)
+    todo_id = Column(Integer, nullable=False)
+    kind = Column(String(20), nullable=False)
+    # JSON encoded TodoOut, or {"id": ...} for deletes
+    payload = Column(Text, nullable=False)
+    created_at = Column(Timestamp, server_default=func.now())
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Index, Integer
+from sqlalchemy.sql import func
+
+from app.db.base_class import Base
+from app.db.types import Timestamp
+
+
+# Left behind by every deleted todo so that sync clients learn about the delete
+class TodoTombstone(Base):
+    __tablename__ = "todo_tombstone"
+    __table_args__ = (Index("ix_todo_tombstone_owner_id_id", "owner_id", "id"),)
+
+    todo_id = Column(Integer, nullable=False)
+    owner_id = Column(Integer, nullable=False)
+    deleted_at = Column(Timestamp, server_default=func.now())
@@ -2,22 +2,27 @@ from sqlalchemy import Boolean, Column, Integer, String, ForeignKey
 from sqlalchemy.orm import relationship, validates
 
 from app.db.base_class import Base
-from app.models.mixins import TimestampMixin
+from app.models.mixins import SoftDeleteMixin, TimestampMixin
 
 
-class User(Base, TimestampMixin):
+class User(Base, TimestampMixin, SoftDeleteMixin):
     email = Column(String(100), unique=True, index=True)
     username = Column(String(30), unique=True, index=True)
     first_name = Column(String(30))
     last_name = Column(String(30))
-    hashed_password = Column(String(50))
+    # bcrypt hashes are 60 characters, argon2 ones around 100
+    hashed_password = Column(String(255))
     is_active = Column(Boolean, default=True)
     phone_number = Column(String(11))
-    address_id = Column(Integer, ForeignKey("address.id"), nullable=True)
+    address_id = Column(Integer, ForeignKey("address.id"), nullable=True, index=True)
     is_admin = Column(Boolean, default=False)
     is_superuser = Column(Boolean, default=False)
 
-    todos = relationship("Todo", back_populates="owner")
+    todos = relationship(
+        "Todo",
+        back_populates="owner",
+        primaryjoin="and_(User.id == Todo.owner_id, Todo.deleted_at.is_(None))",
+    )
     address = relationship("Address", back_populates="user")
 
     @validates("email")
@@ -1,4 +1,3 @@
-import copy
 from datetime import datetime
 from typing import Optional
 
@@ -35,10 +34,14 @@ class AddressOut(AddressCreate):
     updated_at: Optional[datetime] = None
 
     class Config(AddressCreate.Config):
-        schema_extra = copy.deepcopy(AddressCreate.Config.schema_extra)
-        schema_extra["example"]["id"] = 0
-        schema_extra["example"]["created_at"] = "2022-06-28 16:55:47"
-        schema_extra["example"]["updated_at"] = "2022-06-29 17:00:42"
+        schema_extra = {
+            "example": {
+                **AddressCreate.Config.schema_extra["example"],
+                "id": 0,
+                "created_at": "2022-06-28 16:55:47",
+                "updated_at": "2022-06-29 17:00:42",
+            }
+        }
 
 
 class AddressUpdate(AddressCreate):
@@ -1,5 +1,3 @@
-import copy
-
 from app.schemas.address_schema import AddressOut
 from app.schemas.user_schema import UserOut
 
@@ -8,5 +6,9 @@ class AddressWithUser(AddressOut):
     user: UserOut
 
     class Config(AddressOut.Config):
-        schema_extra = copy.deepcopy(AddressOut.Config.schema_extra)
-        schema_extra["example"]["user"] = UserOut.Config.schema_extra["example"]
+        schema_extra = {
+            "example": {
+                **AddressOut.Config.schema_extra["example"],
+                "user": UserOut.Config.schema_extra["example"],
+            }
+        }
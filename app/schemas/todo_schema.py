@@ -1,8 +1,7 @@
-import copy
-from datetime import datetime
-from typing import Optional, Union
+from datetime import datetime, timezone
+from typing import List, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, validator
 
 
 class TodoCreate(BaseModel):
@@ -12,6 +11,16 @@ class TodoCreate(BaseModel):
         gt=0, lt=6, description="The priority must be between 1 and 5."
     )
     isCompleted: Optional[bool] = Field(default=False)
+    due_at: Optional[datetime] = Field(
+        default=None, description="Due date, UTC unless an offset is given."
+    )
+
+    @validator("due_at")
+    def due_at_in_utc(cls, v: Optional[datetime]) -> Optional[datetime]:
+        # Stored as naive UTC, like the other timestamps
+        if v is not None and v.tzinfo is not None:
+            return v.astimezone(timezone.utc).replace(tzinfo=None)
+        return v
 
     class Config:
         orm_mode = True
@@ -21,6 +30,7 @@ class TodoCreate(BaseModel):
                 "description": "Go to Udemy courses",
                 "priority": 3,
                 "isCompleted": False,
+                "due_at": "2022-07-01 09:00:00",
             }
         }
 
@@ -39,10 +49,47 @@ class TodoOut(TodoCreate):
     owner_id: int
     created_at: datetime
     updated_at: Union[datetime, None] = None
+    position: Optional[str] = Field(
+        default=None, description="Manual order key; todos sort by it, then id."
+    )
 
     class Config(TodoCreate.Config):
-        schema_extra = copy.deepcopy(TodoCreate.Config.schema_extra)
-        schema_extra["example"]["id"] = 0
-        schema_extra["example"]["owner_id"] = 1
-        schema_extra["example"]["created_at"] = "2022-06-28 16:55:47"
-        schema_extra["example"]["updated_at"] = "2022-06-29 17:00:42"
+        schema_extra = {
+            "example": {
+                **TodoCreate.Config.schema_extra["example"],
+                "id": 0,
+                "owner_id": 1,
+                "created_at": "2022-06-28 16:55:47",
+                "updated_at": "2022-06-29 17:00:42",
+                "position": "a0",
+            }
+        }
+
+
+class TodoMove(BaseModel):
+    after_id: Optional[int] = Field(
+        default=None, description="Todo to put it right after; first when null."
+    )
+
+    class Config:
+        schema_extra = {"example": {"after_id": 3}}
+
+
+class TodoChanges(BaseModel):
+    changes: List[TodoOut]
+    deleted: List[int]
+    next_token: str
+    has_more: bool
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "changes": [TodoOut.Config.schema_extra["example"]],
+                "deleted": [3, 4],
+                "next_token": (
+                    "eyJ0IjoiMjAyMi0wNi0yOVQxNzowMDo0MiIsImkiOjAsImQiOjQsInMiOiIy"
+                    "MDIyLTA2LTI5VDE3OjAxOjAzIn0"
+                ),
+                "has_more": False,
+            }
+        }
@@ -0,0 +1,38 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class Token(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    # Seconds until access_token expires
+    expires_in: int
+    refresh_token: str
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "access_token": "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9...",
+                "token_type": "bearer",
+                "expires_in": 900,
+                "refresh_token": "Xq3n0Zf1b9mH0aWc5v2Jx8kLr4sT7uY6pE1dG3hK9oQ",
+            }
+        }
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+    class Config:
+        schema_extra = {
+            "example": {"refresh_token": "Xq3n0Zf1b9mH0aWc5v2Jx8kLr4sT7uY6pE1dG3hK9oQ"}
+        }
+
+
+class LogoutRequest(BaseModel):
+    # Also revoke this refresh token (and the tokens rotated from it)
+    refresh_token: Optional[str] = None
+
+    class Config:
+        schema_extra = RefreshRequest.Config.schema_extra
@@ -1,4 +1,3 @@
-import copy
 from datetime import datetime
 from typing import Optional, Union
 
@@ -36,9 +35,13 @@ class UserCreate(UserBase):
     phone_number: Optional[str] = Field(default=None, max_length=11, min_length=11)
 
     class Config(UserBase.Config):
-        schema_extra = copy.deepcopy(UserBase.Config.schema_extra)
-        schema_extra["example"]["password"] = "linda2927"
-        schema_extra["example"]["phone_number"] = "01029277729"
+        schema_extra = {
+            "example": {
+                **UserBase.Config.schema_extra["example"],
+                "password": "linda2927",
+                "phone_number": "01029277729",
+            }
+        }
 
 
 class UserOut(UserBase):
@@ -48,26 +51,34 @@ class UserOut(UserBase):
     updated_at: Optional[datetime] = None
 
     class Config(UserBase.Config):
-        schema_extra = copy.deepcopy(UserBase.Config.schema_extra)
-        schema_extra["example"]["id"] = 0
-        schema_extra["example"]["phone_number"] = "01029277729"
-        schema_extra["example"]["created_at"] = "2022-06-28 16:55:47"
-        schema_extra["example"]["updated_at"] = "2022-06-29 17:00:42"
+        schema_extra = {
+            "example": {
+                **UserBase.Config.schema_extra["example"],
+                "id": 0,
+                "phone_number": "01029277729",
+                "created_at": "2022-06-28 16:55:47",
+                "updated_at": "2022-06-29 17:00:42",
+            }
+        }
 
 
 class UserWithAddress(UserOut):
     address: Optional[AddressOut]
 
     class Config(UserOut.Config):
-        schema_extra = copy.deepcopy(UserOut.Config.schema_extra)
-        schema_extra["example"]["address"] = {
-            "address1": "1  Washington Cir, NW",
-            "address2": "",
-            "city": "Washington",
-            "state": "District of Columbia",
-            "country": "United States",
-            "zipcode": "20037",
-            "apt_num": "307",
+        schema_extra = {
+            "example": {
+                **UserOut.Config.schema_extra["example"],
+                "address": {
+                    "address1": "1  Washington Cir, NW",
+                    "address2": "",
+                    "city": "Washington",
+                    "state": "District of Columbia",
+                    "country": "United States",
+                    "zipcode": "20037",
+                    "apt_num": "307",
+                },
+            }
         }
 
 
@@ -100,6 +111,10 @@ class UserInDB(UserBase):
     phone_number: str = Field(default=None, max_length=11, min_length=11)
 
     class Config(UserBase.Config):
-        schema_extra = copy.deepcopy(UserBase.Config.schema_extra)
-        schema_extra["example"]["hashed_password"] = ""
-        schema_extra["example"]["phone_number"] = "01029277729"
+        schema_extra = {
+            "example": {
+                **UserBase.Config.schema_extra["example"],
+                "hashed_password": "",
+                "phone_number": "01029277729",
+            }
+        }
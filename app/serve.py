@@ -0,0 +1,247 @@
+"""
+Serve the API with gunicorn managing uvicorn workers.
+
+    python -m app.serve [--bind 0.0.0.0:8000] [--workers N]
+    python -m app.serve --bench [--bench-workers 1,2,4] [--bench-seconds 10]
+
+The app is imported once in the master and forked into the workers, which
+dispose of the inherited connection pool (see app.db.session). SIGTERM
+stops accepting connections and gives in-flight requests
+SERVE_GRACEFUL_TIMEOUT seconds to finish. `--bench` starts the server with
+each worker count in turn and reports the throughput of a keep-alive load.
+"""
+
+import argparse
+import asyncio
+import math
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+
+def cpu_count() -> int:
+    """CPUs this process may use: its affinity mask, capped by a cgroup quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = _cgroup_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(cpus, 1)
+
+
+def _cgroup_cpu_quota() -> Optional[float]:
+    try:
+        # cgroup v2: "<quota> <period>", quota being "max" when unlimited
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        return None if quota <= 0 else quota / period
+    except (OSError, ValueError):
+        return None
+
+
+def gunicorn_options(bind: str, workers: int) -> Dict[str, Any]:
+    options = {
+        "bind": bind,
+        "workers": workers or cpu_count(),
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "timeout": settings.SERVE_TIMEOUT,
+        "graceful_timeout": settings.SERVE_GRACEFUL_TIMEOUT,
+        "keepalive": settings.SERVE_KEEPALIVE,
+        "max_requests": settings.SERVE_MAX_REQUESTS,
+        "max_requests_jitter": settings.SERVE_MAX_REQUESTS_JITTER,
+        "accesslog": "-",
+    }
+    # Worker heartbeats go to a file; keep it off disk-backed /tmp
+    if os.path.isdir("/dev/shm"):
+        options["worker_tmp_dir"] = "/dev/shm"
+    return options
+
+
+def serve(bind: str, workers: int, access_log: bool = True) -> None:
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        sys.exit("python -m app.serve needs gunicorn and uvicorn installed")
+
+    class Server(BaseApplication):
+        def __init__(self, options: Dict[str, Any]):
+            self.options = options
+            super().__init__()
+
+        def load_config(self) -> None:
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app.main import app, openapi_document
+
+            # Rendered before forking, so no worker has to
+            openapi_document.build()
+            return app
+
+    options = gunicorn_options(bind, workers)
+    if not access_log:
+        options["accesslog"] = None
+    Server(options).run()
+
+
+# Benchmark mode
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _client(host: str, port: int, path: str, deadline: float) -> int:
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode()
+    done = 0
+    while time.monotonic() < deadline:
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while time.monotonic() < deadline:
+                writer.write(request)
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    name, _, value = line.partition(b":")
+                    if name.lower() == b"content-length":
+                        length = int(value)
+                await reader.readexactly(length)
+                done += 1
+        except (ConnectionError, asyncio.IncompleteReadError):
+            # The worker was recycled (max_requests); reconnect like a client
+            pass
+        finally:
+            writer.close()
+    return done
+
+
+def _load(args) -> int:
+    host, port, path, connections, seconds = args
+
+    async def run() -> int:
+        deadline = time.monotonic() + seconds
+        counts = await asyncio.gather(
+            *(_client(host, port, path, deadline) for _ in range(connections))
+        )
+        return sum(counts)
+
+    return asyncio.run(run())
+
+
+def _wait_until_up(host: str, port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+def bench(
+    worker_counts: List[int],
+    path: str,
+    seconds: float,
+    clients: int,
+    connections: int,
+) -> None:
+    host = "127.0.0.1"
+    baseline = None
+    print(f"GET {path}, {clients} client processes x {connections} connections")
+    for workers in worker_counts:
+        port = _free_port()
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "app.serve",
+                "--bind",
+                f"{host}:{port}",
+                "--workers",
+                str(workers),
+                "--no-access-log",
+            ],
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            _wait_until_up(host, port)
+            # Let every worker finish its startup before measuring
+            time.sleep(1 + 0.2 * workers)
+            with multiprocessing.Pool(clients) as pool:
+                total = sum(
+                    pool.map(
+                        _load, [(host, port, path, connections, seconds)] * clients
+                    )
+                )
+        finally:
+            server.terminate()
+            server.wait()
+        rps = total / seconds
+        baseline = baseline or rps / workers
+        print(
+            f"{workers:3d} workers {rps:10.0f} req/s  "
+            f"scaling {rps / baseline / workers:6.0%}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--bind", default=settings.SERVE_BIND)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.SERVE_WORKERS,
+        help="0 for one per available CPU",
+    )
+    parser.add_argument("--no-access-log", action="store_true")
+    parser.add_argument("--bench", action="store_true")
+    parser.add_argument(
+        "--bench-workers", help="e.g. 1,2,4; default doubles to the CPU count"
+    )
+    parser.add_argument("--bench-path", default="/healthz")
+    parser.add_argument("--bench-seconds", type=float, default=10)
+    parser.add_argument("--bench-clients", type=int, default=max(cpu_count() // 2, 1))
+    parser.add_argument("--bench-connections", type=int, default=32)
+    args = parser.parse_args()
+
+    if not args.bench:
+        serve(args.bind, args.workers, access_log=not args.no_access_log)
+        return
+    if args.bench_workers:
+        worker_counts = [int(n) for n in args.bench_workers.split(",")]
+    else:
+        worker_counts = [1]
+        while worker_counts[-1] * 2 <= cpu_count():
+            worker_counts.append(worker_counts[-1] * 2)
+    bench(
+        worker_counts,
+        args.bench_path,
+        args.bench_seconds,
+        args.bench_clients,
+        args.bench_connections,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,60 @@
 # 기타 유틸리티 로직
+import base64
+import json
+import smtplib
+from datetime import datetime
+from email.message import EmailMessage
+from typing import NamedTuple, Optional
+
+from app.core.config import settings
+
+
+class SyncCursor(NamedTuple):
+    updated_at: Optional[datetime] = None
+    todo_id: int = 0
+    tombstone_id: int = 0
+    # The client has every delete made before this (naive UTC); None for a
+    # token from before it was recorded
+    synced_at: Optional[datetime] = None
+
+
+def encode_sync_token(cursor: SyncCursor) -> str:
+    data = {
+        "t": cursor.updated_at.isoformat() if cursor.updated_at else None,
+        "i": cursor.todo_id,
+        "d": cursor.tombstone_id,
+        "s": cursor.synced_at.isoformat() if cursor.synced_at else None,
+    }
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_sync_token(token: str) -> SyncCursor:
+    """Raises ValueError for a token that was not made by encode_sync_token."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json.loads(raw)
+        updated_at = datetime.fromisoformat(data["t"]) if data["t"] else None
+        synced_at = datetime.fromisoformat(data["s"]) if data.get("s") else None
+        return SyncCursor(updated_at, int(data["i"]), int(data["d"]), synced_at)
+    except (TypeError, KeyError, json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid sync token.") from e
+
+
+def send_email(email_to: str, subject: str, body: str) -> None:
+    """
+    Send a plain text email through the configured SMTP server. Blocking, so
+    call it from a job (the "send_email" task), never from a request.
+    """
+    assert settings.EMAILS_ENABLED, "no provided configuration for email variables"
+    message = EmailMessage()
+    message["From"] = f"{settings.EMAILS_FROM_NAME} <{settings.EMAILS_FROM_EMAIL}>"
+    message["To"] = email_to
+    message["Subject"] = subject
+    message.set_content(body)
+    with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=30) as smtp:
+        if settings.SMTP_TLS:
+            smtp.starttls()
+        if settings.SMTP_USER:
+            smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        smtp.send_message(message)
@@ -0,0 +1,120 @@
+"""
+How long requests hold a pooled database connection, against how long they
+take, for concurrent GET /todos/ of a user with many todos.
+
+    RATE_LIMIT_ENABLED=false python -m benchmarks.connection_hold \\
+        [--todos 2000] [--requests 200] [--concurrency 16] [--no-release]
+
+Runs the app in process against the configured database. --no-release
+keeps sessions (and connections) until the response is sent, as before
+SessionRoute. Rows are created for a throwaway user and removed afterwards.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+
+import httpx
+from sqlalchemy import delete, event, insert
+
+from app.api import routing
+from app.core.security import create_access_token
+from app.db.base import Base
+from app.db.session import engine
+from app.main import app
+from app.models.todo import Todo
+from app.models.user import User
+
+
+async def load(requests: int, concurrency: int, headers: Dict[str, str]) -> List[float]:
+    timings: List[float] = []
+    queue = iter(range(requests))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+
+        async def worker() -> None:
+            for _ in queue:
+                started = time.perf_counter()
+                response = await c.get("/api/v1/todos/", headers=headers)
+                response.raise_for_status()
+                timings.append(time.perf_counter() - started)
+
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--todos", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--no-release", action="store_true")
+    args = parser.parse_args()
+    if args.no_release:
+        routing.release_sessions = lambda values: None
+
+    Base.metadata.create_all(engine)
+    stamp = time.time_ns()
+    with engine.begin() as conn:
+        owner_id = conn.execute(
+            insert(User).values(
+                username=f"bench-{stamp}",
+                email=f"bench-{stamp}@example.com",
+                hashed_password="",
+            )
+        ).inserted_primary_key[0]
+        conn.execute(
+            insert(Todo),
+            [
+                {
+                    "title": f"todo {i}",
+                    "description": "x" * 100,
+                    "priority": 3,
+                    "owner_id": owner_id,
+                }
+                for i in range(args.todos)
+            ],
+        )
+    headers = {"Authorization": f"Bearer {create_access_token('bench', owner_id)}"}
+
+    held: List[float] = []
+    checked_out: Dict[int, float] = {}
+    busy = peak = 0
+
+    @event.listens_for(engine.pool, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+        nonlocal busy, peak
+        checked_out[id(connection_record)] = time.perf_counter()
+        busy += 1
+        peak = max(peak, busy)
+
+    @event.listens_for(engine.pool, "checkin")
+    def checkin(dbapi_connection, connection_record) -> None:
+        nonlocal busy
+        started = checked_out.pop(id(connection_record), None)
+        if started is not None:
+            held.append(time.perf_counter() - started)
+            busy -= 1
+
+    try:
+        started = time.perf_counter()
+        timings = asyncio.run(load(args.requests, args.concurrency, headers))
+        elapsed = time.perf_counter() - started
+    finally:
+        event.remove(engine.pool, "checkout", checkout)
+        event.remove(engine.pool, "checkin", checkin)
+        with engine.begin() as conn:
+            conn.execute(delete(Todo).where(Todo.owner_id == owner_id))
+            conn.execute(delete(User).where(User.id == owner_id))
+
+    print(
+        f"{len(timings) / elapsed:7.1f} requests/s, "
+        f"request {sum(timings) / len(timings) * 1000:7.1f} ms, "
+        f"connection held {sum(held) / len(timings) * 1000:7.1f} ms per request, "
+        f"at most {peak} connections checked out"
+    )
+
+
+if __name__ == "__main__":
+    main()
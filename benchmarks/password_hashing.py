@@ -0,0 +1,71 @@
+"""
+Hashes per second for each bcrypt cost (and argon2 when installed), on one
+thread and on one thread per CPU.
+
+    python -m benchmarks.password_hashing [--rounds 10,11,12,13] [--seconds 2]
+        [--target-ms 250]
+
+Use it to pick BCRYPT_ROUNDS against the login latency objective; signup
+and login each cost one hash. --target-ms also prints the most rounds whose
+hash fits the target on this machine; run it on the slowest host and set
+the result everywhere.
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+from passlib.hash import argon2
+
+from app.core.security import calibrate_bcrypt_rounds
+
+
+def rate(context: CryptContext, seconds: float, threads: int) -> float:
+    context.hash("warm-up")
+
+    def worker() -> int:
+        count = 0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            context.hash("correct horse battery staple")
+            count += 1
+        return count
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        counts = [f.result() for f in [executor.submit(worker) for _ in range(threads)]]
+    return sum(counts) / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rounds", default="10,11,12,13")
+    parser.add_argument("--seconds", type=float, default=2)
+    parser.add_argument("--target-ms", type=float)
+    args = parser.parse_args()
+
+    if args.target_ms is not None:
+        rounds = calibrate_bcrypt_rounds(args.target_ms)
+        print(f"BCRYPT_ROUNDS={rounds} fits a {args.target_ms:.0f} ms hash here")
+
+    cpus = os.cpu_count() or 1
+    settings = [
+        (f"bcrypt rounds={r}", CryptContext(schemes=["bcrypt"], bcrypt__rounds=int(r)))
+        for r in args.rounds.split(",")
+    ]
+    if argon2.has_backend():
+        settings.append(("argon2 (passlib defaults)", CryptContext(schemes=["argon2"])))
+    else:
+        print("argon2 skipped: argon2-cffi is not installed")
+
+    print(f"{'setting':<28}{'ms/hash':>10}{'1 thread':>12}{f'{cpus} threads':>14}")
+    for name, context in settings:
+        single = rate(context, args.seconds, 1)
+        parallel = rate(context, args.seconds, cpus) if cpus > 1 else single
+        print(f"{name:<28}{1000 / single:>10.1f}{single:>10.1f}/s{parallel:>12.1f}/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Compare loading todos as ORM instances with loading them as the read-only
+rows of CRUDBase.get_multi_rows, both serialized through TodoOut.
+
+    python -m benchmarks.projection [--rows 100000] [--url sqlite://]
+
+Rows are inserted for a throwaway user and removed afterwards, so `--url`
+may point at a development database. Reports wall time and the peak memory
+allocated while loading and serializing.
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Callable, List
+
+from sqlalchemy import create_engine, delete, insert
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.core.config import settings
+from app.db.base import Base
+from app.models.todo import Todo
+from app.models.user import User
+from app.schemas.todo_schema import TodoOut
+
+
+def measure(name: str, load: Callable[[], List], repeat: int) -> None:
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        [TodoOut.from_orm(item) for item in load()]
+        timings.append(time.perf_counter() - started)
+    gc.collect()
+    tracemalloc.start()
+    items = [TodoOut.from_orm(item) for item in load()]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{name:<12} best {min(timings) * 1000:8.1f} ms  "
+        f"{len(items) / min(timings):10.0f} rows/s  peak {peak / 2**20:7.1f} MiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--url", default=settings.SQLALCHEMY_DATABASE_URL)
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        owner = User(
+            username=f"bench-{time.time_ns()}",
+            email=f"bench-{time.time_ns()}@example.com",
+            hashed_password="",
+        )
+        db.add(owner)
+        db.commit()
+        owner_id = owner.id
+        for start in range(0, args.rows, 10_000):
+            db.execute(
+                insert(Todo),
+                [
+                    {
+                        "title": f"todo {i}",
+                        "description": "benchmark",
+                        "priority": i % 5 + 1,
+                        "isCompleted": i % 2 == 0,
+                        "owner_id": owner_id,
+                    }
+                    for i in range(start, min(start + 10_000, args.rows))
+                ],
+            )
+        db.commit()
+
+        def load_models() -> List[Todo]:
+            # A fresh session per run, as every request gets one
+            db.expunge_all()
+            return crud.todo.get_multi(db, limit=args.rows)
+
+        def load_rows() -> list:
+            return crud.todo.get_multi_rows(db, limit=args.rows)
+
+        try:
+            measure("orm", load_models, args.repeat)
+            measure("projection", load_rows, args.repeat)
+        finally:
+            db.expunge_all()
+            db.execute(delete(Todo).where(Todo.owner_id == owner_id))
+            db.execute(delete(User).where(User.id == owner_id))
+            db.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+"""
+Capture every distinct SQL statement the API issues while serving a
+workload that touches each endpoint, EXPLAIN each one against a seeded
+database, and compare what is flagged with benchmarks/query_plans.json.
+
+    RATE_LIMIT_ENABLED=false python -m benchmarks.query_plans \\
+        [--users 1000] [--todos 20] [--archived 5] [--update]
+
+Runs the app in process against the configured database (SQLite or
+MySQL), seeded with throwaway users, their addresses, todos and archived
+todos, which are removed afterwards. On tables of at least --min-rows rows,
+full scans (also full index scans), filesorts and temporary tables are
+flagged.
+
+Exits with status 1 when a statement has a finding the baseline does not
+accept. `--update` rewrites the baseline of the database's dialect with
+the current findings.
+"""
+
+import argparse
+import contextvars
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Set, Tuple
+
+from fastapi.testclient import TestClient
+from sqlalchemy import bindparam, delete, event, func, insert, or_, select, update
+from sqlalchemy.engine import Connection
+
+from app.core.fractional_index import key_between
+from app.core.security import create_access_token
+from app.db.base import Base
+from app.db.session import engine
+from app.main import app
+from app.models.address import Address
+from app.models.refresh_token import RefreshToken
+from app.models.todo import Todo
+from app.models.todo_archive import TodoArchive
+from app.models.todo_event import TodoEvent
+from app.models.todo_tombstone import TodoTombstone
+from app.models.user import User
+
+BASELINE_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "query_plans.json"
+)
+
+_explained = re.compile(
+    r"\s*(SELECT|WITH|UPDATE|DELETE|INSERT\b.*\bSELECT)\b", re.I | re.S
+)
+_in_list = re.compile(r"\bIN \((?:\?|%s|%\(\w+\)s)(?:, (?:\?|%s|%\(\w+\)s))*\)")
+_hint = re.compile(r"/\*\+.*?\*/ ?")
+_select_list = re.compile(r"SELECT .*? FROM")
+_sqlite_scan = re.compile(
+    r"SCAN (\w+)(?: AS \w+)?(?: USING (?:COVERING )?INDEX (\w+))?"
+)
+_sqlite_table = re.compile(r"(?:SCAN|SEARCH) (\w+)")
+
+# Statements issued while serving a request, not by background tasks
+in_request: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "in_request", default=False
+)
+
+
+async def capture_requests(scope, receive, send) -> None:
+    if scope["type"] == "http":
+        in_request.set(True)
+    await app(scope, receive, send)
+
+
+def normalize(statement: str) -> str:
+    """
+    One key per query shape: IN lists of any length are alike, and select
+    lists are left out, so adding a column to a table keeps the keys.
+    """
+    statement = _hint.sub("", " ".join(statement.split()))
+    statement = _select_list.sub("SELECT ... FROM", statement)
+    return _in_list.sub("IN (...)", statement)
+
+
+def seed(users: int, todos: int, archived: int) -> Tuple[List[int], str]:
+    stamp = time.time_ns()
+    now = datetime.utcnow().replace(microsecond=0)
+    positions = [key_between(None, None)]
+    while len(positions) < todos + archived:
+        positions.append(key_between(positions[-1], None))
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User),
+            [
+                {
+                    "username": f"plans-{stamp}-{i}",
+                    "email": f"plans-{stamp}-{i}@example.com",
+                    "first_name": "f",
+                    "last_name": "l",
+                    "hashed_password": "",
+                }
+                for i in range(users)
+            ],
+        )
+        owner_ids = list(
+            conn.scalars(select(User.id).where(User.username.like(f"plans-{stamp}-%")))
+        )
+        conn.execute(
+            insert(Todo),
+            [
+                {
+                    "title": f"todo {i}",
+                    "description": "x" * 100,
+                    "priority": i % 5 + 1,
+                    "isCompleted": i % 3 == 0,
+                    "owner_id": owner_id,
+                    "updated_at": now,
+                    "due_at": now + timedelta(hours=i - todos // 2),
+                    "position": positions[i],
+                }
+                for owner_id in owner_ids
+                for i in range(todos)
+            ],
+        )
+        next_id = (conn.scalar(select(func.max(Todo.id))) or 0) + 10**6
+        conn.execute(
+            insert(TodoArchive),
+            [
+                {
+                    "id": next_id + n,
+                    "title": "archived",
+                    "description": "x" * 100,
+                    "priority": 3,
+                    "isCompleted": True,
+                    "owner_id": owner_id,
+                    "created_at": now,
+                    "updated_at": now,
+                    "position": positions[todos + n % archived],
+                }
+                for n, owner_id in enumerate(
+                    owner_id for owner_id in owner_ids for _ in range(archived)
+                )
+            ],
+        )
+        conn.execute(
+            insert(Address),
+            [
+                {
+                    "address1": f"plans-{stamp}-{owner_id}",
+                    "city": "c",
+                    "state": "s",
+                    "country": "k",
+                    "zipcode": "1",
+                }
+                for owner_id in owner_ids
+            ],
+        )
+        address_ids = conn.scalars(
+            select(Address.id)
+            .where(Address.address1.like(f"plans-{stamp}-%"))
+            .order_by(Address.id)
+        )
+        conn.execute(
+            update(User)
+            .where(User.id == bindparam("owner_id"))
+            .values(address_id=bindparam("address_id")),
+            [
+                {"owner_id": owner_id, "address_id": address_id}
+                for owner_id, address_id in zip(owner_ids, address_ids)
+            ],
+        )
+        conn.execute(update(User).where(User.id == owner_ids[0]).values(is_admin=True))
+        tables = [table.name for table in Base.metadata.sorted_tables]
+        if engine.dialect.name == "sqlite":
+            conn.exec_driver_sql("ANALYZE")
+        else:
+            conn.exec_driver_sql(f"ANALYZE TABLE {', '.join(tables)}")
+    return owner_ids, f"plans-{stamp}"
+
+
+def cleanup(prefix: str) -> None:
+    with engine.begin() as conn:
+        owner_ids = list(
+            conn.scalars(select(User.id).where(User.username.like(f"{prefix}%")))
+        )
+        address_ids = [
+            address_id
+            for address_id in conn.scalars(
+                select(User.address_id).where(User.id.in_(owner_ids))
+            )
+            if address_id is not None
+        ]
+        for model in (TodoEvent, TodoTombstone, Todo, TodoArchive):
+            conn.execute(delete(model).where(model.owner_id.in_(owner_ids)))
+        conn.execute(delete(RefreshToken).where(RefreshToken.user_id.in_(owner_ids)))
+        conn.execute(delete(User).where(User.id.in_(owner_ids)))
+        conn.execute(
+            delete(Address).where(
+                or_(Address.id.in_(address_ids), Address.address1.like(f"{prefix}-%"))
+            )
+        )
+
+
+def workload(c: TestClient, owner_ids: List[int], prefix: str) -> None:
+    """Every endpoint but the event streams, as an owner, an admin and a new user."""
+    api = "/api/v1"
+
+    def bearer(user_id: int) -> Dict[str, str]:
+        token = create_access_token(f"{prefix}-{user_id}", user_id)
+        return {"Authorization": f"Bearer {token}"}
+
+    admin, owner = bearer(owner_ids[0]), bearer(owner_ids[1])
+    listed = c.get(f"{api}/todos/?include_archived=true", headers=owner).json()
+    archived_id = listed[-1]["id"]
+    c.get(f"{api}/todos/?fields=title,priority", headers=owner)
+    todo_id = c.get(f"{api}/todos/", headers=owner).json()[0]["id"]
+    c.get(f"{api}/todos/{todo_id}", headers=owner)
+    c.get(f"{api}/todos/{todo_id}?fields=title", headers=owner)
+    c.get(f"{api}/todos/{archived_id}", headers=owner)
+    c.get(f"{api}/todos/{todo_id}", headers=bearer(owner_ids[2]))
+    new_id = c.post(
+        f"{api}/todos/",
+        json={"title": "t", "description": "d", "priority": 1},
+        headers=owner,
+    ).json()["id"]
+    c.patch(f"{api}/todos/{new_id}", json={"priority": 2}, headers=owner)
+    c.patch(f"{api}/todos/{archived_id}", json={"priority": 2}, headers=owner)
+    c.post(f"{api}/todos/{new_id}/move", json={"after_id": todo_id}, headers=owner)
+    c.post(f"{api}/todos/{todo_id}/move", json={"after_id": None}, headers=owner)
+    c.delete(f"{api}/todos/{new_id}", headers=owner)
+    changes = c.get(f"{api}/todos/changes?limit=5", headers=owner).json()
+    c.get(f"{api}/todos/changes?since={changes['next_token']}", headers=owner)
+    c.get(f"{api}/todos/due", headers=owner)
+    c.get(f"{api}/todos/due?before=2100-01-01T00:00:00Z&fields=title", headers=owner)
+    c.get(f"{api}/todos/all", headers=admin)
+    c.get(f"{api}/todos/all?include_archived=true&fields=title", headers=admin)
+
+    c.get(f"{api}/users/", headers=owner)
+    c.get(f"{api}/users/?fields=username,address", headers=owner)
+    c.get(f"{api}/users/{owner_ids[1]}", headers=owner)
+    c.get(f"{api}/users/{owner_ids[2]}", headers=admin)
+    c.get(f"{api}/users/{owner_ids[2]}?fields=email", headers=admin)
+    c.get(f"{api}/users/all", headers=admin)
+    c.get(f"{api}/users/all?fields=username,address", headers=admin)
+    c.patch(f"{api}/users/", json={"phone_number": "01012345678"}, headers=owner)
+
+    address = {
+        "address1": "a",
+        "city": "c",
+        "state": "s",
+        "country": "k",
+        "zipcode": "1",
+    }
+    address_id = c.post(f"{api}/address/", json=address, headers=owner).json()["id"]
+    c.get(f"{api}/address/", headers=owner)
+    c.get(f"{api}/address/{address_id}", headers=owner)
+    c.get(f"{api}/address/{address_id}", headers=admin)
+    c.patch(f"{api}/address/", json={"city": "d"}, headers=owner)
+    c.delete(f"{api}/address/", headers=owner)
+
+    username, password = f"{prefix}-new", "password123"
+    user = {
+        "username": username,
+        "email": f"{username}@example.com",
+        "first_name": "f",
+        "last_name": "l",
+        "password": password,
+    }
+    c.post(f"{api}/auth/signup", json=user)
+    c.post(f"{api}/auth/signup", json=user)
+    tokens = c.post(
+        f"{api}/auth/login", data={"username": username, "password": password}
+    ).json()
+    c.post(f"{api}/auth/login", data={"username": username, "password": "wrong"})
+    refreshed = c.post(
+        f"{api}/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+    ).json()
+    c.post(f"{api}/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    headers = {"Authorization": f"Bearer {refreshed['access_token']}"}
+    c.patch(
+        f"{api}/auth/change-password",
+        json={
+            "username": username,
+            "password": password,
+            "new_password": "password321",
+        },
+        headers=headers,
+    )
+    c.post(f"{api}/auth/logout", json={}, headers=headers)
+    c.delete(f"{api}/auth/leave", headers=owner)
+
+
+def explain(conn: Connection, statement: str, parameters, large: Set[str]) -> List[str]:
+    if isinstance(parameters, list):
+        parameters = parameters[0] if parameters else ()
+    findings: Set[str] = set()
+    if conn.dialect.name == "sqlite":
+        plan = [
+            row[3]
+            for row in conn.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            )
+        ]
+        touched = {t for d in plan for t in _sqlite_table.findall(d) if t in large}
+        for detail in plan:
+            scan = _sqlite_scan.fullmatch(detail)
+            if scan and scan.group(1) in large:
+                if scan.group(2):
+                    findings.add(
+                        f"full index scan of {scan.group(1)} ({scan.group(2)})"
+                    )
+                else:
+                    findings.add(f"full scan of {scan.group(1)}")
+            elif detail.startswith("USE TEMP B-TREE") and touched:
+                kind = "filesort" if "ORDER BY" in detail else "temporary table"
+                findings.update(f"{kind} on {table}" for table in touched)
+    else:
+        for row in conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).mappings():
+            table, extra = row["table"], row["Extra"] or ""
+            if table not in large:
+                continue
+            if row["type"] == "ALL":
+                findings.add(f"full scan of {table}")
+            elif row["type"] == "index":
+                findings.add(f"full index scan of {table} ({row['key']})")
+            if "Using filesort" in extra:
+                findings.add(f"filesort on {table}")
+            if "Using temporary" in extra:
+                findings.add(f"temporary table on {table}")
+    return sorted(findings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--todos", type=int, default=20, help="per user")
+    parser.add_argument("--archived", type=int, default=5, help="per user")
+    parser.add_argument("--min-rows", type=int, default=1000)
+    parser.add_argument("--update", action="store_true")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    owner_ids, prefix = seed(args.users, args.todos, args.archived)
+    statements: Dict[str, Tuple[str, object]] = {}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany) -> None:
+        if in_request.get() and _explained.match(statement):
+            statements.setdefault(normalize(statement), (statement, parameters))
+
+    errors: List[str] = []
+
+    def server_error(response) -> None:
+        if response.status_code >= 500:
+            errors.append(f"{response.request.method} {response.request.url.path}")
+
+    try:
+        with TestClient(capture_requests, raise_server_exceptions=False) as c:
+            c.event_hooks["response"] = [server_error]
+            workload(c, owner_ids, prefix)
+        with engine.connect() as conn:
+            large = {
+                table.name
+                for table in Base.metadata.sorted_tables
+                if conn.scalar(select(func.count()).select_from(table)) >= args.min_rows
+            }
+            findings = {
+                key: explain(conn, statement, parameters, large)
+                for key, (statement, parameters) in sorted(statements.items())
+            }
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+        cleanup(prefix)
+
+    dialect = engine.dialect.name
+    baselines: Dict[str, Dict[str, List[str]]] = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            baselines = json.load(f)
+    baseline = baselines.get(dialect, {})
+
+    regressions = 0
+    for key, found in findings.items():
+        if not found:
+            continue
+        new = [finding for finding in found if finding not in baseline.get(key, [])]
+        regressions += bool(new)
+        print(f"{'NEW' if new else 'known':<6} {'; '.join(found)}\n       {key}\n")
+    for request in errors:
+        print(f"server error on {request}; its statements may be missing")
+    fixed = [
+        key for key, found in baseline.items() if key in findings and not findings[key]
+    ]
+    print(
+        f"{len(findings)} statements on large tables {sorted(large)}: "
+        f"{sum(1 for found in findings.values() if found)} flagged, "
+        f"{regressions} not in the baseline, {len(fixed)} no longer flagged"
+    )
+
+    if args.update:
+        baselines[dialect] = {key: found for key, found in findings.items() if found}
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+    elif regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Memory and lookup cost of the access token revocation check with a large
+number of revoked tokens, against a plain set of jti strings.
+
+    python -m benchmarks.revocation [--revoked 1000000] [--lookups 200000]
+
+Nothing touches the database: the list is filled the way a sync fills it.
+"""
+
+import argparse
+import time
+import tracemalloc
+import uuid
+
+from app.core.config import settings
+from app.core.revocation import RevocationList
+
+
+def allocated(build):
+    tracemalloc.start()
+    try:
+        value = build()
+        return value, tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def rate(check, jtis) -> float:
+    started = time.perf_counter()
+    for jti in jtis:
+        check(jti)
+    return len(jtis) / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--revoked", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    parser.add_argument(
+        "--error-rate", type=float, default=settings.REVOCATION_FILTER_ERROR_RATE
+    )
+    args = parser.parse_args()
+
+    revoked = [uuid.uuid4().hex for _ in range(args.revoked)]
+    live = [uuid.uuid4().hex for _ in range(args.lookups)]
+    hits = revoked[: args.lookups]
+
+    def build_list() -> RevocationList:
+        revocations = RevocationList(args.revoked, args.error_rate)
+        for start in range(0, len(revoked), 10_000):
+            revocations.add_many(revoked[start : start + 10_000])
+        return revocations
+
+    # The strings themselves are not counted: the set shares them with
+    # `revoked`, just as it would share them with the rows it was loaded from.
+    revocations, list_bytes = allocated(build_list)
+    jti_set, set_bytes = allocated(lambda: set(revoked))
+    string_bytes = sum(len(jti) + 49 for jti in revoked)
+
+    bloom = revocations._state[0]
+    false_positives = sum(jti in bloom for jti in live)
+
+    print(f"{args.revoked:,} revoked tokens, {args.lookups:,} lookups\n")
+    print(f"{'':26}{'memory':>12}{'live/s':>14}{'revoked/s':>14}")
+    print(
+        f"{'RevocationList':26}{list_bytes / 2**20:>9.1f} MiB"
+        f"{rate(revocations.is_revoked, live):>14,.0f}"
+        f"{rate(revocations.is_revoked, hits):>14,.0f}"
+    )
+    print(
+        f"{'set of jti strings':26}{(set_bytes + string_bytes) / 2**20:>9.1f} MiB"
+        f"{rate(jti_set.__contains__, live):>14,.0f}"
+        f"{rate(jti_set.__contains__, hits):>14,.0f}"
+    )
+    print(
+        f"\nbloom filter: {bloom.size / 8 / 2**20:.1f} MiB, {bloom.hashes} hashes, "
+        f"{false_positives / len(live):.4%} false positives "
+        f"(target {args.error_rate:.4%})"
+    )
+    assert all(revocations.is_revoked(jti) for jti in hits)
+    assert not any(revocations.is_revoked(jti) for jti in live)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Fire parallel duplicate signups at a running server and check that exactly
+one succeeds and every other one gets 409, never a 500.
+
+    python -m benchmarks.signup_race [--url http://127.0.0.1:8000] [--parallel 20]
+
+Each round signs up a fresh username. Half of the requests reuse it and
+half reuse only its email, so both unique indexes are raced.
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+import uuid
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.config import settings
+
+
+def signup(url: str, payload: dict, barrier: threading.Barrier) -> int:
+    request = urllib.request.Request(
+        f"{url}{settings.API_V1_STR}/auth/signup",
+        data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    barrier.wait()
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def race(url: str, parallel: int) -> Counter:
+    name = f"race{uuid.uuid4().hex[:10]}"
+    payloads = []
+    for i in range(parallel):
+        payloads.append(
+            {
+                # Odd requests collide on the email only
+                "username": name if i % 2 == 0 else f"{name}{i}",
+                "email": f"{name}@example.com",
+                "first_name": "Race",
+                "last_name": "Condition",
+                "password": "password",
+            }
+        )
+    barrier = threading.Barrier(parallel)
+    with ThreadPoolExecutor(parallel) as executor:
+        statuses = list(executor.map(lambda p: signup(url, p, barrier), payloads))
+    return Counter(statuses)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--parallel", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    failed = False
+    for _ in range(args.rounds):
+        started = time.perf_counter()
+        statuses = race(args.url, args.parallel)
+        elapsed = time.perf_counter() - started
+        created = statuses[200] + statuses[201]
+        ok = created == 1 and statuses[409] == args.parallel - 1
+        failed |= not ok
+        print(f"{dict(statuses)} in {elapsed * 1000:.0f} ms {'ok' if ok else 'FAILED'}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Time what a new worker does before it can serve, each step in a fresh
+interpreter, and compare the medians with benchmarks/startup_budget.json.
+
+    python -m benchmarks.startup [--runs 5] [--update]
+
+Exits with status 1 when a step is over its budget. `--update` rewrites the
+budget file with the current medians plus 50% (at least 5 ms) headroom.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict
+
+BUDGET_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "startup_budget.json"
+)
+
+# Each snippet prints the seconds its measured part took.
+STEPS = {
+    "import_schemas": """
+import time
+started = time.perf_counter()
+import app.schemas.address_user_schema, app.schemas.todo_schema, app.schemas.user_schema
+print(time.perf_counter() - started)
+""",
+    "import_main": """
+import time
+started = time.perf_counter()
+import app.main
+print(time.perf_counter() - started)
+""",
+    "openapi_cold": """
+import time
+from app.main import openapi_document
+openapi_document.cache_dir = None
+started = time.perf_counter()
+openapi_document.build()
+print(time.perf_counter() - started)
+""",
+    "openapi_cached": """
+import time
+from app.main import openapi_document
+openapi_document.cache_dir = {cache_dir!r}
+openapi_document.build()
+openapi_document._variants = None
+started = time.perf_counter()
+openapi_document.build()
+print(time.perf_counter() - started)
+""",
+}
+
+
+def run_step(code: str) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--update", action="store_true")
+    args = parser.parse_args()
+
+    with open(BUDGET_FILE) as f:
+        budget: Dict[str, float] = json.load(f)
+    results = {}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name, code in STEPS.items():
+            code = code.format(cache_dir=cache_dir)
+            results[name] = statistics.median(run_step(code) for _ in range(args.runs))
+
+    over = False
+    for name, seconds in results.items():
+        limit = budget.get(name)
+        status = "ok"
+        if limit is not None and seconds > limit:
+            status, over = "OVER BUDGET", True
+        print(
+            f"{name:<16} {seconds * 1000:8.1f} ms  budget {limit * 1000 if limit else 0:8.1f} ms  {status}"
+        )
+
+    if args.update:
+        with open(BUDGET_FILE, "w") as f:
+            json.dump(
+                {k: round(max(v * 1.5, v + 0.005), 3) for k, v in results.items()},
+                f,
+                indent=2,
+            )
+            f.write("\n")
+    elif over:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Time manual reordering (CRUDTodo.move) for users with more and more todos,
+to check that a move costs the same however long the list is.
+
+    python -m benchmarks.todo_ordering [--sizes 1000,10000,100000] \\
+        [--moves 500] [--url sqlite:////tmp/bench.db]
+
+Each move puts a random todo after another random one (or first), and
+commits, as POST /todos/{id}/move does. The "gap" pattern moves todos into
+the same gap over and over, which lengthens keys fastest; once a key is
+longer than TODO_POSITION_REBALANCE_LENGTH the owner's keys are rebalanced
+between two moves, as the "rebalance_todos" job would. Rows are created for
+throwaway users and removed afterwards. Reports move latency, rows of todo
+written per move, the longest key and the rebalances with their duration.
+"""
+
+import argparse
+import random
+import statistics
+import time
+from typing import List
+
+from sqlalchemy import delete, event, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.core.config import settings
+from app.core.fractional_index import key_between
+from app.db.base import Base
+from app.db.session import create_db_engine
+from app.models.todo import Todo
+from app.models.todo_event import TodoEvent
+from app.models.user import User
+
+
+def seed(engine: Engine, size: int) -> int:
+    stamp = time.time_ns()
+    with engine.begin() as conn:
+        owner_id = conn.execute(
+            insert(User).values(
+                username=f"bench-{stamp}",
+                email=f"bench-{stamp}@example.com",
+                hashed_password="",
+            )
+        ).inserted_primary_key[0]
+        position = None
+        for start in range(0, size, 10_000):
+            rows = []
+            for i in range(start, min(start + 10_000, size)):
+                position = key_between(position, None)
+                rows.append(
+                    {
+                        "title": f"todo {i}",
+                        "description": "benchmark",
+                        "priority": 3,
+                        "owner_id": owner_id,
+                        "position": position,
+                    }
+                )
+            conn.execute(insert(Todo), rows)
+    return owner_id
+
+
+def run(engine: Engine, size: int, moves: int, pattern: str) -> None:
+    Session = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    owner_id = seed(engine, size)
+    with engine.connect() as conn:
+        ids = [
+            row.id
+            for row in conn.execute(
+                Todo.__table__.select().where(Todo.owner_id == owner_id)
+            )
+        ]
+
+    written = 0
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany) -> None:
+        nonlocal written
+        if statement.lstrip().upper().startswith("UPDATE TODO "):
+            written += max(cursor.rowcount, 0)
+
+    rng = random.Random(size)
+    timings: List[float] = []
+    rows: List[int] = []
+    longest = 0
+    rebalances: List[float] = []
+    gap = ids[len(ids) // 2]
+    try:
+        for i in range(moves):
+            if pattern == "gap":
+                # Alternate two todos into the gap right after `gap`
+                todo_id, after_id = ids[i % 2], gap
+            else:
+                todo_id, after_id = rng.choice(ids), rng.choice([None, *ids])
+            before = written
+            started = time.perf_counter()
+            with Session() as db:
+                todo = crud.todo.get(db, todo_id)
+                after = None if after_id is None else crud.todo.get(db, after_id)
+                crud.todo.move(db, db_obj=todo, after=after)
+                db.commit()
+            timings.append(time.perf_counter() - started)
+            rows.append(written - before)
+            longest = max(longest, len(todo.position))
+            if len(todo.position) > settings.TODO_POSITION_REBALANCE_LENGTH:
+                started = time.perf_counter()
+                with Session() as db:
+                    crud.todo.rebalance(db, owner_id=owner_id)
+                    db.commit()
+                rebalances.append(time.perf_counter() - started)
+    finally:
+        event.remove(engine, "after_cursor_execute", count)
+        with engine.begin() as conn:
+            conn.execute(delete(TodoEvent).where(TodoEvent.owner_id == owner_id))
+            conn.execute(delete(Todo).where(Todo.owner_id == owner_id))
+            conn.execute(delete(User).where(User.id == owner_id))
+
+    q = statistics.quantiles(timings, n=100)
+    print(
+        f"{size:>9,} todos  {pattern:<6}  move p50 {q[49] * 1000:6.2f} "
+        f"p99 {q[98] * 1000:7.2f} ms  rows written {statistics.mean(rows):4.2f} "
+        f"(max {max(rows)})  longest key {longest:2}  "
+        f"{len(rebalances)} rebalances"
+        + (f" of {statistics.mean(rebalances) * 1000:.0f} ms" if rebalances else "")
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        default="1000,10000,100000",
+        help="comma separated todos per user",
+    )
+    parser.add_argument("--moves", type=int, default=500)
+    parser.add_argument(
+        "--patterns", default="random,gap", help="comma separated: random, gap"
+    )
+    parser.add_argument("--url", default=settings.SQLALCHEMY_DATABASE_URL)
+    args = parser.parse_args()
+
+    engine = create_db_engine(args.url)
+    Base.metadata.create_all(engine)
+    for size in [int(size) for size in args.sizes.split(",")]:
+        for pattern in args.patterns.split(","):
+            run(engine, size, args.moves, pattern)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import os
+import tempfile
+
+# Settings are read when app.core.config is imported, so the environment
+# is set up before anything from app is: a throwaway SQLite database, and
+# no rate limits between the requests of a test.
+_tmp = tempfile.mkdtemp(prefix="todo-tests-")
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite:///{_tmp}/test.db"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def tables():
+    Base.metadata.create_all(engine)
+    yield
+    engine.dispose()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+
+@pytest.fixture
+def client():
+    from app.main import app
+
+    return TestClient(app)
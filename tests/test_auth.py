@@ -0,0 +1,86 @@
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, event, or_
+
+from app.core.config import settings
+from app.db.session import engine
+from app.models.user import User
+
+
+@pytest.fixture
+def signup(client, db):
+    users = []
+
+    def signup(username: str, email: str, client: TestClient = client):
+        users.append((username, email))
+        return client.post(
+            f"{settings.API_V1_STR}/auth/signup",
+            json={
+                "username": username,
+                "email": email,
+                "first_name": "Race",
+                "last_name": "Condition",
+                "password": "correct horse",
+            },
+        )
+
+    yield signup
+    for username, email in users:
+        db.execute(
+            delete(User).where(or_(User.username == username, User.email == email))
+        )
+    db.commit()
+
+
+@pytest.mark.parametrize(
+    "second, detail",
+    [
+        # Both taken: the database reports whichever index it checks first
+        (
+            ("racer", "racer@example.com"),
+            {"Username already exists.", "User email already exists."},
+        ),
+        (("other", "racer@example.com"), {"User email already exists."}),
+        # An email-like username must not be taken for a duplicate email
+        (("racer", "email@example.com"), {"Username already exists."}),
+    ],
+)
+def test_duplicate_signups_racing_get_one_201_and_one_409(signup, second, detail):
+    from app.main import app
+
+    barrier = threading.Barrier(2)
+
+    def race(username: str, email: str):
+        racer = TestClient(app)
+        barrier.wait()
+        return signup(username, email, racer)
+
+    with ThreadPoolExecutor(2) as executor:
+        responses = list(
+            executor.map(race, *zip(("racer", "racer@example.com"), second))
+        )
+
+    assert Counter(r.status_code for r in responses) == {201: 1, 409: 1}
+    [conflict] = [r for r in responses if r.status_code == 409]
+    assert conflict.json()["detail"] in detail
+
+
+def test_signup_inserts_the_user_without_reading_it_back(signup):
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append(statement.split()[0].upper())
+
+    try:
+        response = signup("single", "single@example.com")
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert response.status_code == 201
+    assert response.json()["created_at"] is not None
+    assert statements == ["INSERT"]
@@ -0,0 +1,21 @@
+from sqlalchemy import and_, delete, insert, select
+
+from app.db.compaction import delete_in_batches
+from app.models.job import Job, JobStatus
+
+
+def test_batches_walk_past_rows_the_condition_rejects(db):
+    statuses = [JobStatus.DONE, JobStatus.QUEUED] * 4
+    db.execute(
+        insert(Job),
+        [{"queue": "compaction", "name": "noop", "status": s} for s in statuses],
+    )
+    db.commit()
+    try:
+        done = and_(Job.queue == "compaction", Job.status == JobStatus.DONE)
+        assert delete_in_batches(db, Job, done, batch_size=3, pause=0) == 4
+        left = db.scalars(select(Job.status).where(Job.queue == "compaction"))
+        assert list(left) == [JobStatus.QUEUED] * 4
+    finally:
+        db.execute(delete(Job).where(Job.queue == "compaction"))
+        db.commit()
@@ -0,0 +1,60 @@
+import asyncio
+import gzip
+
+import pytest
+from starlette.responses import PlainTextResponse
+
+from app.middleware.compression import CompressionMiddleware, select_encoding
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip, br", "br"),
+        ("br;q=0, gzip", "gzip"),
+        ("gzip;q=0.5, br;q=0.8", "br"),
+        ("gzip;q=0, *", "br"),
+        ("*;q=0", None),
+        ("br;q=0, gzip;q=0", None),
+        ("identity", None),
+        ("", None),
+    ],
+)
+def test_encoding_is_the_preferred_one_not_refused(accept_encoding, expected):
+    assert select_encoding(accept_encoding, ["br", "gzip"]) == expected
+
+
+def call(accept_encoding: str, body: bytes) -> dict:
+    app = CompressionMiddleware(
+        PlainTextResponse(body), minimum_size=100, encodings=["gzip"]
+    )
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start, body = sent
+    return {"headers": dict(start["headers"]), "body": body["body"]}
+
+
+def test_large_body_is_gzipped_and_small_or_refused_ones_are_not():
+    body = b"todo " * 100
+    response = call("gzip", body)
+    assert response["headers"][b"content-encoding"] == b"gzip"
+    assert response["headers"][b"content-length"] == str(len(response["body"])).encode()
+    assert gzip.decompress(response["body"]) == body
+
+    assert call("gzip", b"short")["body"] == b"short"
+    response = call("gzip;q=0", body)
+    assert b"content-encoding" not in response["headers"]
+    assert response["body"] == body
@@ -0,0 +1,59 @@
+import asyncio
+
+from sqlalchemy import delete
+
+from app.events.dispatcher import Event, EventDispatcher, Subscription
+from app.models.todo_event import TodoEvent
+
+
+def test_event_committed_after_a_higher_id_is_published_late(db):
+    owner_id = 9001
+
+    def commit_event(id: int) -> None:
+        db.add(
+            TodoEvent(
+                id=id, owner_id=owner_id, todo_id=id, kind="created", payload="{}"
+            )
+        )
+        db.commit()
+
+    async def scenario():
+        dispatcher = EventDispatcher(poll_interval=0)
+        subscription = await dispatcher.subscribe(owner_id)
+        head = dispatcher.last_id
+        # head + 1 is handed out first but its transaction commits last
+        commit_event(head + 2)
+        await dispatcher.poll()
+        commit_event(head + 1)
+        await dispatcher.poll()
+        await dispatcher.poll()
+        received = []
+        while not subscription.queue.empty():
+            received.append(subscription.queue.get_nowait().id)
+        return head, received, dispatcher._gaps
+
+    try:
+        head, received, gaps = asyncio.run(scenario())
+        assert received == [head + 2, head + 1]
+        assert not gaps
+    finally:
+        db.execute(delete(TodoEvent).where(TodoEvent.owner_id == owner_id))
+        db.commit()
+
+
+def test_late_event_already_replayed_is_not_repeated():
+    subscription = Subscription(1, 0, 10)
+    subscription.held = []
+    subscription.offer(Event(5, 1, 1, "created", "{}"), live=False)
+    subscription.offer(Event(4, 1, 1, "created", "{}"), late=True)
+    subscription.offer(Event(5, 1, 1, "created", "{}"))
+    held, subscription.held = subscription.held, None
+    for event, late in held:
+        subscription.offer(event, late=late)
+    # Replayed already, then found again by the dispatcher's gap lookup
+    subscription.offer(Event(5, 1, 1, "created", "{}"), late=True)
+    subscription.offer(Event(3, 1, 1, "created", "{}"), late=True)
+    received = []
+    while not subscription.queue.empty():
+        received.append(subscription.queue.get_nowait().id)
+    assert received == [5, 4, 3]
@@ -0,0 +1,89 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, insert
+
+from app.api.fields import sparse_response
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.models.address import Address
+from app.models.user import User
+from app.schemas.user_schema import UserWithAddress
+
+
+@pytest.fixture
+def get_user(client, db):
+    address_id = db.execute(
+        insert(Address).values(
+            address1="1 Main St",
+            city="Springfield",
+            state="IL",
+            country="US",
+            zipcode="62701",
+        )
+    ).inserted_primary_key[0]
+    user_id = db.execute(
+        insert(User).values(
+            username="sparse",
+            email="sparse@example.com",
+            first_name="Sparse",
+            last_name="Fields",
+            hashed_password="",
+            address_id=address_id,
+        )
+    ).inserted_primary_key[0]
+    db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token('sparse', user_id)}"}
+
+    def get_user(fields):
+        return client.get(
+            f"{settings.API_V1_STR}/users/{user_id}",
+            params={"fields": fields},
+            headers=headers,
+        )
+
+    get_user.id = user_id
+    yield get_user
+    db.execute(delete(User).where(User.id == user_id))
+    db.execute(delete(Address).where(Address.id == address_id))
+    db.commit()
+
+
+@pytest.mark.parametrize(
+    "fields",
+    ["id,username", ["id", "username"], " id, username,", "id,,username,id"],
+)
+def test_only_the_selected_fields_are_returned(get_user, fields):
+    response = get_user(fields)
+    assert response.status_code == 200
+    assert response.json() == {"id": get_user.id, "username": "sparse"}
+
+
+def test_address_is_resolved_as_a_nested_model(get_user):
+    response = get_user("address")
+    assert response.status_code == 200
+    address = response.json()["address"]
+    assert address["address1"] == "1 Main St"
+    assert address["city"] == "Springfield"
+
+
+@pytest.mark.parametrize(
+    "fields, detail",
+    [
+        ("id,password", "Unknown fields: password."),
+        ("", "No fields selected."),
+        (",", "No fields selected."),
+    ],
+)
+def test_bad_selections_are_rejected(get_user, fields, detail):
+    response = get_user(fields)
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith(detail)
+
+
+def test_stored_data_the_schema_rejects_is_a_handled_error():
+    user = SimpleNamespace(id="not a number")
+    with pytest.raises(HTTPException) as raised:
+        sparse_response(user, ["id"], UserWithAddress)
+    assert raised.value.status_code == 500
@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from app.core.fractional_index import DIGITS, SMALLEST_INTEGER, key_between
+
+
+def test_keys_inserted_anywhere_sort_between_their_neighbours():
+    rng = random.Random(1234)
+    keys = [key_between(None, None)]
+    for _ in range(2000):
+        i = rng.randint(0, len(keys))
+        a = keys[i - 1] if i else None
+        b = keys[i] if i < len(keys) else None
+        key = key_between(a, b)
+        assert (a is None or a < key) and (b is None or key < b)
+        keys.insert(i, key)
+    assert keys == sorted(keys)
+    assert len(set(keys)) == len(keys)
+
+
+def test_appends_and_prepends_step_the_integer_part():
+    keys = ["a0"]
+    for _ in range(200):
+        keys.append(key_between(keys[-1], None))
+        keys.insert(0, key_between(None, keys[0]))
+    assert keys == sorted(keys)
+    # The integer part grows by a digit, not the fraction
+    assert max(len(k) for k in keys) == 3
+    assert key_between("az", None) == "b00"
+    assert key_between(None, "a0") == "Zz"
+    assert key_between(None, "Z0") == "Yzz"
+
+
+def test_past_the_largest_and_smallest_integer_the_fraction_grows():
+    largest = "z" + DIGITS[-1] * 26
+    after = key_between(largest, None)
+    assert after > largest and after.startswith(largest)
+
+    smallest = SMALLEST_INTEGER + "V"
+    before = key_between(None, smallest)
+    assert before < smallest and before.startswith(SMALLEST_INTEGER)
+    tiny = key_between(None, SMALLEST_INTEGER + "1")
+    assert SMALLEST_INTEGER < tiny < SMALLEST_INTEGER + "1"
+
+
+def test_keys_out_of_order_are_rejected():
+    with pytest.raises(ValueError):
+        key_between("a1", "a0")
+    with pytest.raises(ValueError):
+        key_between("a0", "a0")
@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+from starlette.responses import PlainTextResponse
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.middleware import idempotency
+from app.middleware.idempotency import (
+    DatabaseStore,
+    IdempotencyMiddleware,
+    MemoryStore,
+    StoredResponse,
+)
+
+PATH = f"{settings.API_V1_STR}/todos/"
+
+
+def post(middleware: IdempotencyMiddleware) -> int:
+    token = create_access_token("idempotent", 1)
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": PATH,
+        "headers": [
+            (b"authorization", f"Bearer {token}".encode()),
+            (b"idempotency-key", b"retry-me"),
+        ],
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"{}", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    return sent[0]["status"]
+
+
+@pytest.mark.parametrize(
+    "status_code, replayed",
+    [
+        (201, True),
+        (422, True),
+        (400, True),
+        (401, False),
+        (403, False),
+        (404, False),
+        (409, False),
+        (429, False),
+        (503, False),
+    ],
+)
+def test_only_successes_and_deterministic_client_errors_are_replayed(
+    status_code, replayed
+):
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(status_code)
+        # The first call answers `status_code`, a retry that runs gets 201
+        response = PlainTextResponse("", status_code if len(calls) == 1 else 201)
+        await response(scope, receive, send)
+
+    middleware = IdempotencyMiddleware(app, store=MemoryStore(), paths=(PATH,))
+    assert post(middleware) == status_code
+    assert post(middleware) == (status_code if replayed else 201)
+    assert len(calls) == (1 if replayed else 2)
+
+
+def test_key_of_a_request_that_died_can_be_retried_after_the_lease(monkeypatch):
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope)
+        if len(calls) == 1:
+            raise RuntimeError("worker killed mid-request")
+        await PlainTextResponse("", 201)(scope, receive, send)
+
+    store = MemoryStore()
+    clock = [1000.0]
+    monkeypatch.setattr(idempotency.time, "monotonic", lambda: clock[0])
+    middleware = IdempotencyMiddleware(
+        app, store=store, paths=(PATH,), ttl=3600, lease=30
+    )
+
+    async def never_released(key):
+        pass
+
+    # A killed worker never gets to release (or save) its key
+    monkeypatch.setattr(store, "release", never_released)
+    with pytest.raises(RuntimeError):
+        post(middleware)
+    assert post(middleware) == 409
+
+    clock[0] += 31
+    assert post(middleware) == 201
+    # Saved with the full TTL, not the lease
+    clock[0] += 31
+    assert post(middleware) == 201
+    assert len(calls) == 2
+
+
+def test_database_store_keeps_the_response_shared_by_workers(db):
+    store, key = DatabaseStore(), "0" * 64
+    response = StoredResponse("fp", 201, [(b"content-type", b"text/plain")], b"ok")
+
+    async def scenario():
+        assert await store.reserve(key, "fp", 30)
+        # Another worker sees the key in flight and cannot take it
+        assert not await DatabaseStore().reserve(key, "fp", 30)
+        assert (await store.get(key)).status_code is None
+        await store.save(key, response, 3600)
+        return await DatabaseStore().get(key)
+
+    try:
+        assert asyncio.run(scenario()) == response
+    finally:
+        asyncio.run(store.release(key))
+    assert asyncio.run(store.get(key)) is None
@@ -0,0 +1,125 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, update
+
+from app.core.config import settings
+from app.jobs import queue
+from app.jobs.registry import Task, tasks
+from app.jobs.smtp_server import LocalSMTPServer
+from app.jobs.worker import Worker
+from app.models.job import Job, JobStatus
+
+
+@pytest.fixture
+def job(db, monkeypatch):
+    monkeypatch.setitem(tasks, "test_noop", Task(lambda: None, "test", 3))
+    job = queue.enqueue(db, "test_noop")
+    db.commit()
+    yield job
+    db.execute(delete(Job).where(Job.queue == "test"))
+    db.commit()
+
+
+def expire_lock(db, job) -> None:
+    db.execute(
+        update(Job).where(Job.id == job.id).values(locked_at=datetime(2000, 1, 1))
+    )
+    db.commit()
+
+
+def test_only_the_lock_holder_finishes_a_job(db, job):
+    assert queue.claim(db, "worker-a", ["test"], 1) == [job.id]
+    # worker-a stalls past the lock timeout and worker-b takes the job over
+    expire_lock(db, job)
+    assert queue.claim(db, "worker-b", ["test"], 1) == [job.id]
+
+    db.refresh(job)
+    assert not queue.complete(db, job, "worker-a")
+    assert not queue.fail(db, job, "worker-a", "late")
+    db.refresh(job)
+    assert (job.status, job.locked_by, job.attempts) == (
+        JobStatus.RUNNING,
+        "worker-b",
+        0,
+    )
+
+    assert queue.complete(db, job, "worker-b")
+    db.refresh(job)
+    assert (job.status, job.locked_by, job.attempts) == (JobStatus.DONE, None, 1)
+
+
+def test_renewed_lock_is_not_claimed_again(db, job):
+    assert queue.claim(db, "worker-a", ["test"], 1) == [job.id]
+    expire_lock(db, job)
+
+    assert queue.renew(db, "worker-a", [job.id]) == 1
+    assert queue.renew(db, "worker-b", [job.id]) == 0
+    assert queue.claim(db, "worker-b", ["test"], 1) == []
+
+
+def test_worker_survives_a_failing_claim(monkeypatch):
+    def claim(*args):
+        raise ConnectionError("database is down")
+
+    monkeypatch.setattr(queue, "claim", claim)
+    worker = Worker(["test"], concurrency=1, poll_interval=1.0)
+    assert worker.run_once(executor=None) == 0
+    assert worker.run_once(executor=None) == 0
+    assert worker.claim_failures == 2
+    assert worker.idle_wait() == 4.0
+
+
+def test_retry_delay_has_full_jitter(monkeypatch):
+    monkeypatch.setattr(queue.random, "uniform", lambda low, high: low)
+    assert queue.retry_delay(3) == timedelta(0)
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    server = LocalSMTPServer().start()
+    monkeypatch.setattr(settings, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(settings, "SMTP_PORT", server.port)
+    monkeypatch.setattr(settings, "SMTP_TLS", False)
+    monkeypatch.setattr(settings, "SMTP_USER", None)
+    monkeypatch.setattr(settings, "EMAILS_FROM_EMAIL", "todo@example.com")
+    monkeypatch.setattr(settings, "EMAILS_FROM_NAME", "Todo")
+    monkeypatch.setattr(settings, "EMAILS_ENABLED", True)
+    yield server
+    server.stop()
+
+
+def test_worker_sends_a_queued_email(db, smtp):
+    job = queue.enqueue(
+        db,
+        "send_email",
+        {"email_to": "someone@example.com", "subject": "Due soon", "body": "Hi"},
+    )
+    db.commit()
+    try:
+        worker = Worker(["email"], concurrency=1, poll_interval=1.0)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            assert worker.run_once(executor) == 1
+
+        db.refresh(job)
+        assert job.status == JobStatus.DONE
+        [message] = smtp.messages
+        assert message["To"] == "someone@example.com"
+        assert message["Subject"] == "Due soon"
+        assert message["From"] == "Todo <todo@example.com>"
+        assert message.get_payload().strip() == "Hi"
+    finally:
+        db.execute(delete(Job).where(Job.id == job.id))
+        db.commit()
+
+
+def test_job_purged_after_its_claim_is_skipped(db, job):
+    worker = Worker(["test"], concurrency=1, poll_interval=1.0)
+    assert queue.claim(db, worker.worker_id, ["test"], 1) == [job.id]
+    worker.in_flight, worker.running = 1, {job.id}
+    db.execute(delete(Job).where(Job.id == job.id))
+    db.commit()
+
+    worker.run_job(job.id)
+    assert (worker.in_flight, worker.running) == (0, set())
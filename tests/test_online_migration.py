@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.db import online_migration as om
+
+
+@pytest.fixture
+def bind(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/migration.db")
+    with engine.connect() as bind:
+        yield bind
+    engine.dispose()
+
+
+def create_table(bind, new_default: str) -> None:
+    bind.execute(
+        text(
+            "CREATE TABLE todo (id INTEGER PRIMARY KEY, title TEXT, "
+            "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, "
+            f"created_at_new TIMESTAMP {new_default})"
+        )
+    )
+    om.create_copy_triggers(bind, "todo", {"created_at_new": "created_at"})
+
+
+def test_swapped_in_column_keeps_stamping_new_rows(bind):
+    create_table(bind, "DEFAULT CURRENT_TIMESTAMP")
+    om.swap_columns(bind, "todo", "created_at", "created_at_new")
+    bind.execute(text("INSERT INTO todo (title) VALUES ('after the swap')"))
+    assert bind.scalar(text("SELECT created_at FROM todo")) is not None
+
+
+def test_column_without_the_old_default_is_not_swapped_in(bind):
+    create_table(bind, "")
+    with pytest.raises(ValueError, match="server default"):
+        om.swap_columns(bind, "todo", "created_at", "created_at_new")
+    # Nothing changed: the triggers still copy, the names are as they were
+    bind.execute(text("INSERT INTO todo (title) VALUES ('still copied')"))
+    assert bind.scalar(text("SELECT created_at_new FROM todo")) is not None
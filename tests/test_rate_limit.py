@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+from starlette.responses import PlainTextResponse
+
+from app.middleware import rate_limit
+from app.middleware.concurrency import ConcurrencyLimitMiddleware
+from app.middleware.rate_limit import (
+    FakeRedis,
+    MemoryBackend,
+    RateLimitMiddleware,
+    RedisBackend,
+)
+
+
+async def ok(scope, receive, send):
+    await PlainTextResponse("ok")(scope, receive, send)
+
+
+def call(app, path: str = "/api/v1/todos/") -> dict:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "headers": [],
+        "client": ("10.0.0.1", 1234),
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent[0]
+
+
+@pytest.mark.parametrize("backend", [MemoryBackend, lambda: RedisBackend(FakeRedis())])
+def test_bucket_refuses_the_request_after_the_burst(backend, monkeypatch):
+    monkeypatch.setattr(rate_limit.settings, "RATE_LIMIT_PER_SECOND", 0.5)
+    monkeypatch.setattr(rate_limit.settings, "RATE_LIMIT_BURST", 3)
+    app = RateLimitMiddleware(ok, backend=backend(), limited_prefix="/api/v1")
+
+    assert [call(app)["status"] for _ in range(3)] == [200, 200, 200]
+    refused = call(app)
+    assert refused["status"] == 429
+    # One token back takes two seconds at half a token per second
+    assert dict(refused["headers"])[b"retry-after"] == b"2"
+    # Other routes have their own bucket
+    assert call(app, "/api/v1/address/")["status"] == 200
+
+
+def test_fake_redis_runs_only_the_token_bucket_script():
+    with pytest.raises(ValueError):
+        FakeRedis().register_script("return 1")
+
+
+def test_load_is_shed_past_max_in_flight_but_not_for_health_probes():
+    release = asyncio.Event()
+
+    async def slow(scope, receive, send):
+        await release.wait()
+        await ok(scope, receive, send)
+
+    app = ConcurrencyLimitMiddleware(slow, max_in_flight=1, retry_after=7)
+
+    async def scenario():
+        def request(path: str, sent: list):
+            async def receive():
+                return {"type": "http.request", "body": b""}
+
+            async def send(message):
+                sent.append(message)
+
+            scope = {"type": "http", "method": "GET", "path": path, "headers": []}
+            return app(scope, receive, send)
+
+        first, shed, probe = [], [], []
+        running = asyncio.create_task(request("/api/v1/todos/", first))
+        await asyncio.sleep(0)
+        await request("/api/v1/todos/", shed)
+        probing = asyncio.create_task(request("/healthz", probe))
+        release.set()
+        await asyncio.gather(running, probing)
+        return first, shed, probe
+
+    first, shed, probe = asyncio.run(scenario())
+    assert first[0]["status"] == 200
+    assert shed[0]["status"] == 503
+    assert dict(shed[0]["headers"])[b"retry-after"] == b"7"
+    assert probe[0]["status"] == 200
+    assert app.in_flight == 0
@@ -0,0 +1,56 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.dialects import mysql
+
+from app import crud
+from app.db.types import utc_now
+from app.models.todo import Todo
+from app.models.user import User
+from app.schemas.todo_schema import TodoCreate
+
+
+@pytest.fixture
+def seoul(monkeypatch):
+    # A local time zone nine hours ahead of UTC
+    monkeypatch.setenv("TZ", "Asia/Seoul")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_due_todos_compare_with_the_utc_clock(db, seoul):
+    owner_id = db.execute(
+        insert(User).values(
+            username="due-owner", email="due-owner@example.com", hashed_password=""
+        )
+    ).inserted_primary_key[0]
+    now = datetime.utcnow()
+    # Due dates given with an offset, as a client in Seoul would send them
+    due = {}
+    for title, delta in [("overdue", -30), ("upcoming", 30)]:
+        local = (now + timedelta(hours=9, minutes=delta)).isoformat() + "+09:00"
+        due[title] = crud.todo.create_with_owner(
+            db,
+            obj_in=TodoCreate(title=title, description="", priority=3, due_at=local),
+            owner_id=owner_id,
+        )
+
+    assert [row.title for row in crud.todo.get_due(db, owner_id=owner_id)] == [
+        "overdue"
+    ]
+    claimed = crud.todo.claim_reminders(db, [todo.id for todo in due.values()])
+    assert [todo.title for todo in claimed] == ["overdue"]
+
+
+def test_due_queries_use_utc_and_an_index_friendly_false_on_mysql():
+    dialect = mysql.dialect()
+    assert str(utc_now().compile(dialect=dialect)) == "UTC_TIMESTAMP()"
+    query = crud.todo._pending_reminder()
+    compiled = str(query.compile(dialect=dialect))
+    assert "`isCompleted` = false" in compiled
+    assert " IS false" not in compiled
+    assert str(Todo.due_at < utc_now()) == "todo.due_at < CURRENT_TIMESTAMP"
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete
+
+from app.core.config import settings
+from app.core.revocation import RevocationList
+from app.models.revoked_token import RevokedToken
+
+
+@pytest.fixture
+def revoke(db):
+    ids = []
+
+    def revoke(id: int, jti: str) -> None:
+        expires_at = datetime.utcnow().replace(microsecond=0) + timedelta(hours=1)
+        db.add(RevokedToken(id=id, jti=jti, expires_at=expires_at))
+        db.commit()
+        ids.append(id)
+
+    yield revoke
+    db.execute(delete(RevokedToken).where(RevokedToken.id.in_(ids)))
+    db.commit()
+
+
+@pytest.mark.parametrize("first", ["sync", "reload"])
+def test_revocation_committed_after_a_higher_id_is_picked_up(revoke, first):
+    revocations = RevocationList(capacity=1000, error_rate=0.01)
+    # 1001 is handed out first but its transaction commits after 1002's
+    revoke(1002, f"late-{first}-b")
+    getattr(revocations, first)()
+    assert revocations.is_revoked(f"late-{first}-b")
+    assert not revocations.is_revoked(f"late-{first}-a")
+
+    revoke(1001, f"late-{first}-a")
+    revocations.sync()
+    assert revocations.is_revoked(f"late-{first}-a")
+    assert revocations.last_id == 1002
+
+
+def test_missing_id_is_given_up_after_the_gap_timeout(revoke, monkeypatch):
+    revocations = RevocationList(capacity=1000, error_rate=0.01)
+    revoke(2002, "rolled-back-neighbour")
+    revocations.sync()
+    assert 2001 in revocations._gaps
+
+    monkeypatch.setattr(settings, "REVOCATION_GAP_TIMEOUT", -1)
+    revocations.sync()
+    assert 2001 not in revocations._gaps
@@ -0,0 +1,25 @@
+import pytest
+from passlib.context import CryptContext
+from pydantic import ValidationError
+
+from app.core import security
+from app.core.config import Settings
+
+
+def test_only_weaker_bcrypt_hashes_are_rehashed():
+    rounds = security.bcrypt_context.handler("bcrypt").min_desired_rounds
+    for cost, rehashed in [(rounds - 1, True), (rounds, False), (rounds + 1, False)]:
+        hashed = CryptContext(schemes=["bcrypt"], bcrypt__rounds=cost).hash("pw")
+        valid, new_hash = security.verify_and_update_password("pw", hashed)
+        assert valid
+        assert (new_hash is not None) is rehashed
+
+
+def test_unknown_password_scheme_is_a_settings_error():
+    with pytest.raises(ValidationError, match="Unknown password schemes: bcrpyt"):
+        Settings(PASSWORD_SCHEMES="argon2,bcrpyt")
+
+
+def test_bcrypt_rounds_below_the_floor_is_a_settings_error():
+    with pytest.raises(ValidationError, match="BCRYPT_MIN_ROUNDS"):
+        Settings(BCRYPT_MIN_ROUNDS=12, BCRYPT_ROUNDS=10)
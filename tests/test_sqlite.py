@@ -0,0 +1,24 @@
+import sqlalchemy as sa
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+
+from app.db import session, sqlite
+
+
+def test_main_creates_tables_and_stamps_every_head(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path}/new.db"
+    engine = session.create_db_engine(url)
+    monkeypatch.setattr(session, "engine", engine)
+    # Read by alembic/env.py
+    monkeypatch.setenv("SQLALCHEMY_DATABASE_URL", url)
+
+    sqlite.main()
+
+    heads = set(ScriptDirectory.from_config(Config("alembic.ini")).get_heads())
+    with engine.connect() as conn:
+        stamped = set(conn.scalars(sa.text("SELECT version_num FROM alembic_version")))
+        tables = set(sa.inspect(conn).get_table_names())
+    engine.dispose()
+    assert len(heads) > 1
+    assert stamped == heads
+    assert {"todo", "user", "job", "todo_event"} <= tables
@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, func, insert
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.db.compaction import compact, raise_watermark
+from app.models.purge_watermark import PurgeWatermark
+from app.models.todo import Todo
+from app.models.todo_tombstone import TodoTombstone
+from app.models.user import User
+from app.utils import SyncCursor, decode_sync_token, encode_sync_token
+
+
+@pytest.fixture
+def changes(client, db):
+    owner_id = db.execute(
+        insert(User).values(
+            username="syncer", email="syncer@example.com", hashed_password=""
+        )
+    ).inserted_primary_key[0]
+    db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token('syncer', owner_id)}"}
+
+    def changes(since: str = None):
+        params = {"since": since} if since else {}
+        return client.get(
+            f"{settings.API_V1_STR}/todos/changes", params=params, headers=headers
+        )
+
+    changes.owner_id = owner_id
+    yield changes
+    db.execute(delete(PurgeWatermark))
+    db.execute(delete(Todo).where(Todo.owner_id == owner_id))
+    db.execute(delete(TodoTombstone).where(TodoTombstone.owner_id == owner_id))
+    db.execute(delete(User).where(User.id == owner_id))
+    db.commit()
+
+
+def test_rows_committed_after_a_later_one_was_synced_are_not_skipped(
+    changes, db, monkeypatch
+):
+    now = datetime.utcnow().replace(microsecond=0)
+    head = db.query(func.max(TodoTombstone.id)).scalar() or 0
+
+    def commit(todo_id: int, seconds_ago: int) -> None:
+        stamp = now - timedelta(seconds=seconds_ago)
+        db.add(
+            Todo(
+                id=todo_id,
+                title=f"todo {todo_id}",
+                description="",
+                priority=3,
+                owner_id=changes.owner_id,
+                position=f"a{todo_id}",
+                updated_at=stamp,
+            )
+        )
+        db.add(
+            TodoTombstone(
+                id=head + todo_id,
+                todo_id=todo_id,
+                owner_id=changes.owner_id,
+                deleted_at=stamp,
+            )
+        )
+        db.commit()
+
+    token = changes().json()["next_token"]
+    # 1 is stamped (flushed) first, but its transaction commits after 2's
+    commit(2, 2)
+    body = changes(token).json()
+    assert (body["changes"], body["deleted"]) == ([], [])
+    commit(1, 3)
+
+    # Once the commit lag has passed both are returned, in stamp order
+    monkeypatch.setattr(settings, "SYNC_COMMIT_LAG", 0)
+    body = changes(body["next_token"]).json()
+    assert [todo["id"] for todo in body["changes"]] == [1, 2]
+    assert body["deleted"] == [1, 2]
+
+
+def test_sync_token_older_than_the_tombstone_purge_is_gone(changes, db):
+    cursor = decode_sync_token(changes().json()["next_token"])
+    month_ago = datetime.utcnow() - timedelta(days=30)
+    stale = encode_sync_token(cursor._replace(synced_at=month_ago))
+    assert changes(stale).status_code == 200
+
+    raise_watermark(db, "todo_tombstone", month_ago + timedelta(minutes=1))
+    assert changes(stale).status_code == 410
+
+    # Starting over gives a token that is good again, and keeps being
+    token = changes().json()["next_token"]
+    assert changes(token).status_code == 200
+    token = changes(token).json()["next_token"]
+    assert changes(token).status_code == 200
+
+
+def test_sync_token_without_synced_at_is_gone_once_tombstones_were_purged(changes, db):
+    cursor = decode_sync_token(changes().json()["next_token"])
+    old_token = encode_sync_token(SyncCursor(*cursor[:3]))
+    assert changes(old_token).status_code == 200
+
+    raise_watermark(db, "todo_tombstone", datetime(2022, 1, 1))
+    assert changes(old_token).status_code == 410
+
+
+def test_compaction_raises_the_watermark_to_the_retention_cutoff(db):
+    try:
+        compact(db, retention=timedelta(days=30), pause=0)
+        purged_before = db.query(PurgeWatermark.purged_before).scalar()
+        expected = datetime.utcnow() - timedelta(days=30)
+        assert abs(purged_before - expected) < timedelta(minutes=1)
+
+        # Never moves back
+        compact(db, retention=timedelta(days=60), pause=0)
+        assert db.query(PurgeWatermark.purged_before).scalar() == purged_before
+    finally:
+        db.execute(delete(PurgeWatermark))
+        db.commit()